@@ -1,3 +1,16 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from Config import query_profile, timing
+
+logger = logging.getLogger(__name__)
+
+
 class CustomMiddleWare:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -7,3 +20,59 @@ class CustomMiddleWare:
         if response.status_code == 204:
             response.status_code = 200
         return response
+
+
+class ServerTimingMiddleware:
+    """
+    Report the stage timings of each request in a Server-Timing header and a JSON log line, when
+    settings.SERVER_TIMING is on.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.SERVER_TIMING:
+            return self.get_response(request)
+        token, timings = timing.start_recording()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            timing.stop_recording(token)
+        total = (time.perf_counter() - start) * 1000
+        response['Server-Timing'] = timing.server_timing_header(timings, total)
+        resolver_match = getattr(request, 'resolver_match', None)
+        logger.info(json.dumps({
+            'event': 'request_timing',
+            'method': request.method,
+            'path': request.path,
+            'view': resolver_match.view_name if resolver_match else None,
+            'status': response.status_code,
+            'total_ms': round(total, 3),
+            'stages': {name: round(duration, 3) for name, duration in timings.items()},
+        }))
+        return response
+
+
+class QueryProfilingMiddleware:
+    """
+    Count and time the SQL statements of each request and add them to the query_profile ring buffer, when
+    settings.QUERY_PROFILING is on. Requests are grouped by method and URL route.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_PROFILING:
+            return self.get_response(request)
+        profile = query_profile.QueryProfile(settings.QUERY_PROFILING_SLOWEST)
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            response = self.get_response(request)
+        total = (time.perf_counter() - start) * 1000
+        resolver_match = getattr(request, 'resolver_match', None)
+        route = resolver_match.route if resolver_match else request.path
+        query_profile.record(f'{request.method} {route}', response.status_code, total, profile)
+        return response
@@ -0,0 +1,112 @@
+"""
+Opt-in SQL query profiling: per-request query counts, DB time and slowest statements, kept in a bounded
+in-memory ring buffer and aggregated per endpoint.
+
+QueryProfilingMiddleware wraps each request in a QueryProfile installed with connection.execute_wrapper on every
+database connection, when settings.QUERY_PROFILING is on. The buffer keeps the last
+settings.QUERY_PROFILING_BUFFER_SIZE requests of this process only; SQL is recorded without its parameters.
+"""
+import heapq
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+# Longest SQL text kept per statement.
+MAX_SQL_LENGTH = 1000
+
+_lock = threading.Lock()
+_buffer = None
+
+
+class QueryProfile:
+    """
+    execute_wrapper that counts the statements of a request, sums their time and keeps the `slowest` slowest.
+    """
+    def __init__(self, slowest):
+        self.slowest = slowest
+        self.count = 0
+        self.duration = 0.0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            self.count += 1
+            self.duration += duration
+            statement = (duration, self.count, sql[:MAX_SQL_LENGTH])
+            if len(self.statements) < self.slowest:
+                heapq.heappush(self.statements, statement)
+            elif self.slowest:
+                heapq.heappushpop(self.statements, statement)
+
+    def slowest_statements(self):
+        return [{'duration_ms': round(duration, 3), 'sql': sql}
+                for duration, _, sql in sorted(self.statements, reverse=True)]
+
+
+def _records():
+    global _buffer
+    if _buffer is None or _buffer.maxlen != settings.QUERY_PROFILING_BUFFER_SIZE:
+        _buffer = deque(_buffer or (), maxlen=settings.QUERY_PROFILING_BUFFER_SIZE)
+    return _buffer
+
+
+def record(endpoint, status_code, total, profile):
+    """
+    Add the profile of one request to the ring buffer, dropping the oldest request when it is full.
+    """
+    with _lock:
+        _records().append({
+            'endpoint': endpoint,
+            'status': status_code,
+            'total_ms': total,
+            'queries': profile.count,
+            'db_ms': profile.duration,
+            'slowest': profile.slowest_statements(),
+        })
+
+
+def reset():
+    with _lock:
+        _records().clear()
+
+
+def endpoint_stats():
+    """
+    Per-endpoint aggregates of the buffered requests, the endpoints with the most DB time first: request count,
+    mean and max query count, mean and total DB time, mean request time and the slowest statements overall.
+    """
+    with _lock:
+        records = list(_records())
+    endpoints = {}
+    for item in records:
+        endpoints.setdefault(item['endpoint'], []).append(item)
+    stats = []
+    for endpoint, items in endpoints.items():
+        queries = [item['queries'] for item in items]
+        db_ms = sum(item['db_ms'] for item in items)
+        slowest = heapq.nlargest(settings.QUERY_PROFILING_SLOWEST,
+                                 (statement for item in items for statement in item['slowest']),
+                                 key=lambda statement: statement['duration_ms'])
+        stats.append({
+            'endpoint': endpoint,
+            'requests': len(items),
+            'queries_mean': round(sum(queries) / len(items), 2),
+            'queries_max': max(queries),
+            'db_ms_mean': round(db_ms / len(items), 3),
+            'db_ms_total': round(db_ms, 3),
+            'total_ms_mean': round(sum(item['total_ms'] for item in items) / len(items), 3),
+            'slowest': slowest,
+        })
+    stats.sort(key=lambda row: row['db_ms_total'], reverse=True)
+    return {
+        'enabled': settings.QUERY_PROFILING,
+        'buffer_size': settings.QUERY_PROFILING_BUFFER_SIZE,
+        'requests': len(records),
+        'endpoints': stats,
+    }
@@ -23,6 +23,8 @@ INSTALLED_APPS = [
     'utility.apps.UtilityConfig',]
 
 MIDDLEWARE = [
+    'Config.middleware.ServerTimingMiddleware',
+    'Config.middleware.QueryProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -33,6 +35,14 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'Config.middleware.CustomMiddleWare',
 ]
+# Per-request stage timings (validation, ETo, water balance, persistence, rendering) in a Server-Timing header
+# and a log line.
+SERVER_TIMING = config('SERVER_TIMING', default=False, cast=bool)
+# SQL query profiling: per-request query count, DB time and slowest statements, kept for the last
+# QUERY_PROFILING_BUFFER_SIZE requests of each process and served per endpoint at the estimation admin API.
+QUERY_PROFILING = config('QUERY_PROFILING', default=False, cast=bool)
+QUERY_PROFILING_BUFFER_SIZE = config('QUERY_PROFILING_BUFFER_SIZE', default=1000, cast=int)
+QUERY_PROFILING_SLOWEST = config('QUERY_PROFILING_SLOWEST', default=5, cast=int)
 
 ROOT_URLCONF = 'Config.urls'
 
@@ -136,3 +146,47 @@ EMAIL_PORT = config('EMAIL_PORT', cast=int)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 EMAIL_USE_SSL = True
+
+# Estimation
+# Number of per-latitude astronomical tables (Ra, N, ws, ...) kept in the LRU cache, and the number of
+# decimals latitudes are rounded to before lookup.
+ETO_ASTRONOMY_CACHE_SIZE = 1024
+ETO_LATITUDE_PRECISION = 4
+
+# Content-addressed cache of WB/WTF results, keyed by a hash of the validated input. Local memory by default;
+# point the 'estimation' alias at a shared backend to share results between workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'estimation': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'estimation-results',
+        'TIMEOUT': config('ESTIMATION_RESULT_CACHE_TIMEOUT', default=60 * 60, cast=int),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('ESTIMATION_RESULT_CACHE_MAX_ENTRIES', default=1000, cast=int),
+        },
+    },
+}
+ESTIMATION_RESULT_CACHE = 'estimation'
+# Upper bound on the number of scenarios evaluated by one WB scenario sweep request.
+ESTIMATION_MAX_SCENARIOS = config('ESTIMATION_MAX_SCENARIOS', default=500, cast=int)
+# Monte Carlo uncertainty: largest sample count accepted per request, and how many samples are evaluated per
+# vectorized chunk (bounds peak memory).
+ESTIMATION_UNCERTAINTY_MAX_SAMPLES = config('ESTIMATION_UNCERTAINTY_MAX_SAMPLES', default=20000, cast=int)
+ESTIMATION_UNCERTAINTY_CHUNK_SIZE = config('ESTIMATION_UNCERTAINTY_CHUNK_SIZE', default=1000, cast=int)
+# Upper bound on the number of stations in one batch ETo request.
+ESTIMATION_MAX_STATIONS = config('ESTIMATION_MAX_STATIONS', default=5000, cast=int)
+# Upper bound on the number of wells in one batch WTF request.
+ESTIMATION_MAX_WELLS = config('ESTIMATION_MAX_WELLS', default=5000, cast=int)
+# Upper bound on the number of years in one multi-year WB simulation.
+ESTIMATION_MAX_YEARS = config('ESTIMATION_MAX_YEARS', default=200, cast=int)
+# Estimation jobs: default worker pool size of run_estimation_jobs, how often an idle worker polls the queue
+# (seconds), how long finished jobs and their results are kept (seconds), after how long without a progress
+# update a running job is considered abandoned and re-queued (seconds), and how many stations or wells a
+# batch job processes between progress updates.
+ESTIMATION_JOB_WORKERS = config('ESTIMATION_JOB_WORKERS', default=2, cast=int)
+ESTIMATION_JOB_POLL_INTERVAL = config('ESTIMATION_JOB_POLL_INTERVAL', default=2, cast=float)
+ESTIMATION_JOB_RETENTION = config('ESTIMATION_JOB_RETENTION', default=7 * 24 * 60 * 60, cast=int)
+ESTIMATION_JOB_STALE_AFTER = config('ESTIMATION_JOB_STALE_AFTER', default=30 * 60, cast=int)
+ESTIMATION_JOB_CHUNK_SIZE = config('ESTIMATION_JOB_CHUNK_SIZE', default=500, cast=int)
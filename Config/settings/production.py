@@ -47,11 +47,25 @@ LOGGING = {
             'interval': 1,
             'backupCount': 30,
         },
+        # The request_timing lines of ServerTimingMiddleware (SERVER_TIMING), one JSON object per request.
+        'request_timing': {
+            'level': 'INFO',
+            'class': 'logging.handlers.TimedRotatingFileHandler',
+            'filename': 'logs/request_timing.log',
+            'when': 'D',
+            'interval': 1,
+            'backupCount': 30,
+        },
 
     },
     'loggers': {
         'django': {
             'handlers': ['logfile']
         },
+        'Config.middleware': {
+            'handlers': ['request_timing'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
@@ -0,0 +1,48 @@
+"""
+Per-request stage timings (validation, ETo, water balance, persistence, rendering, ...).
+
+ServerTimingMiddleware starts a recording for each request when settings.SERVER_TIMING is on; code wraps its
+stages in stage(), which adds the stage's wall time to the current recording and does nothing without one.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+
+_recording = contextvars.ContextVar('stage_timings', default=None)
+
+
+def start_recording():
+    """
+    Start recording stage timings for the current request; returns the token to stop with and the {stage: ms}
+    dict the stages are added to.
+    """
+    timings = {}
+    return _recording.set(timings), timings
+
+
+def stop_recording(token):
+    _recording.reset(token)
+
+
+@contextmanager
+def stage(name):
+    """
+    Add the wall time of the block, in milliseconds, to stage `name` of the current recording.
+    """
+    timings = _recording.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0) + (time.perf_counter() - start) * 1000
+
+
+def server_timing_header(timings, total):
+    """
+    Server-Timing header value of the stage timings and the total request time, in milliseconds.
+    """
+    metrics = dict(timings, total=total)
+    return ', '.join(f'{name};dur={duration:.2f}' for name, duration in metrics.items())
@@ -1,6 +1,8 @@
 from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
+from Config import timing
+
 
 class CustomRenderer(JSONRenderer):
     def render(self, data, accepted_media_type=None, renderer_context=None):
@@ -23,4 +25,5 @@ class CustomRenderer(JSONRenderer):
                 response["message"] = data["detail"]
             except KeyError:
                 response["errors"] = data
-        return super(CustomRenderer, self).render(response, accepted_media_type, renderer_context)
+        with timing.stage('render'):
+            return super(CustomRenderer, self).render(response, accepted_media_type, renderer_context)
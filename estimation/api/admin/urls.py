@@ -0,0 +1,7 @@
+from django.urls import path
+
+from estimation.api.admin import views
+
+urlpatterns = [
+    path('query-stats/', views.QueryStatsAPI.as_view()),
+]
@@ -0,0 +1,19 @@
+from rest_framework import status, views
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from Config import query_profile
+
+
+class QueryStatsAPI(views.APIView):
+    """
+    Per-endpoint SQL query statistics of the requests profiled by this process (see Config.query_profile).
+    """
+    permission_classes = [IsAdminUser, ]
+
+    def get(self, request):
+        return Response(query_profile.endpoint_stats(), status=status.HTTP_200_OK)
+
+    def delete(self, request):
+        query_profile.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -1,5 +1,6 @@
 from django.urls import path, include
 
 urlpatterns = [
+    path('admin/', include('estimation.api.admin.urls')),
     path('user/', include('estimation.api.user.urls'))
 ]
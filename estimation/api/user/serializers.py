@@ -1,10 +1,45 @@
+from django.conf import settings
 from rest_framework import serializers
 
 from estimation import constants
 from estimation.models import QOutData, SPYieldData, WTFMethod, WBMethodData, EtoRsData, Temperature, EtoShData, \
-    LandUseArea, CropCoefficient, CurveNumber, RechargeRate, CValue, PValue, RHValue, SolarRadiation, TMeanValue, \
-    EtoData, OutFlow, QinData, ReWaterBody
-from estimation.utils.eto_methods import eto_method_validation
+    LandUseArea, CropCoefficient, CurveNumber, RechargeRate, OutFlow, QinData, EstimationJob, WBMultiYearRun
+from estimation.utils.eto_methods import eto_method_validation, DIAGNOSTIC_ETO_METHODS, ETO_INPUT_FIELDS
+from estimation.utils.eto_vectorized import kernel_input_fields, ETO_KERNELS, PERIODS
+from estimation.utils.resolution import RESOLUTIONS
+from estimation.utils.scenarios import SCENARIO_OVERRIDES
+from estimation.utils.sensitivity import SENSITIVITY_GROUPS
+from estimation.utils.wb_vectorized import LAND_USE_KEYS
+
+WB_KERNEL_REQUIRED_FIELDS = ('catchment_area', 'p_value', 'kc_value', 'cn_value', 're_water_body', 'recharge_rate',
+                            'outflow')
+
+
+def require_kernel_fields(attrs, purpose):
+    missing_fields = [field for field in WB_KERNEL_REQUIRED_FIELDS if attrs.get(field) is None]
+    if missing_fields:
+        raise serializers.ValidationError({field: f'This field is required for {purpose}.' for field in missing_fields})
+
+
+def series_lengths(attrs, fields):
+    return {field: len(attrs[field]) for field in fields if isinstance(attrs.get(field), list)}
+
+
+def series_resolution_errors(lengths):
+    """
+    {field: error} for the series whose length is not a supported resolution (daily, dekadal or monthly) or
+    differs from that of the first series.
+    """
+    errors = {}
+    expected = None
+    for field, length in lengths.items():
+        if length not in RESOLUTIONS:
+            errors[field] = f"The length of {field} must be one of {', '.join(str(value) for value in RESOLUTIONS)}"
+        elif expected is None:
+            expected = field
+        elif length != lengths[expected]:
+            errors[field] = f'The length of {field} must match that of {expected} ({lengths[expected]})'
+    return errors
 
 
 class QOutDataSerializer(serializers.ModelSerializer):
@@ -38,19 +73,47 @@ class WTFDataSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        q_in_values = instance.q_in.all().values_list('value', flat=True)
-        representation['q_in'] = list(q_in_values)
+        representation['q_in'] = [q_in.value for q_in in instance.q_in.all()]
         return representation
 
 
+class RangeSerializer(serializers.Serializer):
+    min = serializers.FloatField()
+    max = serializers.FloatField()
+
+    def validate(self, attrs):
+        if attrs['min'] > attrs['max']:
+            raise serializers.ValidationError({'max': 'max must not be smaller than min.'})
+        return attrs
+
+
+class WTFUncertaintySerializer(serializers.Serializer):
+    samples = serializers.IntegerField(min_value=1, max_value=settings.ESTIMATION_UNCERTAINTY_MAX_SAMPLES,
+                                       default=1000)
+    seed = serializers.IntegerField(min_value=0, max_value=2 ** 32 - 1, required=False)
+    percentiles = serializers.ListField(child=serializers.FloatField(min_value=0, max_value=100), required=False,
+                                        allow_empty=False)
+    wt_max = RangeSerializer(required=False)
+    wt_min = RangeSerializer(required=False)
+    sp_yield_percentage = RangeSerializer(many=True, required=False)
+    pump = serializers.FloatField(min_value=0, max_value=0.9, default=0)
+
+    def validate_sp_yield_percentage(self, value):
+        if any(value_range['min'] <= 0 for value_range in value):
+            raise serializers.ValidationError('Specific yield ranges must be above 0.')
+        return value
+
+
 class WTFMethodSerializer(serializers.ModelSerializer):
     sp_yield_data = SPYieldDataSerializer(many=True, read_only=False)
     q_out = QOutDataSerializer(many=True, read_only=False)
     q_in = serializers.ListSerializer(child=serializers.FloatField(required=False), required=False)
+    uncertainty = WTFUncertaintySerializer(required=False)
 
     class Meta:
         model = WTFMethod
-        fields = ['catchment_area', 'wt_max', 'wt_min', 'num_layers', 'precipitation', 'q_out', 'q_in', 'sp_yield_data']
+        fields = ['catchment_area', 'wt_max', 'wt_min', 'num_layers', 'precipitation', 'q_out', 'q_in', 'sp_yield_data',
+                  'uncertainty']
 
     def validate(self, data):
         """
@@ -61,9 +124,12 @@ class WTFMethodSerializer(serializers.ModelSerializer):
         if num_layers is not None and len(sp_yield_data) != num_layers:
             raise serializers.ValidationError("Number of layers does not match the provided data.")
         input_values = data.get('q_out', [])
-        print(len(input_values))
         if len(input_values) != 12:
             raise serializers.ValidationError("Exactly 12 sets of input values are required.")
+        sp_yield_ranges = (data.get('uncertainty') or {}).get('sp_yield_percentage')
+        if sp_yield_ranges is not None and len(sp_yield_ranges) != len(sp_yield_data):
+            raise serializers.ValidationError(
+                {'uncertainty': 'One sp_yield_percentage range is required per layer.'})
         return data
 
     def create(self, validated_data):
@@ -91,6 +157,33 @@ class WTFMethodSerializer(serializers.ModelSerializer):
         return wtf_method
 
 
+class WTFWellSerializer(WTFMethodSerializer):
+    name = serializers.CharField(required=False, max_length=100)
+    uncertainty = None
+
+    class Meta:
+        model = WTFMethod
+        fields = ['name', 'catchment_area', 'wt_max', 'wt_min', 'num_layers', 'precipitation', 'q_out', 'q_in',
+                  'sp_yield_data']
+
+
+class WTFBatchSerializer(serializers.Serializer):
+    wells = serializers.ListField(child=serializers.DictField(), allow_empty=False,
+                                  max_length=settings.ESTIMATION_MAX_WELLS)
+
+    def validate(self, attrs):
+        # A bad well is reported next to its result rather than failing the batch: keep a
+        # (validated_data, None) or (None, errors) pair per well.
+        attrs['validated_wells'] = []
+        for well in attrs['wells']:
+            well_serializer = WTFWellSerializer(data=well)
+            if well_serializer.is_valid():
+                attrs['validated_wells'].append((well_serializer.validated_data, None))
+            else:
+                attrs['validated_wells'].append((None, well_serializer.errors))
+        return attrs
+
+
 class TemperatureSerializer(serializers.ModelSerializer):
     class Meta:
         model = Temperature
@@ -149,6 +242,19 @@ class CurveNumberSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class WBUncertaintySerializer(serializers.Serializer):
+    samples = serializers.IntegerField(min_value=1, max_value=settings.ESTIMATION_UNCERTAINTY_MAX_SAMPLES,
+                                       default=1000)
+    seed = serializers.IntegerField(min_value=0, max_value=2 ** 32 - 1, required=False)
+    percentiles = serializers.ListField(child=serializers.FloatField(min_value=0, max_value=100), required=False,
+                                        allow_empty=False)
+    p_value = serializers.FloatField(min_value=0, max_value=0.9, default=0)
+    cn_value = serializers.FloatField(min_value=0, max_value=0.9, default=0)
+    kc_value = serializers.FloatField(min_value=0, max_value=0.9, default=0)
+    climate = serializers.FloatField(min_value=0, max_value=0.9, default=0)
+    temperature = serializers.FloatField(min_value=0, max_value=10, default=0)
+
+
 class WBMethodSerializer(serializers.Serializer):
     catchment_area = serializers.FloatField(required=False)
     rlc = serializers.ChoiceField(choices=constants.ClassificationChoices.choices, required=False)
@@ -173,9 +279,24 @@ class WBMethodSerializer(serializers.Serializer):
     outflow = OutFlowSerializer(many=True, required=False)
     rf = serializers.FloatField(required=False)
     rf_option = serializers.BooleanField(required=False)
+    diagnostics = serializers.BooleanField(required=False, default=False)
+    uncertainty = WBUncertaintySerializer(required=False)
 
     def validate(self, attrs):
         eto_method_validation(attrs)
+        if attrs.get('diagnostics') and attrs.get('eto_method') not in DIAGNOSTIC_ETO_METHODS:
+            raise serializers.ValidationError(
+                {'diagnostics': f"A diagnostic table is not available for eto_method {attrs.get('eto_method')}"})
+        lengths = series_lengths(attrs, kernel_input_fields(attrs['eto_method'])
+                                 if attrs.get('eto_method') in ETO_KERNELS else ())
+        errors = series_resolution_errors(lengths)
+        if errors:
+            raise serializers.ValidationError(errors)
+        if attrs.get('diagnostics') and any(length != PERIODS for length in lengths.values()):
+            raise serializers.ValidationError(
+                {'diagnostics': 'A diagnostic table is only available for dekadal series'})
+        if attrs.get('uncertainty') is not None:
+            require_kernel_fields(attrs, 'an uncertainty estimate')
         return attrs
 
     # def validate(self, data):
@@ -369,46 +490,41 @@ class WBMethodSerializer(serializers.Serializer):
     #     return data
 
 
-class CValueSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = CValue
-        fields = '__all__'
-
-
-class PValueSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = PValue
-        fields = '__all__'
-
-
-class RHValueSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = RHValue
-        fields = '__all__'
-
-
-class SolarRadiationSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = SolarRadiation
-        fields = '__all__'
-
-
-class TMeanValueSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = TMeanValue
-        fields = '__all__'
-
+class EtoStationSerializer(serializers.Serializer):
+    name = serializers.CharField(required=False, max_length=100)
+    latitude = serializers.FloatField(required=False)
+    elevation = serializers.FloatField(required=False)
+    temperature = TemperatureSerializer(many=True, required=False)
+    eto_rs_data = EtoRsDataSerializer(many=True, required=False)
+    eto_sh_data = EtoShDataSerializer(many=True, required=False)
+    c_value = serializers.ListSerializer(child=serializers.FloatField(), required=False)
+    rh_value = serializers.ListSerializer(child=serializers.FloatField(), required=False)
+    solar_radiation = serializers.ListSerializer(child=serializers.FloatField(), required=False)
 
-class EtoDataSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = EtoData
-        fields = ['value', ]
 
+class EtoBatchSerializer(serializers.Serializer):
+    eto_method = serializers.ChoiceField(choices=constants.ETO_METHOD_CHOICES)
+    stations = EtoStationSerializer(many=True, allow_empty=False, max_length=settings.ESTIMATION_MAX_STATIONS)
 
-class ReWaterBodySerializer(serializers.ModelSerializer):
-    class Meta:
-        model = ReWaterBody
-        fields = ['value']
+    def validate(self, attrs):
+        fields = kernel_input_fields(attrs['eto_method'])
+        errors = {}
+        periods = set()
+        for index, station in enumerate(attrs['stations']):
+            missing_fields = [field for field in fields if station.get(field) is None]
+            if missing_fields:
+                errors[index] = f"{', '.join(missing_fields)} required for eto_method {attrs['eto_method']}"
+                continue
+            lengths = series_lengths(station, fields)
+            length_errors = series_resolution_errors(lengths)
+            if length_errors:
+                errors[index] = '; '.join(length_errors.values())
+            periods.update(lengths.values())
+        if errors:
+            raise serializers.ValidationError({'stations': errors})
+        if len(periods) > 1:
+            raise serializers.ValidationError({'stations': 'All stations must have series of the same length'})
+        return attrs
 
 
 class WBMethodDataSerializer(serializers.ModelSerializer):
@@ -419,14 +535,14 @@ class WBMethodDataSerializer(serializers.ModelSerializer):
     eto_sh_data = EtoShDataSerializer(many=True)
     land_use_area = LandUseAreaSerializer(many=True)
     recharge_rate = RechargeRateSerializer(many=True)
-    c_value = CValueSerializer(many=True)
-    p_value = PValueSerializer(many=True)
-    rh_value = RHValueSerializer(many=True)
-    solar_radiation = SolarRadiationSerializer(many=True)
-    t_mean_value = TMeanValueSerializer(many=True)
-    eto_list = EtoDataSerializer(many=True)
+    c_value = serializers.ListField(child=serializers.FloatField())
+    p_value = serializers.ListField(child=serializers.FloatField())
+    rh_value = serializers.ListField(child=serializers.FloatField())
+    solar_radiation = serializers.ListField(child=serializers.FloatField())
+    t_mean_value = serializers.ListField(child=serializers.FloatField())
+    eto_list = serializers.ListField(child=serializers.DecimalField(max_digits=5, decimal_places=2, allow_null=True))
     outflow = OutFlowSerializer(many=True)
-    re_water_body = ReWaterBodySerializer(many=True)
+    re_water_body = serializers.ListField(child=serializers.FloatField())
 
     class Meta:
         model = WBMethodData
@@ -434,18 +550,161 @@ class WBMethodDataSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        c_values = [item['value'] for item in representation.pop('c_value', [])]
-        p_values = [item['value'] for item in representation.pop('p_value', [])]
-        re_water_body = [item['value'] for item in representation.pop('re_water_body', [])]
-        rh_values = [item['value'] for item in representation.pop('rh_value', [])]
-        eto_list = [item['value'] for item in representation.pop('eto_list', [])]
-        solar_radiation_values = [item['value'] for item in representation.pop('solar_radiation', [])]
-        t_mean_values = [item['value'] for item in representation.pop('t_mean_value', [])]
-        representation['c_value'] = c_values
-        representation['p_value'] = p_values
-        representation['re_water_body'] = re_water_body
-        representation['rh_value'] = rh_values
-        representation['solar_radiation'] = solar_radiation_values
-        representation['t_mean_value'] = t_mean_values
-        representation['eto_list'] = eto_list
+        for field in ('c_value', 'p_value', 're_water_body', 'rh_value', 'solar_radiation', 't_mean_value', 'eto_list'):
+            representation[field] = representation.pop(field)
         return representation
+
+
+class EtoComparisonSerializer(EtoStationSerializer):
+    eto_methods = serializers.ListField(child=serializers.ChoiceField(choices=constants.ETO_METHOD_CHOICES),
+                                        required=False, allow_empty=False)
+
+    def validate(self, attrs):
+        errors = series_resolution_errors(series_lengths(attrs, ETO_INPUT_FIELDS))
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+
+class LandUseTransferSerializer(serializers.Serializer):
+    source = serializers.ChoiceField(choices=LAND_USE_KEYS)
+    target = serializers.ChoiceField(choices=LAND_USE_KEYS)
+    percentage = serializers.FloatField(min_value=0, max_value=100)
+
+    def validate(self, attrs):
+        if attrs['source'] == attrs['target']:
+            raise serializers.ValidationError({'target': 'Source and target land-use classes must differ.'})
+        return attrs
+
+
+class WBScenarioSerializer(serializers.Serializer):
+    name = serializers.CharField(required=False, max_length=100)
+    land_use_area = LandUseAreaSerializer(many=True, required=False)
+    land_use_transfer = LandUseTransferSerializer(required=False)
+    kc_value = CropCoefficientSerializer(many=True, required=False)
+    cn_value = CurveNumberSerializer(many=True, required=False)
+    recharge_rate = RechargeRateSerializer(many=True, required=False)
+    rf = serializers.FloatField(required=False)
+
+    def validate_rf(self, value):
+        # rf only feeds ratios calculate_wb does not return, so a scenario cannot change anything through it.
+        raise serializers.ValidationError('rf does not affect the water balance and cannot be varied per scenario.')
+
+
+class WBScenarioSweepSerializer(WBMethodSerializer):
+    scenarios = WBScenarioSerializer(many=True, allow_empty=False, max_length=settings.ESTIMATION_MAX_SCENARIOS)
+    persist = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        require_kernel_fields(attrs, 'a scenario sweep')
+        errors = {}
+        for index, scenario in enumerate(attrs['scenarios']):
+            for field in SCENARIO_OVERRIDES:
+                if scenario.get(field) is not None and len(scenario[field]) != len(attrs[field]):
+                    errors[index] = f'{field} must have {len(attrs[field])} rows like the base input'
+        if errors:
+            raise serializers.ValidationError({'scenarios': errors})
+        return attrs
+
+
+class WBSensitivitySerializer(WBMethodSerializer):
+    groups = serializers.ListField(child=serializers.ChoiceField(choices=list(SENSITIVITY_GROUPS)), required=False,
+                                   allow_empty=False, default=list(SENSITIVITY_GROUPS))
+    delta = serializers.FloatField(min_value=0.001, max_value=0.5, default=0.01)
+
+    def validate(self, attrs):
+        if 'eto_methods' in self.initial_data:
+            # The water balance only uses the first period's ETo, so comparing ETo methods here would mislead.
+            raise serializers.ValidationError(
+                {'eto_methods': 'ETo methods cannot be compared in a sensitivity analysis: the water balance '
+                                'uses the ETo of the first period only.'})
+        attrs = super().validate(attrs)
+        require_kernel_fields(attrs, 'a sensitivity analysis')
+        attrs['groups'] = [group for group in SENSITIVITY_GROUPS if group in attrs['groups']]
+        return attrs
+
+
+class WBYearSerializer(serializers.Serializer):
+    year = serializers.IntegerField()
+    p_value = serializers.ListField(child=serializers.FloatField())
+    temperature = TemperatureSerializer(many=True, required=False)
+    eto_rs_data = EtoRsDataSerializer(many=True, required=False)
+    eto_sh_data = EtoShDataSerializer(many=True, required=False)
+    c_value = serializers.ListField(child=serializers.FloatField(), required=False)
+    rh_value = serializers.ListField(child=serializers.FloatField(), required=False)
+    solar_radiation = serializers.ListField(child=serializers.FloatField(), required=False)
+
+
+class WBMultiYearSerializer(WBMethodSerializer):
+    """
+    Multi-year WB input: the catchment, land-use, Kc, CN and recharge fields are shared by every year, and
+    each item of `years` holds that year's rainfall and climate series, falling back to the top-level climate
+    fields. The merged data of every year, ordered by year, ends up in validated_years.
+    """
+    years = WBYearSerializer(many=True, allow_empty=False, max_length=settings.ESTIMATION_MAX_YEARS)
+
+    def validate(self, attrs):
+        errors = {}
+        validated_years = []
+        for index, year in enumerate(attrs['years']):
+            year_data = dict(attrs, **year)
+            try:
+                year_data = super().validate(year_data)
+                require_kernel_fields(year_data, 'a multi-year simulation')
+            except serializers.ValidationError as e:
+                errors[index] = e.detail
+                continue
+            if len(year_data['p_value']) != PERIODS:
+                errors[index] = {'p_value': f'The length of p_value must be {PERIODS}'}
+            validated_years.append(year_data)
+        if errors:
+            raise serializers.ValidationError({'years': errors})
+        labels = [year['year'] for year in attrs['years']]
+        if len(set(labels)) != len(labels):
+            raise serializers.ValidationError({'years': 'Every year must appear only once.'})
+        attrs['validated_years'] = sorted(validated_years, key=lambda year_data: year_data['year'])
+        return attrs
+
+
+class WBMultiYearRunSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WBMultiYearRun
+        fields = '__all__'
+
+
+class WBUncertaintyJobSerializer(WBMethodSerializer):
+    uncertainty = WBUncertaintySerializer()
+
+
+class WTFUncertaintyJobSerializer(WTFMethodSerializer):
+    uncertainty = WTFUncertaintySerializer()
+
+
+# Serializer validating the payload of each estimation job kind, at submission and again in the worker.
+JOB_SERIALIZERS = {
+    constants.JobKindChoices.ETO_BATCH: EtoBatchSerializer,
+    constants.JobKindChoices.WTF_BATCH: WTFBatchSerializer,
+    constants.JobKindChoices.WB_SCENARIOS: WBScenarioSweepSerializer,
+    constants.JobKindChoices.WB_SENSITIVITY: WBSensitivitySerializer,
+    constants.JobKindChoices.WB_UNCERTAINTY: WBUncertaintyJobSerializer,
+    constants.JobKindChoices.WTF_UNCERTAINTY: WTFUncertaintyJobSerializer,
+    constants.JobKindChoices.WB_MULTI_YEAR: WBMultiYearSerializer,
+}
+
+
+class EstimationJobSerializer(serializers.ModelSerializer):
+    payload = serializers.JSONField(write_only=True)
+
+    class Meta:
+        model = EstimationJob
+        fields = ['id', 'kind', 'status', 'progress', 'error', 'cancel_requested', 'created_at', 'started_at',
+                  'finished_at', 'expires_at', 'payload']
+        read_only_fields = ['status', 'progress', 'error', 'cancel_requested', 'started_at', 'finished_at',
+                            'expires_at']
+
+    def validate(self, attrs):
+        payload_serializer = JOB_SERIALIZERS[attrs['kind']](data=attrs['payload'])
+        if not payload_serializer.is_valid():
+            raise serializers.ValidationError({'payload': payload_serializer.errors})
+        return attrs
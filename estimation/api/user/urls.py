@@ -6,10 +6,18 @@ from estimation.api.user import views
 router = DefaultRouter()
 router.register('wtf-data', views.WTFMethodDataAPI)
 router.register('wb-data', views.WBMethodDataAPI)
+router.register('wb-multi-year-runs', views.WBMultiYearRunAPI)
+router.register('jobs', views.EstimationJobAPI)
 
 urlpatterns = [
     path('wtf/', views.WTFMethodAPIView.as_view()),
-    path('wb/', views.WBMethodAPIView.as_view())
+    path('wtf-batch/', views.WTFBatchAPIView.as_view()),
+    path('wb/', views.WBMethodAPIView.as_view()),
+    path('eto-batch/', views.EtoBatchAPIView.as_view()),
+    path('eto-compare/', views.EtoComparisonAPIView.as_view()),
+    path('wb-scenarios/', views.WBScenarioAPIView.as_view()),
+    path('wb-sensitivity/', views.WBSensitivityAPIView.as_view()),
+    path('wb-multi-year/', views.WBMultiYearAPIView.as_view()),
 ]
 
 urlpatterns += router.urls
@@ -1,37 +1,53 @@
-import decimal
-
+from django.db import transaction
+from django.utils.decorators import method_decorator
 from rest_framework import status, viewsets, mixins, response
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from Config import timing
 from coreapp.permissions import IsUser
 from . import serializers
-from .serializers import WTFMethodSerializer, WBMethodSerializer
+from .serializers import WTFMethodSerializer, WBMethodSerializer, EtoBatchSerializer, WBScenarioSweepSerializer, \
+    WTFBatchSerializer, WBSensitivitySerializer, EtoComparisonSerializer, WBMultiYearSerializer
 from .. import filters
 from ... import constants
-from ...models import WTFMethod, SPYieldData, QOutData, WBMethodData, EtoRsData, EtoShData, Temperature, CValue, PValue, \
-    TMeanValue, RHValue, CropCoefficient, RechargeRate, CurveNumber, SolarRadiation, LandUseArea, EtoData, OutFlow, \
-    QinData, ReWaterBody
-from ...utils import eto_methods
+from ...models import WTFMethod, WBMethodData, EstimationJob, WBMultiYearRun
+from ...utils import eto_methods, jobs, result_cache, tasks, uncertainty
 from ...utils.calculate_yearly_recharge import calculate_yearly_recharge
 from ...utils.eto_methods import hargreaves_method, eto_method_validation
-from ...utils.wb_method_utils import calculate_eto_method, calculate_wb_itself, calculate_wb
+from ...utils.persistence import save_wb_method_data, save_wtf_method
+from ...utils.wb_method_utils import calculate_eto_method, calculate_wb_itself
+from ...utils.wb_vectorized import adjust_land_use, calculate_wb
 from django_filters import rest_framework as dj_filter
 
 
+@method_decorator(transaction.non_atomic_requests, name='dispatch')
 class WTFMethodAPIView(APIView):
     serializer_class = WTFMethodSerializer
     permission_classes = [IsUser]
 
     def post(self, request, *args, **kwargs):
         serializer = WTFMethodSerializer(data=request.data)
-        if serializer.is_valid():
+        with timing.stage('validate'):
+            is_valid = serializer.is_valid()
+        if is_valid:
+            digest = result_cache.input_hash('wtf', serializer.validated_data)
+            cached_result = result_cache.get_result('wtf', digest)
+            if cached_result is not None:
+                record_id = result_cache.get_record_id('wtf', digest, request.user.pk)
+                with timing.stage('db'):
+                    if record_id is None or not WTFMethod.objects.filter(pk=record_id, user=request.user).exists():
+                        record_id = save_wtf_method(request.user, serializer.validated_data, cached_result).id
+                        result_cache.set_record_id('wtf', digest, request.user.pk, record_id)
+                return Response({'result': dict(cached_result, id=record_id), 'cache': result_cache.HIT},
+                                status=status.HTTP_200_OK)
             catchment_area = serializer.validated_data['catchment_area']
             wt_max = serializer.validated_data['wt_max']
             wt_min = serializer.validated_data['wt_min']
             num_layers = serializer.validated_data['num_layers']
             precipitation = serializer.validated_data.get('precipitation', None)
             q_out = serializer.validated_data['q_out']
-            q_in_data = serializer.validated_data['q_in']
+            q_in_data = serializer.validated_data.get('q_in')
             sp_yield_data = serializer.validated_data['sp_yield_data']
 
             for entry in q_out:
@@ -43,40 +59,65 @@ class WTFMethodAPIView(APIView):
                 entry['layer_height'] = float(entry['layer_height'])
                 entry['sp_yield_percentage'] = float(entry['sp_yield_percentage'])
 
-            result = calculate_yearly_recharge(catchment_area, wt_max, wt_min, num_layers, sp_yield_data, precipitation,
-                                               q_out, q_in_data)
+            with timing.stage('wtf'):
+                result = calculate_yearly_recharge(catchment_area, wt_max, wt_min, num_layers, sp_yield_data,
+                                                   precipitation, q_out, q_in_data or [])
 
             if 'error' in result:
                 return Response(result, status=status.HTTP_400_BAD_REQUEST)
 
-            wtf_data_object = WTFMethod.objects.create(user=self.request.user, catchment_area=catchment_area,
-                                                       wt_max=wt_max, wt_min=wt_min, num_layers=num_layers,
-                                                       is_precipitation_given=True, precipitation=precipitation,
-                                                       yearly_recharge=result['Recharge depth (mm)'],
-                                                       ratio=result['Yearly Recharge as a percentage of Precipitation'])
-
-            q_data_instances = [QOutData.objects.create(wtf=wtf_data_object, **entry) for entry in q_out]
-            sp_yield_data_instances = [SPYieldData.objects.create(wtf=wtf_data_object, **entry) for entry in
-                                       sp_yield_data]
-            if q_in_data is not None:
-                for data in q_in_data:
-                    q_in_data_instance = QinData.objects.create(value=data)
-                    wtf_data_object.q_in.add(q_in_data_instance)
-
-            wtf_data_object.save()
+            if serializer.validated_data.get('uncertainty') is not None:
+                result['uncertainty'] = uncertainty.wtf_uncertainty(serializer.validated_data,
+                                                                    serializer.validated_data['uncertainty'])
+            result_cache.set_result('wtf', digest, result)
+            with timing.stage('db'):
+                wtf_data_object = save_wtf_method(self.request.user, serializer.validated_data, result)
+            result_cache.set_record_id('wtf', digest, request.user.pk, wtf_data_object.id)
             result['id'] = wtf_data_object.id
-            return Response({'result': result}, status=status.HTTP_200_OK)
+            return Response({'result': result, 'cache': result_cache.MISS}, status=status.HTTP_200_OK)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@method_decorator(transaction.non_atomic_requests, name='dispatch')
+class WTFBatchAPIView(APIView):
+    serializer_class = WTFBatchSerializer
+    permission_classes = [IsUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = WTFBatchSerializer(data=request.data)
+        if serializer.is_valid():
+            try:
+                response_data = tasks.wtf_batch(request.user, serializer.validated_data)
+            except tasks.TaskError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(response_data, status=status.HTTP_200_OK)
+        else:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@method_decorator(transaction.non_atomic_requests, name='dispatch')
 class WBMethodAPIView(APIView):
     serializer_class = WBMethodSerializer
     permission_classes = [IsUser]
 
     def post(self, request, *args, **kwargs):
         serializer = WBMethodSerializer(data=request.data)
-        if serializer.is_valid():
+        with timing.stage('validate'):
+            is_valid = serializer.is_valid()
+        if is_valid:
+            digest = result_cache.input_hash('wb', serializer.validated_data)
+            cached_result = result_cache.get_result('wb', digest)
+            if cached_result is not None:
+                record_id = result_cache.get_record_id('wb', digest, request.user.pk)
+                with timing.stage('db'):
+                    if record_id is None or not WBMethodData.objects.filter(pk=record_id, user=request.user).exists():
+                        # Persist the land use as a miss does, with calculate_wb's a7 adjustment applied.
+                        adjust_land_use(serializer.validated_data['land_use_area'])
+                        record_id = save_wb_method_data(request.user, serializer.validated_data, cached_result,
+                                                        cached_result['eto_list']).id
+                        result_cache.set_record_id('wb', digest, request.user.pk, record_id)
+                return Response(dict(cached_result, id=record_id, cache=result_cache.HIT), status=status.HTTP_200_OK)
             catchment_area = serializer.validated_data.get('catchment_area')
             latitude = serializer.validated_data.get('latitude')
             elevation = serializer.validated_data.get('elevation')
@@ -101,8 +142,9 @@ class WBMethodAPIView(APIView):
             rf = serializer.validated_data.pop('rf', None)
             rf_option = serializer.validated_data.pop('rf_option', None)
             # process_land_use_data_with_cn_kc(land_use_area, kc_value, cn_value)
-            yeto, eto_list = calculate_eto_method(eto_method, latitude, elevation, eto_rs_data, eto_sh_data, c_value,
-                                                  p_value, solar_radiation, rh_value, temperature)
+            with timing.stage('eto'):
+                yeto, eto_list = calculate_eto_method(eto_method, latitude, elevation, eto_rs_data, eto_sh_data,
+                                                      c_value, p_value, solar_radiation, rh_value, temperature)
 
             #
             # v_ren = calculate_volumes(catchment_area, land_use_area, kc_value, cn_value, p_value, temperature, yeto)
@@ -110,121 +152,127 @@ class WBMethodAPIView(APIView):
 
             # recharge_data = calculate_wb_itself(catchment_area, land_use_area, kc_value, cn_value, p_value, temperature,
             #                                     eto_list, re_water_body, recharge_rate, outflow, rf, rf_option)
-            recharge_data = calculate_wb(catchment_area, land_use_area, kc_value, cn_value, p_value, temperature,
-                                         eto_list, re_water_body, recharge_rate, outflow, rf, rf_option)
-
-            wb_method_data = WBMethodData.objects.create(
-                user=self.request.user,
-                catchment_area=serializer.validated_data.get('catchment_area'),
-                latitude=serializer.validated_data.get('latitude'),
-                elevation=serializer.validated_data.get('elevation'), rlc=serializer.validated_data.get('rlc'), rp=rp,
-                classification=classification, eto_method=serializer.validated_data.get('eto_method'), rf=rf,
-                rf_option=rf_option,
-            )
-            if eto_list is not None:
-                for eto in eto_list:
-                    rounded_eto = round(decimal.Decimal(eto), 2)
-                    eto_list_instance = EtoData.objects.create(value=rounded_eto)
-                    wb_method_data.eto_list.add(eto_list_instance)
-
-            if temperature is not None:
-                for temp in temperature:
-                    temperature_instance = Temperature.objects.create(**temp)
-                    wb_method_data.temperature.add(temperature_instance)
-
-            if cn_value is not None:
-                for value in cn_value:
-                    cn_value_instance = CurveNumber.objects.create(**value)
-                    wb_method_data.cn_value.add(cn_value_instance)
-
-            if kc_value is not None:
-                for value in kc_value:
-                    kc_value_instance = CropCoefficient.objects.create(**value)
-                    wb_method_data.kc_value.add(kc_value_instance)
-
-            if c_value is not None:
-                for value in c_value:
-                    c_value_instance = CValue.objects.create(value=value)
-                    wb_method_data.c_value.add(c_value_instance)
-
-            if re_water_body is not None:
-                for value in re_water_body:
-                    re_water_body_instance = ReWaterBody.objects.create(value=value)
-                    wb_method_data.re_water_body.add(re_water_body_instance)
-
-            if eto_rs_data is not None:
-                for value in eto_rs_data:
-                    eto_rs_instance = EtoRsData.objects.create(**value)
-                    wb_method_data.eto_rs_data.add(eto_rs_instance)
-
-            if eto_sh_data is not None:
-                for value in eto_sh_data:
-                    eto_sh_instance = EtoShData.objects.create(**value)
-                    wb_method_data.eto_sh_data.add(eto_sh_instance)
-
-            if p_value is not None:
-                for value in p_value:
-                    p_value_instance = PValue.objects.create(value=value)
-                    wb_method_data.p_value.add(p_value_instance)
-
-            if t_mean_value is not None:
-                for value in t_mean_value:
-                    t_mean_value_instance = TMeanValue.objects.create(value=value)
-                    wb_method_data.t_mean_value.add(t_mean_value_instance)
-
-            if rh_value is not None:
-                for value in rh_value:
-                    rh_value_instance = RHValue.objects.create(value=value)
-                    wb_method_data.rh_value.add(rh_value_instance)
-
-            if recharge_rate is not None:
-                for value in recharge_rate:
-                    recharge_rate_instance = RechargeRate.objects.create(**value)
-                    wb_method_data.recharge_rate.add(recharge_rate_instance)
-
-            if solar_radiation is not None:
-                for value in solar_radiation:
-                    solar_radiation_instance = SolarRadiation.objects.create(value=value)
-                    wb_method_data.solar_radiation.add(solar_radiation_instance)
-
-            if land_use_area is not None:
-                for value in land_use_area:
-                    filtered_data = {key: value[key] for key in value.keys() if
-                                     key in ['a1', 'a2', 'a3', 'a4', 'a5', 'a6', 'a7']}
-                    land_use_area_instance = LandUseArea.objects.create(**filtered_data)
-                    wb_method_data.land_use_area.add(land_use_area_instance)
-            # recharge_data['id'] = wb_method_data.id
-
-            if outflow is not None:
-                for value in outflow:
-                    filtered_data = {key: value[key] for key in value.keys() if
-                                     key in ['out_dr', 'out_other']}
-                    land_use_area_instance = OutFlow.objects.create(**filtered_data)
-                    wb_method_data.outflow.add(land_use_area_instance)
-
-            wb_method_data.yearly_rainfall = round(recharge_data.get('Yearly Rainfall (mm)', 0), 1)
-            wb_method_data.yearly_recharge = round(recharge_data.get('Yearly Recharge (mm)', 0), 1)
-            wb_method_data.yearly_runoff = round(recharge_data.get('Yearly Runoff (mm)', 0), 1)
-            wb_method_data.yearly_recharge_percentage_precipitation = round(
-                recharge_data.get('Yearly Recharge as a percentage of Precipitation', 0), 1)
-            wb_method_data.yearly_runoff_percentage_rainfall = round(
-                recharge_data.get('Yearly Runoff as percentage of Rainfall', 0), 1)
-            wb_method_data.aridity_index = round(recharge_data.get('Aridity Index (AI)', 0), 1)
+            with timing.stage('wb'):
+                recharge_data = calculate_wb(catchment_area, land_use_area, kc_value, cn_value, p_value, temperature,
+                                             eto_list, re_water_body, recharge_rate, outflow, rf, rf_option)
+
+            wb_data = dict(serializer.validated_data, c_value=c_value, land_use_area=land_use_area, outflow=outflow,
+                           rf=rf, rf_option=rf_option)
+            with timing.stage('db'):
+                wb_method_data = save_wb_method_data(self.request.user, wb_data, recharge_data, eto_list)
             recharge_data['eto_list'] = [round(eto, 2) for eto in eto_list]
-            wb_method_data.save()
+            if serializer.validated_data.get('diagnostics'):
+                table = eto_methods.eto_diagnostic_table(eto_method, {
+                    'latitude': latitude, 'elevation': elevation, 'eto_sh_data': eto_sh_data, 'c_value': c_value,
+                    'solar_radiation': solar_radiation, 'rh_value': rh_value, 'temperature': temperature,
+                })
+                recharge_data['diagnostic_table'] = table.to_dict('records')
+            if serializer.validated_data.get('uncertainty') is not None and 'error' not in recharge_data:
+                recharge_data['uncertainty'] = uncertainty.wb_uncertainty(
+                    wb_data, eto_list, serializer.validated_data['uncertainty'])
+            if 'error' not in recharge_data:
+                result_cache.set_result('wb', digest, recharge_data)
+                result_cache.set_record_id('wb', digest, request.user.pk, wb_method_data.id)
             recharge_data['id'] = wb_method_data.id
+            recharge_data['cache'] = result_cache.MISS
             return Response(recharge_data, status=status.HTTP_200_OK)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@method_decorator(transaction.non_atomic_requests, name='dispatch')
+class EtoBatchAPIView(APIView):
+    serializer_class = EtoBatchSerializer
+    permission_classes = [IsUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = EtoBatchSerializer(data=request.data)
+        if serializer.is_valid():
+            try:
+                response_data = tasks.eto_batch(request.user, serializer.validated_data)
+            except tasks.TaskError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(response_data, status=status.HTTP_200_OK)
+        else:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@method_decorator(transaction.non_atomic_requests, name='dispatch')
+class EtoComparisonAPIView(APIView):
+    serializer_class = EtoComparisonSerializer
+    permission_classes = [IsUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = EtoComparisonSerializer(data=request.data)
+        if serializer.is_valid():
+            try:
+                response_data = tasks.eto_comparison(request.user, serializer.validated_data)
+            except tasks.TaskError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(response_data, status=status.HTTP_200_OK)
+        else:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@method_decorator(transaction.non_atomic_requests, name='dispatch')
+class WBScenarioAPIView(APIView):
+    serializer_class = WBScenarioSweepSerializer
+    permission_classes = [IsUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = WBScenarioSweepSerializer(data=request.data)
+        if serializer.is_valid():
+            try:
+                response_data = tasks.wb_scenarios(request.user, serializer.validated_data)
+            except tasks.TaskError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(response_data, status=status.HTTP_200_OK)
+        else:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@method_decorator(transaction.non_atomic_requests, name='dispatch')
+class WBSensitivityAPIView(APIView):
+    serializer_class = WBSensitivitySerializer
+    permission_classes = [IsUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = WBSensitivitySerializer(data=request.data)
+        if serializer.is_valid():
+            try:
+                response_data = tasks.wb_sensitivity(request.user, serializer.validated_data)
+            except tasks.TaskError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(response_data, status=status.HTTP_200_OK)
+        else:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@method_decorator(transaction.non_atomic_requests, name='dispatch')
+class WBMultiYearAPIView(APIView):
+    serializer_class = WBMultiYearSerializer
+    permission_classes = [IsUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = WBMultiYearSerializer(data=request.data)
+        if serializer.is_valid():
+            try:
+                response_data = tasks.wb_multi_year(request.user, serializer.validated_data)
+            except tasks.TaskError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(response_data, status=status.HTTP_200_OK)
+        else:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
 class WTFMethodDataAPI(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.RetrieveModelMixin):
     serializer_class = serializers.WTFDataSerializer
     permission_classes = [IsUser]
     queryset = WTFMethod.objects.all()
 
     def get_queryset(self):
-        queryset = WTFMethod.objects.filter(user=self.request.user)
+        queryset = WTFMethod.objects.filter(user=self.request.user).prefetch_related(
+            'q_in', 'wtf_q_out_data', 'sp_yield_data')
         return queryset
 
 
@@ -236,5 +284,52 @@ class WBMethodDataAPI(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.Ret
     filterset_class = filters.WBFilter
 
     def get_queryset(self):
-        queryset = WBMethodData.objects.filter(user=self.request.user)
+        queryset = WBMethodData.objects.filter(user=self.request.user).prefetch_related(
+            'temperature', 'kc_value', 'cn_value', 'eto_rs_data', 'eto_sh_data', 'land_use_area', 'recharge_rate',
+            'outflow')
         return queryset
+
+
+class WBMultiYearRunAPI(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.RetrieveModelMixin):
+    serializer_class = serializers.WBMultiYearRunSerializer
+    permission_classes = [IsUser]
+    queryset = WBMultiYearRun.objects.all()
+
+    def get_queryset(self):
+        return WBMultiYearRun.objects.filter(user=self.request.user)
+
+
+class EstimationJobAPI(viewsets.GenericViewSet, mixins.CreateModelMixin, mixins.ListModelMixin,
+                       mixins.RetrieveModelMixin):
+    serializer_class = serializers.EstimationJobSerializer
+    permission_classes = [IsUser]
+    queryset = EstimationJob.objects.all()
+
+    def get_queryset(self):
+        return EstimationJob.objects.filter(user=self.request.user).defer('payload', 'result')
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save(user=request.user)
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+        else:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=True, methods=['get'])
+    def result(self, request, *args, **kwargs):
+        job = self.get_object()
+        if job.status != constants.JobStatusChoices.SUCCEEDED:
+            return Response({'error': f'Job is {job.get_status_display().lower()}', 'status': job.status},
+                            status=status.HTTP_409_CONFLICT)
+        return Response(EstimationJob.objects.values_list('result', flat=True).get(id=job.id),
+                        status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, *args, **kwargs):
+        job = self.get_object()
+        if not jobs.cancel_job(job):
+            return Response({'error': f'Job is already {job.get_status_display().lower()}'},
+                            status=status.HTTP_409_CONFLICT)
+        job.refresh_from_db(fields=['status', 'cancel_requested', 'finished_at', 'expires_at', 'updated_at'])
+        return Response(self.get_serializer(job).data, status=status.HTTP_200_OK)
@@ -27,3 +27,21 @@ class ClassificationChoices(models.IntegerChoices):
     SEMI_ARID = 2, _("Semi-arid (500 < P < 1000)")
     SEMI_HUMID = 3, _("Semi-humid (1000 < P < 1500)")
     HUMID = 4, _("Humid (P > 1500)")
+
+
+class JobKindChoices(models.IntegerChoices):
+    ETO_BATCH = 1, _("ETo batch")
+    WTF_BATCH = 2, _("WTF batch")
+    WB_SCENARIOS = 3, _("WB scenario sweep")
+    WB_SENSITIVITY = 4, _("WB sensitivity")
+    WB_UNCERTAINTY = 5, _("WB uncertainty")
+    WTF_UNCERTAINTY = 6, _("WTF uncertainty")
+    WB_MULTI_YEAR = 7, _("WB multi-year simulation")
+
+
+class JobStatusChoices(models.IntegerChoices):
+    PENDING = 0, _("Pending")
+    RUNNING = 1, _("Running")
+    SUCCEEDED = 2, _("Succeeded")
+    FAILED = 3, _("Failed")
+    CANCELLED = 4, _("Cancelled")
@@ -0,0 +1,59 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from estimation.utils import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the ETo methods and the WB and WTF calculators on the data/ fixtures.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-sizes', type=int, nargs='+', default=list(benchmark.DEFAULT_BATCH_SIZES),
+                            help='Batch sizes to run every case at; 1 uses the single-request entry points.')
+        parser.add_argument('--repeat', type=int, default=benchmark.DEFAULT_REPEAT,
+                            help='Timed calls per case and batch size.')
+        parser.add_argument('--case', action='append', dest='cases',
+                            help='Only run cases whose name contains this text (e.g. eto/, wb/, hargreaves); '
+                                 'may be repeated.')
+        parser.add_argument('--output', help='Write the run as JSON to this file, to be used as a baseline.')
+        parser.add_argument('--baseline', help='Compare the median latencies with a JSON run saved earlier.')
+        parser.add_argument('--threshold', type=float, default=benchmark.DEFAULT_THRESHOLD,
+                            help='Slowdown ratio over the baseline reported as a regression.')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exit with an error when any case regressed against the baseline.')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1 or min(options['batch_sizes']) < 1:
+            raise CommandError('--repeat and --batch-sizes must be positive')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        self.stdout.write(f'{"case":<60} {"batch":>6} {"median ms":>10} {"p95 ms":>10} {"items/s":>12} '
+                          f'{"peak KiB":>9}')
+        run = benchmark.run_benchmarks(options['batch_sizes'], options['repeat'], options['cases'],
+                                       report=self.write_row)
+        if not run['results']:
+            raise CommandError('No benchmark case matched')
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(run, output, indent=2)
+            self.stdout.write(f'Saved {len(run["results"])} results to {options["output"]}')
+
+        if baseline is not None:
+            regressions = benchmark.compare(run, baseline, options['threshold'])
+            for row in regressions:
+                self.stdout.write(self.style.WARNING(
+                    f'{row["case"]} [batch {row["batch_size"]}]: {row["baseline_ms"]:.3f} ms -> '
+                    f'{row["current_ms"]:.3f} ms ({row["ratio"]:.2f}x)'))
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS(f'No regressions over {options["threshold"]:.2f}x the baseline'))
+            elif options['fail_on_regression']:
+                raise CommandError(f'{len(regressions)} benchmark regressions')
+
+    def write_row(self, row):
+        self.stdout.write(f'{row["case"]:<60} {row["batch_size"]:>6} {row["median_ms"]:>10.3f} '
+                          f'{row["p95_ms"]:>10.3f} {row["throughput"] or 0:>12.0f} {row["peak_kib"]:>9.1f}')
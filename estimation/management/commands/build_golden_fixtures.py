@@ -0,0 +1,20 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from estimation.utils import golden
+
+
+class Command(BaseCommand):
+    help = 'Convert the reference ETo workbooks in data/*.xlsx to the JSON fixtures of the golden regression tests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', help='Directory to write the fixtures to (data/golden/ by default).')
+
+    def handle(self, *args, **options):
+        try:
+            paths = golden.build_golden_fixtures(Path(options['output_dir']) if options['output_dir'] else None)
+        except ImportError as error:
+            raise CommandError(f'Reading the workbooks needs pandas and openpyxl: {error}')
+        for path in paths:
+            self.stdout.write(f'Wrote {path}')
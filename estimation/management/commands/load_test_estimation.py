@@ -0,0 +1,48 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from estimation.utils import load_test
+
+
+class Command(BaseCommand):
+    help = 'Replay the data/ fixtures against the estimation API and report latency, throughput, queries and errors.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', action='append', dest='endpoints', choices=list(load_test.ENDPOINTS),
+                            help='Endpoint to load; may be repeated. Defaults to all of them.')
+        parser.add_argument('--requests', type=int, default=load_test.DEFAULT_REQUESTS,
+                            help='Requests sent to each endpoint.')
+        parser.add_argument('--concurrency', type=int, default=load_test.DEFAULT_CONCURRENCY,
+                            help='Number of concurrent clients.')
+        parser.add_argument('--url', help='Base URL of a running server (e.g. http://127.0.0.1:8000); by default '
+                                          'the requests run in this process against the configured database.')
+        parser.add_argument('--token', help='API token to authenticate with; by default a load-test user and its '
+                                            'token are created in the configured database.')
+        parser.add_argument('--cache-hits', action='store_true',
+                            help='Replay identical WB and WTF payloads so repeated requests are served from the result '
+                                 'cache.')
+        parser.add_argument('--output', help='Write the report as JSON to this file.')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be positive')
+        token = options['token'] or load_test.load_test_token()
+        report = load_test.run_load_test(token, options['endpoints'] or tuple(load_test.ENDPOINTS),
+                                         options['requests'], options['concurrency'], options['url'],
+                                         options['cache_hits'])
+
+        self.stdout.write(f'{"endpoint":<10} {"requests":>8} {"errors":>7} {"p50 ms":>9} {"p95 ms":>9} '
+                          f'{"p99 ms":>9} {"req/s":>8} {"queries":>8}')
+        for row in report['endpoints']:
+            queries = '-' if row['queries_mean'] is None else f'{row["queries_mean"]:.1f}'
+            self.stdout.write(f'{row["endpoint"]:<10} {row["requests"]:>8} {row["errors"]:>7} {row["p50_ms"]:>9.2f} '
+                              f'{row["p95_ms"]:>9.2f} {row["p99_ms"]:>9.2f} {row["throughput"] or 0:>8.1f} '
+                              f'{queries:>8}')
+        self.stdout.write(f'{report["requests"]} requests in {report["elapsed_s"]:.2f} s '
+                          f'({report["throughput"] or 0:.1f} req/s, concurrency {report["concurrency"]})')
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f'Saved the report to {options["output"]}')
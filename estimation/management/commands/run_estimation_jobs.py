@@ -0,0 +1,76 @@
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from estimation.constants import JobStatusChoices
+from estimation.utils import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued estimation jobs in a local process pool, using the database as the queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.ESTIMATION_JOB_WORKERS,
+                            help='Size of the process pool; 0 runs jobs one at a time in this process.')
+        parser.add_argument('--poll-interval', type=float, default=settings.ESTIMATION_JOB_POLL_INTERVAL,
+                            help='Seconds to wait between queue polls while idle.')
+        parser.add_argument('--once', action='store_true', help='Exit as soon as the queue is empty.')
+
+    def handle(self, *args, **options):
+        self.worker = f'{socket.gethostname()}:{os.getpid()}'
+        self.poll_interval = options['poll_interval']
+        self.once = options['once']
+        self.stdout.write(f'Estimation job worker {self.worker} started with {options["processes"]} processes')
+        if options['processes'] == 0:
+            self.run_inline()
+        else:
+            self.run_pool(options['processes'])
+
+    def housekeeping(self):
+        requeued = jobs.requeue_stale_jobs()
+        evicted = jobs.evict_expired_jobs()
+        if requeued or evicted:
+            self.stdout.write(f'Re-queued or cancelled {requeued} stale jobs, evicted {evicted} expired jobs')
+
+    def run_inline(self):
+        while True:
+            self.housekeeping()
+            claimed = jobs.claim_jobs(self.worker, 1)
+            if claimed:
+                self.stdout.write(f'Job {jobs.execute_job(claimed[0])} finished')
+            elif self.once:
+                return
+            else:
+                time.sleep(self.poll_interval)
+
+    def run_pool(self, processes):
+        # Children start from a fresh interpreter and open their own database connections.
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=django.setup) as pool:
+            running = {}
+            while True:
+                self.housekeeping()
+                for job_id in jobs.claim_jobs(self.worker, processes - len(running)):
+                    running[pool.submit(jobs.execute_job, job_id)] = job_id
+                if not running:
+                    if self.once:
+                        return
+                    time.sleep(self.poll_interval)
+                    continue
+                done, _ = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = running.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        # The child died before it could record the outcome (e.g. it was killed).
+                        jobs.finish_job(job_id, JobStatusChoices.FAILED, error=f'{type(e).__name__}: {e}')
+                    self.stdout.write(f'Job {job_id} finished')
@@ -0,0 +1,117 @@
+# Generated by Django 5.0 on 2026-10-18 13:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estimation', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutFlow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('out_dr', models.FloatField(default=0)),
+                ('out_other', models.FloatField(default=0)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='QinData',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('value', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ReWaterBody',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.FloatField()),
+            ],
+        ),
+        migrations.RemoveField(
+            model_name='rechargerate',
+            name='re_previous',
+        ),
+        migrations.RemoveField(
+            model_name='rechargerate',
+            name='re_water_body',
+        ),
+        migrations.AddField(
+            model_name='rechargerate',
+            name='re_cr',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='rechargerate',
+            name='re_other',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='rechargerate',
+            name='re_pa',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='rechargerate',
+            name='re_ro',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='wbmethoddata',
+            name='rf',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='wbmethoddata',
+            name='rf_option',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='wbmethoddata',
+            name='outflow',
+            field=models.ManyToManyField(blank=True, related_name='wb_outflow', to='estimation.outflow'),
+        ),
+        migrations.AddField(
+            model_name='wtfmethod',
+            name='q_in',
+            field=models.ManyToManyField(blank=True, related_name='wtf_q_in_data', to='estimation.qindata'),
+        ),
+        migrations.CreateModel(
+            name='QOutData',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('pump', models.FloatField()),
+                ('base', models.FloatField()),
+                ('gw_out', models.FloatField()),
+                ('wtf', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wtf_q_out_data', to='estimation.wtfmethod')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='wbmethoddata',
+            name='re_water_body',
+            field=models.ManyToManyField(blank=True, related_name='wb_water_body', to='estimation.rewaterbody'),
+        ),
+        migrations.DeleteModel(
+            name='QData',
+        ),
+    ]
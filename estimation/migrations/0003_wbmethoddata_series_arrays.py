@@ -0,0 +1,80 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+
+# WBMethodData field -> model that held one row per period before the series were stored as JSON arrays
+SERIES_MODELS = {
+    'c_value': 'CValue',
+    'p_value': 'PValue',
+    'rh_value': 'RHValue',
+    'solar_radiation': 'SolarRadiation',
+    't_mean_value': 'TMeanValue',
+    're_water_body': 'ReWaterBody',
+    'eto_list': 'EtoData',
+}
+
+
+def array_field(field):
+    return f'{field}_array'
+
+
+def copy_series_to_arrays(apps, schema_editor):
+    WBMethodData = apps.get_model('estimation', 'WBMethodData')
+    for wb_method_data in WBMethodData.objects.prefetch_related(*SERIES_MODELS).iterator(chunk_size=500):
+        for field in SERIES_MODELS:
+            values = [item.value for item in sorted(getattr(wb_method_data, field).all(), key=lambda item: item.pk)]
+            setattr(wb_method_data, array_field(field),
+                    [float(value) if value is not None else None for value in values])
+        wb_method_data.save(update_fields=[array_field(field) for field in SERIES_MODELS])
+
+
+def copy_arrays_to_series(apps, schema_editor):
+    WBMethodData = apps.get_model('estimation', 'WBMethodData')
+    for wb_method_data in WBMethodData.objects.iterator(chunk_size=500):
+        for field, model_name in SERIES_MODELS.items():
+            model = apps.get_model('estimation', model_name)
+            values = getattr(wb_method_data, array_field(field)) or []
+            if field == 'eto_list':
+                values = [round(Decimal(value), 2) if value is not None else None for value in values]
+            created = model.objects.bulk_create([model(value=value) for value in values])
+            getattr(wb_method_data, field).add(*created)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estimation', '0002_outflow_qindata_rewaterbody_and_more'),
+    ]
+
+    operations = [
+        *[
+            migrations.AddField(
+                model_name='wbmethoddata',
+                name=array_field(field),
+                field=models.JSONField(blank=True, default=list),
+            )
+            for field in SERIES_MODELS
+        ],
+        migrations.RunPython(copy_series_to_arrays, copy_arrays_to_series),
+        *[
+            migrations.RemoveField(
+                model_name='wbmethoddata',
+                name=field,
+            )
+            for field in SERIES_MODELS
+        ],
+        *[
+            migrations.RenameField(
+                model_name='wbmethoddata',
+                old_name=array_field(field),
+                new_name=field,
+            )
+            for field in SERIES_MODELS
+        ],
+        *[
+            migrations.DeleteModel(
+                name=model_name,
+            )
+            for model_name in SERIES_MODELS.values()
+        ],
+    ]
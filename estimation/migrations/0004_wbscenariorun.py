@@ -0,0 +1,31 @@
+# Generated by Django 5.0 on 2026-10-18 13:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estimation', '0003_wbmethoddata_series_arrays'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WBScenarioRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('scenarios', models.JSONField(blank=True, default=list)),
+                ('results', models.JSONField(blank=True, default=list)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('wb_method_data', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scenario_runs', to='estimation.wbmethoddata')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
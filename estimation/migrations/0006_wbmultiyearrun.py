@@ -0,0 +1,41 @@
+# Generated by Django 5.0 on 2026-10-18 14:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estimation', '0005_estimationjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='estimationjob',
+            name='kind',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'ETo batch'), (2, 'WTF batch'), (3, 'WB scenario sweep'), (4, 'WB sensitivity'), (5, 'WB uncertainty'), (6, 'WTF uncertainty'), (7, 'WB multi-year simulation')]),
+        ),
+        migrations.CreateModel(
+            name='WBMultiYearRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('eto_method', models.CharField(choices=[(1, 'Fao combined pm method'), (2, 'PM SH method)'), (3, 'PM no sh and rs method'), (4, 'FAO Blaney-Criddle method'), (5, 'Makkink method'), (6, 'Hargreaves method'), (7, 'Hansen method'), (8, 'Turc method'), (9, 'Priestly taylor method'), (10, 'Jensen haise method'), (11, 'Abtew method'), (12, 'De bruin method')], max_length=100)),
+                ('catchment_area', models.FloatField(blank=True, null=True)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('elevation', models.FloatField(blank=True, null=True)),
+                ('years', models.JSONField(blank=True, default=list)),
+                ('yeto', models.JSONField(blank=True, default=list)),
+                ('results', models.JSONField(blank=True, default=dict)),
+                ('summary', models.JSONField(blank=True, default=dict)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wb_multi_year_runs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -91,39 +91,11 @@ class RechargeRate(BaseModel):
     re_other = models.FloatField(default=0)
 
 
-class SolarRadiation(models.Model):
-    value = models.FloatField()
-
-
-class ReWaterBody(models.Model):
-    value = models.FloatField()
-
-
-class RHValue(models.Model):
-    value = models.FloatField()
-
-
-class CValue(models.Model):
-    value = models.FloatField()
-
-
-class PValue(models.Model):
-    value = models.FloatField()
-
-
-class TMeanValue(models.Model):
-    value = models.FloatField()
-
-
 class OutFlow(BaseModel):
     out_dr = models.FloatField(default=0)
     out_other = models.FloatField(default=0)
 
 
-class EtoData(BaseModel):
-    value = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
-
-
 class WBMethodData(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     catchment_area = models.FloatField(blank=True, null=True)
@@ -132,7 +104,7 @@ class WBMethodData(models.Model):
     rf = models.FloatField(blank=True, null=True)
     rf_option = models.BooleanField(default=False)
     outflow = models.ManyToManyField(OutFlow, blank=True, related_name='wb_outflow')
-    re_water_body = models.ManyToManyField(ReWaterBody, blank=True, related_name='wb_water_body')
+    re_water_body = models.JSONField(default=list, blank=True)
     classification = models.CharField(max_length=100, choices=constants.ClassificationChoices.choices, blank=True,
                                       null=True)
     eto_method = models.CharField(max_length=100, choices=constants.ETO_METHOD_CHOICES)
@@ -145,11 +117,11 @@ class WBMethodData(models.Model):
     eto_sh_data = models.ManyToManyField('EtoShData', blank=True, related_name='wb_eto_sh_data')
     land_use_area = models.ManyToManyField('LandUseArea', blank=True, related_name='wb_land_use_area')
     recharge_rate = models.ManyToManyField('RechargeRate', blank=True, related_name='wb_recharge_rate')
-    c_value = models.ManyToManyField(CValue, blank=True, related_name='wb_c_value')
-    p_value = models.ManyToManyField(PValue, blank=True, related_name='wb_p_value')
-    rh_value = models.ManyToManyField(RHValue, blank=True, related_name='wb_rh_value')
-    solar_radiation = models.ManyToManyField(SolarRadiation, blank=True, related_name='wb_solar_radiation')
-    t_mean_value = models.ManyToManyField(TMeanValue, blank=True, related_name='wb_t_mean_value')
+    c_value = models.JSONField(default=list, blank=True)
+    p_value = models.JSONField(default=list, blank=True)
+    rh_value = models.JSONField(default=list, blank=True)
+    solar_radiation = models.JSONField(default=list, blank=True)
+    t_mean_value = models.JSONField(default=list, blank=True)
     yearly_rainfall = models.FloatField(null=True, blank=True)
     yearly_recharge = models.FloatField(null=True, blank=True)
     yearly_runoff = models.FloatField(null=True, blank=True)
@@ -157,4 +129,44 @@ class WBMethodData(models.Model):
     yearly_runoff_percentage_rainfall = models.FloatField(null=True, blank=True)
     aridity_index = models.FloatField(null=True, blank=True)
     yeto = models.FloatField(null=True, blank=True)
-    eto_list = models.ManyToManyField(EtoData, blank=True, related_name='wb_eto_list')
+    eto_list = models.JSONField(default=list, blank=True)
+
+
+class WBScenarioRun(BaseModel):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    wb_method_data = models.ForeignKey(WBMethodData, on_delete=models.CASCADE, related_name='scenario_runs')
+    scenarios = models.JSONField(default=list, blank=True)
+    results = models.JSONField(default=list, blank=True)
+
+
+class WBMultiYearRun(BaseModel):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='wb_multi_year_runs')
+    eto_method = models.CharField(max_length=100, choices=constants.ETO_METHOD_CHOICES)
+    catchment_area = models.FloatField(blank=True, null=True)
+    latitude = models.FloatField(blank=True, null=True)
+    elevation = models.FloatField(blank=True, null=True)
+    # One value per simulated year, in the order of `years`.
+    years = models.JSONField(default=list, blank=True)
+    yeto = models.JSONField(default=list, blank=True)
+    results = models.JSONField(default=dict, blank=True)
+    summary = models.JSONField(default=dict, blank=True)
+
+
+class EstimationJob(BaseModel):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='estimation_jobs')
+    kind = models.PositiveSmallIntegerField(choices=constants.JobKindChoices.choices)
+    status = models.PositiveSmallIntegerField(choices=constants.JobStatusChoices.choices,
+                                              default=constants.JobStatusChoices.PENDING)
+    payload = models.JSONField(default=dict)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    progress = models.FloatField(default=0)
+    cancel_requested = models.BooleanField(default=False)
+    worker = models.CharField(max_length=255, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        ordering = ('-created_at',)
+        indexes = [models.Index(fields=['status', 'created_at'])]
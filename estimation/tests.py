@@ -1,3 +1,896 @@
-from django.test import TestCase
+import contextlib
+import copy
+import io
+import json
+import tempfile
+from datetime import timedelta
+from pathlib import Path
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, DEFAULT_DB_ALIAS
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from Config import query_profile
+from coreapp.models import User
+from estimation import constants
+from estimation.api.user.serializers import WBMethodDataSerializer
+from estimation.models import WTFMethod, QOutData, SPYieldData, QinData, WBMethodData, WBScenarioRun, EstimationJob, \
+    WBMultiYearRun
+from estimation.utils import astronomy, benchmark, eto_methods, eto_vectorized, golden, jobs, load_test, \
+    persistence, resolution, result_cache, uncertainty, wb_method_utils, wb_vectorized, wtf_vectorized
+from estimation.utils.calculate_yearly_recharge import calculate_yearly_recharge
+
+ETO_FIXTURES = {
+    constants.ETO_METHOD_CHOICES.FAO_COMBINED_PM_METHOD: 'FAO_Combined_PM_Method_Full_DATA.json',
+    constants.ETO_METHOD_CHOICES.PM_SH: 'pm_sh_data.json',
+    constants.ETO_METHOD_CHOICES.MAKKINK_METHOD: 'makkink_method_output.json',
+    constants.ETO_METHOD_CHOICES.HARGREAVES_METHOD: 'hargreaves_data.json',
+    constants.ETO_METHOD_CHOICES.HANSEN_METHOD: 'hansen_method_data.json',
+    constants.ETO_METHOD_CHOICES.TURC_METHOD: 'turc_method_data.json',
+    constants.ETO_METHOD_CHOICES.PRIESTLEY_TAYLOR_METHOD: 'priestly_taylor_data.json',
+    constants.ETO_METHOD_CHOICES.JENSEN_HAISE_METHOD: 'jensen_haise_method_data.json',
+    constants.ETO_METHOD_CHOICES.ABTEW_METHOD: 'abtew_method_11_data.json',
+    # The Hargreaves fixture also carries the latitude, c_value and p_value Blaney-Criddle needs.
+    constants.ETO_METHOD_CHOICES.FAO_BLANEY_CRIDDLE_METHOD: 'hargreaves_data.json',
+}
+
+SCALAR_ETO_METHODS = {
+    constants.ETO_METHOD_CHOICES.FAO_COMBINED_PM_METHOD: lambda d: eto_methods.fao_combined_pm_method(
+        d['latitude'], d['elevation'], d['eto_rs_data'], d['temperature']),
+    constants.ETO_METHOD_CHOICES.PM_SH: lambda d: eto_methods.pm_method_sh(
+        d['latitude'], d['elevation'], d['eto_sh_data'], d['temperature']),
+    constants.ETO_METHOD_CHOICES.MAKKINK_METHOD: lambda d: eto_methods.makkink_method(
+        d['latitude'], d['elevation'], d['solar_radiation'], d['temperature']),
+    constants.ETO_METHOD_CHOICES.FAO_BLANEY_CRIDDLE_METHOD: lambda d: eto_methods.fao_blaney_criddle_method(
+        d['latitude'], d['c_value'], d['temperature'], d['p_value']),
+    constants.ETO_METHOD_CHOICES.HARGREAVES_METHOD: lambda d: eto_methods.hargreaves_method(
+        d['latitude'], d['temperature']),
+    constants.ETO_METHOD_CHOICES.HANSEN_METHOD: lambda d: eto_methods.hansen_method(
+        d['latitude'], d['elevation'], d['solar_radiation'], d['temperature']),
+    constants.ETO_METHOD_CHOICES.TURC_METHOD: lambda d: eto_methods.turc_method(
+        d['solar_radiation'], d['rh_value'], d['temperature']),
+    constants.ETO_METHOD_CHOICES.PRIESTLEY_TAYLOR_METHOD: lambda d: eto_methods.priestley_taylor_method(
+        d['latitude'], d['elevation'], d['solar_radiation'], d['temperature']),
+    constants.ETO_METHOD_CHOICES.JENSEN_HAISE_METHOD: lambda d: eto_methods.jensen_haise_method(
+        d['c_value'], d['solar_radiation'], d['temperature']),
+    constants.ETO_METHOD_CHOICES.ABTEW_METHOD: lambda d: eto_methods.abtew_method(
+        d['c_value'], d['solar_radiation']),
+    constants.ETO_METHOD_CHOICES.PM_NO_SH_RS: lambda d: eto_methods.pm_method_no_rs_sh(
+        d['latitude'], d['elevation'], d['eto_sh_data'], d['temperature']),
+    constants.ETO_METHOD_CHOICES.DE_BRUIN_METHOD: lambda d: eto_methods.de_bruin_method(
+        d['solar_radiation'], d['temperature'], d['latitude'], d['elevation'], d['c_value']),
+}
+
+
+def load_fixture(name):
+    with open(settings.BASE_DIR / 'data' / name) as fixture:
+        return json.load(fixture)
+
+
+def climate_data(**fields):
+    """
+    Climate data from the ETo fixtures with the inputs of every method except the empirical coefficient.
+    """
+    fao = load_fixture('FAO_Combined_PM_Method_Full_DATA.json')
+    turc = load_fixture('turc_method_data.json')
+    return dict({
+        'latitude': fao['latitude'], 'elevation': fao['elevation'], 'temperature': fao['temperature'],
+        'eto_rs_data': fao['eto_rs_data'], 'eto_sh_data': load_fixture('pm_sh_data.json')['eto_sh_data'],
+        'solar_radiation': turc['solar_radiation'], 'rh_value': turc['rh_value'],
+    }, **fields)
+
+
+class VectorizedEtoTest(SimpleTestCase):
+    def test_matches_scalar_methods_on_fixtures(self):
+        for eto_method, fixture in ETO_FIXTURES.items():
+            with self.subTest(eto_method=eto_method):
+                data = load_fixture(fixture)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    expected_yeto, expected_list = SCALAR_ETO_METHODS[eto_method](data)
+                yeto, eto_list = eto_vectorized.calculate_eto(eto_method, data)
+                self.assertAlmostEqual(yeto, expected_yeto, places=9)
+                self.assertEqual(len(eto_list), len(expected_list))
+                for value, expected in zip(eto_list, expected_list):
+                    self.assertAlmostEqual(value, expected, places=9)
+
+    def test_batch_matches_single_station(self):
+        data = load_fixture('hargreaves_data.json')
+        stations = [dict(data, latitude=latitude) for latitude in (-30.5, 0.0, 24.4, 45.1)]
+        yeto, eto = eto_vectorized.calculate_eto_batch(constants.ETO_METHOD_CHOICES.HARGREAVES_METHOD, stations)
+        self.assertEqual(eto.shape, (4, 36))
+        for index, station in enumerate(stations):
+            expected_yeto, expected_list = eto_vectorized.calculate_eto(
+                constants.ETO_METHOD_CHOICES.HARGREAVES_METHOD, station)
+            self.assertAlmostEqual(yeto[index], expected_yeto, places=9)
+            self.assertEqual(eto[index].tolist(), expected_list)
+
+
+class GoldenOutputTest(SimpleTestCase):
+    """
+    Every ETo engine against the reference workbooks, per period, within each case's tolerance.
+    """
+    def assertMatchesWorkbook(self, eto_list, fixture):
+        expected = golden.expected_eto(fixture)
+        self.assertEqual(len(eto_list), len(expected))
+        for period, (value, reference) in enumerate(zip(eto_list, expected)):
+            self.assertLessEqual(abs(value - reference), fixture['tolerance'], f'period {period}')
+
+    def engines(self, eto_method, data):
+        def scalar():
+            with contextlib.redirect_stdout(io.StringIO()):
+                return SCALAR_ETO_METHODS[eto_method](data)[1]
+
+        return {
+            'scalar': scalar,
+            'vectorized': lambda: eto_vectorized.calculate_eto(eto_method, data)[1],
+            'batch': lambda: eto_vectorized.calculate_eto_batch(eto_method, [data, data])[1][1],
+            'comparison': lambda: eto_vectorized.compare_eto_methods([eto_method], data)[1][0],
+        }
+
+    def test_every_workbook_has_a_fixture(self):
+        fixtures = golden.load_golden_fixtures()
+        self.assertEqual(set(fixtures), set(golden.GOLDEN_CASES))
+        self.assertIs(golden.load_golden_fixtures(), fixtures)
+        for name, fixture in fixtures.items():
+            self.assertEqual(len(golden.expected_eto(fixture)), eto_vectorized.PERIODS, name)
+
+    def test_engines_match_the_workbooks(self):
+        for name, fixture in golden.load_golden_fixtures().items():
+            for engine, calculate in self.engines(fixture['eto_method'], fixture['data']).items():
+                with self.subTest(case=name, engine=engine):
+                    self.assertMatchesWorkbook(list(calculate()), fixture)
+
+
+class AstronomyCacheTest(SimpleTestCase):
+    def test_tables_are_shared_per_quantized_latitude(self):
+        table = astronomy.astronomy_table(24.4)
+        self.assertIs(astronomy.astronomy_table(24.400001), table)
+        self.assertIsNot(astronomy.astronomy_table(24.4, astronomy.HARGREAVES), table)
+        self.assertEqual(table.ra.shape, (36,))
+        self.assertFalse(table.ra.flags.writeable)
+
+    def test_arrays_stack_station_latitudes(self):
+        tables = astronomy.astronomy_arrays([10.0, 24.4])
+        self.assertEqual(tables.ws.shape, (2, 36))
+        self.assertEqual(tables.ws[1].tolist(), astronomy.astronomy_table(24.4).ws.tolist())
+
+
+class ClimateContextTest(SimpleTestCase):
+    def test_intermediates_are_memoized(self):
+        climate = eto_vectorized.ClimateContext.from_data(climate_data(c_value=[0.5] * 36))
+        self.assertIs(climate.t_mean, climate.t_mean)
+        self.assertIs(climate.delta(237.3, 237.3), climate.delta(237.3, 237.3))
+        self.assertIsNot(climate.delta(237.2, 237.3), climate.delta(237.3, 237.3))
+        inputs = eto_vectorized.kernel_inputs(constants.ETO_METHOD_CHOICES.HARGREAVES_METHOD, climate.data, climate)
+        self.assertIs(inputs['t_max'], climate.t_max)
+
+    def test_shared_context_gives_the_same_results(self):
+        data = climate_data(c_value=[0.5] * 36)
+        climate = eto_vectorized.ClimateContext.from_data(data)
+        for eto_method in constants.ETO_METHOD_CHOICES.values:
+            with self.subTest(eto_method=eto_method):
+                yeto, eto = eto_vectorized.calculate_eto(eto_method, data)
+                shared_yeto, shared_eto = eto_vectorized.calculate_eto(eto_method, data, climate)
+                self.assertEqual(yeto, shared_yeto)
+                self.assertEqual(eto, shared_eto)
+
+
+def daily_series(data, periods=365):
+    """
+    Expand every per-period series of dekadal request data to daily values, each day repeating its dekad.
+    """
+    days = np.repeat(np.arange(36), resolution.dekad_lengths(periods))
+    return {field: [value[index] for index in days] if isinstance(value, list) else value
+            for field, value in data.items()}
+
+
+class ResolutionTest(SimpleTestCase):
+    def test_aggregation_to_dekads(self):
+        self.assertEqual(resolution.to_dekads(np.ones(365)).tolist(), [1.0] * 36)
+        leap = resolution.to_dekads(np.arange(366))
+        # The third dekad of February has 9 days in a leap year: days 51 to 59 (0-based).
+        self.assertEqual(leap[5], np.arange(51, 60).mean())
+        self.assertEqual(resolution.to_dekads(np.arange(12)).tolist()[:6], [0, 0, 0, 1, 1, 1])
+        self.assertEqual(resolution.day_of_year(12)[:3].tolist(), [15, 45, 76])
+        with self.assertRaises(ValueError):
+            resolution.to_dekads(np.ones(30))
+
+    def test_daily_series_aggregate_to_the_dekadal_result(self):
+        # Turc has no day-of-year term, so daily values repeating their dekad reproduce the dekadal ETo exactly.
+        data = load_fixture('turc_method_data.json')
+        yeto, eto_list = eto_vectorized.calculate_eto(constants.ETO_METHOD_CHOICES.TURC_METHOD, data)
+        for periods in (365, 366):
+            daily_yeto, daily_list = eto_vectorized.calculate_eto(constants.ETO_METHOD_CHOICES.TURC_METHOD,
+                                                                  daily_series(data, periods))
+            self.assertAlmostEqual(daily_yeto, yeto, places=9)
+            for value, expected in zip(daily_list, eto_list):
+                self.assertAlmostEqual(value, expected, places=9)
+
+    def test_daily_astronomy_follows_the_day_of_year(self):
+        data = load_fixture('hargreaves_data.json')
+        yeto, eto_list = eto_vectorized.calculate_eto(constants.ETO_METHOD_CHOICES.HARGREAVES_METHOD, data)
+        daily_yeto, daily_list = eto_vectorized.calculate_eto(constants.ETO_METHOD_CHOICES.HARGREAVES_METHOD,
+                                                              daily_series(data))
+        self.assertEqual(len(daily_list), 36)
+        self.assertEqual(astronomy.astronomy_table(data['latitude'], periods=365).ra.shape, (365,))
+        self.assertAlmostEqual(daily_yeto / yeto, 1, delta=0.02)
+
+
+class DiagnosticTableTest(SimpleTestCase):
+    def test_table_only_built_on_request(self):
+        data = load_fixture('turc_method_data.json')
+        result = eto_methods.turc_method(data['solar_radiation'], data['rh_value'], data['temperature'])
+        self.assertEqual(len(result), 2)
+        table = eto_methods.eto_diagnostic_table(constants.ETO_METHOD_CHOICES.TURC_METHOD, data)
+        self.assertEqual(len(table), 36)
+        self.assertEqual(list(table.columns), ["Tmax", "Tmin", "tmean", "Rs", "aT", "ETO"])
+
+
+def wb_payload(name='hargreaves_data.json'):
+    data = load_fixture(name)
+    data.update(catchment_area=10, rf=0.9, rf_option=True, outflow=[{'out_dr': 1, 'out_other': 0}] * 36,
+                re_water_body=[0.5] * 36, recharge_rate=[{'re_cr': 0.5, 're_ro': 0, 're_pa': 0.6, 're_other': 0}] * 36)
+    return data
+
+
+class VectorizedWaterBalanceTest(SimpleTestCase):
+    def wb_arguments(self, data):
+        _, eto_list = eto_vectorized.calculate_eto(data['eto_method'], data)
+        return (data['catchment_area'], copy.deepcopy(data['land_use_area']), data['kc_value'], data['cn_value'],
+                data['p_value'], data['temperature'], eto_list, data['re_water_body'], data['recharge_rate'],
+                data['outflow'], data['rf'], data['rf_option'])
+
+    def test_matches_scalar_calculate_wb(self):
+        for fixture in ('hargreaves_data.json', 'turc_method_data.json', 'FAO_Combined_PM_Method_Full_DATA.json'):
+            with self.subTest(fixture=fixture):
+                scalar_arguments = self.wb_arguments(wb_payload(fixture))
+                arguments = self.wb_arguments(wb_payload(fixture))
+                self.assertEqual(wb_vectorized.calculate_wb(*arguments),
+                                 wb_method_utils.calculate_wb(*scalar_arguments))
+                self.assertEqual(arguments[1], scalar_arguments[1])
+
+    def test_land_use_error_matches_scalar(self):
+        data = wb_payload()
+        data['land_use_area'][3]['a1'] += 20
+        self.assertEqual(wb_vectorized.calculate_wb(*self.wb_arguments(data)),
+                         wb_method_utils.calculate_wb(*self.wb_arguments(data)))
+
+    def test_kernel_broadcasts_over_leading_dimensions(self):
+        data = wb_payload()
+        inputs = wb_vectorized.wb_kernel_inputs(
+            data['catchment_area'], data['land_use_area'], data['kc_value'], data['cn_value'], data['p_value'],
+            self.wb_arguments(data)[6], data['re_water_body'], data['recharge_rate'], data['outflow'])
+        single = wb_vectorized.water_balance_kernel(**inputs)
+        batched = wb_vectorized.water_balance_kernel(**dict(inputs, p=inputs['p'] * [[1.0], [2.0]]))
+        self.assertEqual(batched['yearly_recharge'].shape, (2,))
+        self.assertAlmostEqual(batched['yearly_recharge'][0], single['yearly_recharge'])
+        self.assertAlmostEqual(batched['yearly_rainfall'][1], 2 * single['yearly_rainfall'])
+
+
+def create_user(email='wb@example.com', mobile='01700000000'):
+    return User.objects.create(email=email, mobile=mobile, dob='2000-01-01')
+
+
+WB_RECORD_DATA = {
+    'eto_method': constants.ETO_METHOD_CHOICES.HARGREAVES_METHOD,
+    'temperature': [{'t_max': 30.0, 't_min': 20.0}] * 2,
+    'p_value': [10, 12.5], 'c_value': [0.6, 0.7], 're_water_body': [0, 1],
+    'land_use_area': [{'a1': 1, 'a2': 0, 'a3': 0, 'a4': 0, 'a5': 0, 'a6': 0, 'a7': 0}],
+    'kc_value': [{'kc_a1': 1, 'kc_a2': 1, 'kc_a3': 1, 'kc_a4': 1}] * 2,
+    'cn_value': [{'cn1': 70, 'cn2': 70, 'cn3': 70, 'cn4': 70}] * 2,
+    'recharge_rate': [{'re_cr': 0, 're_ro': 0, 're_pa': 0, 're_other': 0}] * 2,
+    'outflow': [{'out_dr': 0, 'out_other': 0}] * 2,
+    'eto_rs_data': [{'RH_t': 70, 'WS_t': 2, 'SR_t': 18}] * 2,
+}
+
+
+class WBPersistenceTest(TestCase):
+    def test_series_round_trip_through_serializer(self):
+        user = create_user()
+        wb_method_data = persistence.save_wb_method_data(
+            user, WB_RECORD_DATA, {'Yearly Rainfall (mm)': 22.54}, [3.456, 4.1])
+        representation = WBMethodDataSerializer(wb_method_data).data
+        self.assertEqual(representation['p_value'], [10.0, 12.5])
+        self.assertEqual(representation['c_value'], [0.6, 0.7])
+        self.assertEqual(representation['re_water_body'], [0.0, 1.0])
+        self.assertEqual(representation['eto_list'], ['3.46', '4.10'])
+        self.assertEqual(representation['yearly_rainfall'], 22.5)
+        self.assertEqual([temp['t_mean'] for temp in representation['temperature']], [25.0, 25.0])
+
+
+class ReadQueryCountTest(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for _ in range(5):
+            persistence.save_wb_method_data(self.user, WB_RECORD_DATA, {}, [3.0, 4.0])
+            wtf = WTFMethod.objects.create(user=self.user, catchment_area=1, wt_max=2, wt_min=1, num_layers=1,
+                                           precipitation=1000)
+            QOutData.objects.create(wtf=wtf, pump=1, base=1, gw_out=1)
+            SPYieldData.objects.create(wtf=wtf, layer_height=1, sp_yield_percentage=10)
+            wtf.q_in.add(QinData.objects.create(value=1))
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_list_query_count_is_independent_of_page_size(self):
+        for url in ('/api/v1/estimation/user/wb-data/', '/api/v1/estimation/user/wtf-data/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(f'{url}?limit=1'), self.count_queries(f'{url}?limit=5'))
+
+
+WTF_PAYLOAD = {
+    'catchment_area': 10, 'wt_max': 5, 'wt_min': 2, 'num_layers': 1, 'precipitation': 2000,
+    'q_out': [{'pump': 1, 'base': 1, 'gw_out': 1}] * 12, 'q_in': [1] * 12,
+    'sp_yield_data': [{'layer_height': 3, 'sp_yield_percentage': 10}],
+}
+
+
+class ResultCacheTest(TestCase):
+    def setUp(self):
+        caches[settings.ESTIMATION_RESULT_CACHE].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(create_user())
+
+    def test_hash_is_canonical(self):
+        self.assertEqual(result_cache.input_hash('wb', {'a': 1, 'b': [{'x': 2.0}]}),
+                         result_cache.input_hash('wb', {'b': [{'x': 2}], 'a': 1.0}))
+        self.assertNotEqual(result_cache.input_hash('wb', {'a': 1}), result_cache.input_hash('wtf', {'a': 1}))
+
+    def test_repeated_wb_submission_links_existing_record(self):
+        payload = wb_payload()
+        first = self.client.post('/api/v1/estimation/user/wb/', payload, format='json').json()['data']
+        second = self.client.post('/api/v1/estimation/user/wb/', payload, format='json').json()['data']
+        self.assertEqual((first['cache'], second['cache']), (result_cache.MISS, result_cache.HIT))
+        self.assertEqual(second['id'], first['id'])
+        self.assertEqual(second['eto_list'], first['eto_list'])
+        self.assertEqual(WBMethodData.objects.count(), 1)
+
+    def test_hit_persists_the_adjusted_land_use_of_a_miss(self):
+        payload = wb_payload()
+        payload['land_use_area'][0]['a1'] -= 3
+        first = self.client.post('/api/v1/estimation/user/wb/', payload, format='json').json()['data']
+        other = APIClient()
+        other.force_authenticate(create_user('other@example.com', '01900000000'))
+        second = other.post('/api/v1/estimation/user/wb/', payload, format='json').json()['data']
+        self.assertEqual((first['cache'], second['cache']), (result_cache.MISS, result_cache.HIT))
+        land_use = [
+            list(WBMethodData.objects.get(pk=record['id']).land_use_area.order_by('pk')
+                 .values(*wb_vectorized.LAND_USE_KEYS))
+            for record in (first, second)
+        ]
+        self.assertEqual(land_use[1], land_use[0])
+        self.assertAlmostEqual(sum(land_use[1][0].values()), 100)
+
+    def test_repeated_wtf_submission_links_existing_record(self):
+        first = self.client.post('/api/v1/estimation/user/wtf/', WTF_PAYLOAD, format='json').json()['data']
+        second = self.client.post('/api/v1/estimation/user/wtf/', WTF_PAYLOAD, format='json').json()['data']
+        self.assertEqual((first['cache'], second['cache']), (result_cache.MISS, result_cache.HIT))
+        self.assertEqual(second['result'], first['result'])
+        self.assertEqual(WTFMethod.objects.count(), 1)
+
+
+class WBScenarioSweepTest(TestCase):
+    def setUp(self):
+        caches[settings.ESTIMATION_RESULT_CACHE].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(create_user())
+
+    def expected(self, payload):
+        _, eto_list = eto_vectorized.calculate_eto(payload['eto_method'], payload)
+        result = wb_vectorized.calculate_wb(
+            payload['catchment_area'], copy.deepcopy(payload['land_use_area']), payload['kc_value'],
+            payload['cn_value'], payload['p_value'], payload['temperature'], eto_list, payload['re_water_body'],
+            payload['recharge_rate'], payload['outflow'], payload['rf'], payload['rf_option'])
+        return {key: result[label] for key, label in wb_vectorized.WB_RESULT_KEYS.items()}
+
+    def test_scenarios_match_individual_calculations(self):
+        payload = wb_payload()
+        transferred = copy.deepcopy(payload)
+        for row in transferred['land_use_area']:
+            row['a1'], row['a5'] = row['a1'] * 0.8, row['a5'] + row['a1'] * 0.2
+        high_cn = [{key: min(value + 10, 100) for key, value in row.items()} for row in payload['cn_value']]
+        bad_land_use = copy.deepcopy(payload['land_use_area'])
+        bad_land_use[2]['a1'] += 30
+        response = self.client.post('/api/v1/estimation/user/wb-scenarios/', dict(payload, persist=True, scenarios=[
+            {'name': 'a1 to a5', 'land_use_transfer': {'source': 'a1', 'target': 'a5', 'percentage': 20}},
+            {'cn_value': high_cn},
+            {'land_use_area': bad_land_use},
+        ]), format='json')
+        self.assertEqual(response.status_code, 200)
+        rows = response.json()['data']['scenarios']
+        self.assertEqual([row['name'] for row in rows], ['base', 'a1 to a5', 'scenario 2', 'scenario 3'])
+        for row, expected in zip(rows, (self.expected(payload), self.expected(transferred),
+                                        self.expected(dict(payload, cn_value=high_cn)))):
+            for key, value in expected.items():
+                self.assertAlmostEqual(row[key], value, places=6)
+        self.assertEqual(rows[3]['error'], 'Sum of land-use components must be equal to 100, Line number 3')
+        run = WBScenarioRun.objects.get(pk=response.json()['data']['id'])
+        self.assertEqual(run.results, rows)
+        self.assertEqual(run.wb_method_data.yearly_recharge, round(rows[0]['yearly_recharge'], 1))
+
+    def test_scenario_rows_must_match_base_length(self):
+        payload = dict(wb_payload(), scenarios=[{'kc_value': wb_payload()['kc_value'][:12]}])
+        response = self.client.post('/api/v1/estimation/user/wb-scenarios/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_scenarios_cannot_vary_rf(self):
+        payload = dict(wb_payload(), scenarios=[{'rf': 0.5}])
+        response = self.client.post('/api/v1/estimation/user/wb-scenarios/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('rf', response.json()['errors']['scenarios'][0])
+
+
+class WBUncertaintyTest(SimpleTestCase):
+    def uncertainty(self, options, chunk_size=None):
+        data = wb_payload()
+        _, eto_list = eto_vectorized.calculate_eto(data['eto_method'], data)
+        options = dict({'samples': 500, 'seed': 7}, **options)
+        return uncertainty.wb_uncertainty(data, eto_list, options, chunk_size=chunk_size)
+
+    def test_zero_bounds_reproduce_the_deterministic_result(self):
+        data = wb_payload()
+        _, eto_list = eto_vectorized.calculate_eto(data['eto_method'], data)
+        expected = wb_vectorized.calculate_wb(
+            data['catchment_area'], copy.deepcopy(data['land_use_area']), data['kc_value'], data['cn_value'],
+            data['p_value'], data['temperature'], eto_list, data['re_water_body'], data['recharge_rate'],
+            data['outflow'], data['rf'], data['rf_option'])
+        result = self.uncertainty({})
+        self.assertNotIn('eto_note', result)
+        summary = result['percentiles']["Yearly Recharge (mm)"]
+        self.assertEqual(summary['p5'], summary['p95'])
+        self.assertAlmostEqual(summary['p50'], expected["Yearly Recharge (mm)"], places=2)
+
+    def test_seeded_samples_are_reproducible_and_spread(self):
+        options = {'p_value': 0.2, 'cn_value': 0.1, 'kc_value': 0.1, 'temperature': 1.5}
+        result = self.uncertainty(options, chunk_size=128)
+        self.assertEqual(result, self.uncertainty(options, chunk_size=128))
+        self.assertEqual(result['valid_samples'], 500)
+        self.assertEqual(result['eto_note'], uncertainty.FIRST_DEKAD_ETO_NOTE)
+        summary = result['percentiles']["Yearly Recharge (mm)"]
+        self.assertLess(summary['p5'], summary['p50'])
+        self.assertLess(summary['p50'], summary['p95'])
+
+
+class WTFUncertaintyTest(SimpleTestCase):
+    def test_kernel_matches_scalar(self):
+        data = copy.deepcopy(WTF_PAYLOAD)
+        data['sp_yield_data'] = [{'layer_height': 2, 'sp_yield_percentage': 8},
+                                 {'layer_height': 1, 'sp_yield_percentage': 15}]
+        expected = calculate_yearly_recharge(data['catchment_area'], data['wt_max'], data['wt_min'], 2,
+                                             data['sp_yield_data'], data['precipitation'], data['q_out'],
+                                             data['q_in'])
+        recharge, ratio = wtf_vectorized.yearly_recharge_kernel(
+            data['catchment_area'], data['wt_max'], data['wt_min'], np.array([2.0, 1.0]), np.array([8.0, 15.0]),
+            data['precipitation'], wtf_vectorized.q_out_totals(data['q_out']).sum(), sum(data['q_in']))
+        self.assertEqual(round(float(recharge), 1), expected['Recharge depth (mm)'])
+        self.assertEqual(round(float(ratio), 1), expected['Yearly Recharge as a percentage of Precipitation'])
+
+    def test_sampling_reports_percentiles_and_rejections(self):
+        options = {'samples': 2000, 'seed': 3, 'sp_yield_percentage': [{'min': 5, 'max': 40}],
+                   'wt_max': {'min': 4, 'max': 6}}
+        result = uncertainty.wtf_uncertainty(WTF_PAYLOAD, options, chunk_size=300)
+        self.assertEqual(result, uncertainty.wtf_uncertainty(WTF_PAYLOAD, options, chunk_size=300))
+        summary = result['percentiles']['Recharge depth (mm)']
+        self.assertLess(summary['p5'], summary['p95'])
+        rejected = result['rejected_fraction']
+        self.assertGreater(rejected['total'], 0)
+        self.assertLess(rejected['total'], 1)
+        self.assertEqual(rejected['total'], round(rejected['recharge'] + rejected['ratio'], 4))
+
+
+class WTFBatchTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(create_user())
+
+    def wells(self):
+        two_layers = dict(copy.deepcopy(WTF_PAYLOAD), name='two layers', num_layers=2,
+                          sp_yield_data=[{'layer_height': 2, 'sp_yield_percentage': 8},
+                                         {'layer_height': 1, 'sp_yield_percentage': 15}])
+        too_high = dict(copy.deepcopy(WTF_PAYLOAD), name='too high', wt_max=50)
+        invalid = dict(copy.deepcopy(WTF_PAYLOAD), name='invalid', q_out=WTF_PAYLOAD['q_out'][:3])
+        return [dict(copy.deepcopy(WTF_PAYLOAD), name='single layer'), two_layers, too_high, invalid]
+
+    def test_batch_matches_scalar(self):
+        wells = self.wells()[:3]
+        expected = [
+            calculate_yearly_recharge(well['catchment_area'], well['wt_max'], well['wt_min'], well['num_layers'],
+                                      well['sp_yield_data'], well['precipitation'], well['q_out'], well['q_in'])
+            for well in wells
+        ]
+        self.assertEqual(wtf_vectorized.batch_yearly_recharge(wells), expected)
+
+    def test_well_errors_are_reported_inline(self):
+        response = self.client.post('/api/v1/estimation/user/wtf-batch/', {'wells': self.wells()}, format='json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual((data['succeeded'], data['failed']), (2, 2))
+        results = data['results']
+        self.assertEqual([result['name'] for result in results], ['single layer', 'two layers', 'too high', 'invalid'])
+        self.assertIn('Seems high', results[2]['errors']['non_field_errors'][0])
+        self.assertIn('Exactly 12', results[3]['errors']['non_field_errors'][0])
+
+        single = self.client.post('/api/v1/estimation/user/wtf/', WTF_PAYLOAD, format='json').json()['data']
+        self.assertEqual(results[0]['result'], {key: value for key, value in single['result'].items() if key != 'id'})
+        self.assertEqual(WTFMethod.objects.count(), 3)
+        self.assertEqual(SPYieldData.objects.filter(wtf_id=results[1]['id']).count(), 2)
+        self.assertEqual(QOutData.objects.filter(wtf_id=results[0]['id']).count(), 12)
+
+
+class WBSensitivityTest(TestCase):
+    def setUp(self):
+        caches[settings.ESTIMATION_RESULT_CACHE].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(create_user())
+
+    def recharge(self, payload, eto_list):
+        result = wb_vectorized.calculate_wb(
+            payload['catchment_area'], copy.deepcopy(payload['land_use_area']), payload['kc_value'],
+            payload['cn_value'], payload['p_value'], payload['temperature'], eto_list, payload['re_water_body'],
+            payload['recharge_rate'], payload['outflow'], payload['rf'], payload['rf_option'])
+        return result['Yearly Recharge (mm)']
+
+    def test_elasticities_match_scalar_perturbations(self):
+        payload = wb_payload()
+        delta = 0.05
+        _, eto_list = eto_vectorized.calculate_eto(payload['eto_method'], payload)
+        response = self.client.post('/api/v1/estimation/user/wb-sensitivity/', dict(payload, delta=delta),
+                                    format='json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual(list(data['groups']), ['p_value', 'cn_value', 'kc_value'])
+        self.assertEqual(sorted(data['ranking']), sorted(data['groups']))
+
+        low = dict(payload, p_value=[value * (1 - delta) for value in payload['p_value']])
+        high = dict(payload, p_value=[value * (1 + delta) for value in payload['p_value']])
+        p_group = data['groups']['p_value']
+        self.assertAlmostEqual(p_group['low']['Yearly Recharge (mm)'], self.recharge(low, eto_list), places=2)
+        self.assertAlmostEqual(p_group['high']['Yearly Recharge (mm)'], self.recharge(high, eto_list), places=2)
+        self.assertEqual(data['base']['Yearly Recharge (mm)'], self.recharge(payload, eto_list))
+
+    def test_eto_is_not_offered(self):
+        # The water balance only reads the first period's ETo, so ETo results would reflect dekad 1 alone.
+        for payload in (dict(wb_payload(), groups=['eto']),
+                        dict(wb_payload(), eto_methods=[constants.ETO_METHOD_CHOICES.TURC_METHOD])):
+            response = self.client.post('/api/v1/estimation/user/wb-sensitivity/', payload, format='json')
+            self.assertEqual(response.status_code, 400)
+
+
+class EstimationJobTest(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def submit(self, kind, payload):
+        return self.client.post('/api/v1/estimation/user/jobs/', {'kind': kind, 'payload': payload}, format='json')
+
+    def test_worker_runs_submitted_job(self):
+        wells = [dict(WTF_PAYLOAD, name='a'), dict(WTF_PAYLOAD, name='b', wt_max=50)]
+        response = self.submit(constants.JobKindChoices.WTF_BATCH, {'wells': wells})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['data']['id']
+        self.assertEqual(self.client.get(f'/api/v1/estimation/user/jobs/{job_id}/result/').status_code, 409)
+
+        call_command('run_estimation_jobs', processes=0, once=True, stdout=io.StringIO())
+        job = self.client.get(f'/api/v1/estimation/user/jobs/{job_id}/').json()['data']
+        self.assertEqual((job['status'], job['progress']), (constants.JobStatusChoices.SUCCEEDED, 1))
+        result = self.client.get(f'/api/v1/estimation/user/jobs/{job_id}/result/').json()['data']
+        direct = self.client.post('/api/v1/estimation/user/wtf-batch/', {'wells': wells}, format='json').json()['data']
+        for row in result['results'] + direct['results']:
+            row.pop('id', None)
+        self.assertEqual(result, direct)
+
+    def test_invalid_payload_is_rejected_at_submission(self):
+        response = self.submit(constants.JobKindChoices.WB_UNCERTAINTY, wb_payload())
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(EstimationJob.objects.exists())
+
+    def test_claim_is_exclusive(self):
+        job = EstimationJob.objects.create(user=self.user, kind=constants.JobKindChoices.ETO_BATCH, payload={})
+        self.assertEqual(jobs.claim_jobs('first', 5), [job.id])
+        self.assertEqual(jobs.claim_jobs('second', 5), [])
+
+    def test_cancellation(self):
+        pending = EstimationJob.objects.create(user=self.user, kind=constants.JobKindChoices.ETO_BATCH, payload={})
+        response = self.client.post(f'/api/v1/estimation/user/jobs/{pending.id}/cancel/')
+        self.assertEqual(response.json()['data']['status'], constants.JobStatusChoices.CANCELLED)
+        self.assertEqual(self.client.post(f'/api/v1/estimation/user/jobs/{pending.id}/cancel/').status_code, 409)
+
+        payload = dict(WTF_PAYLOAD, uncertainty={'samples': 5000, 'seed': 1, 'wt_max': {'min': 4, 'max': 6}})
+        running = EstimationJob.objects.create(user=self.user, kind=constants.JobKindChoices.WTF_UNCERTAINTY,
+                                               payload=payload)
+        jobs.claim_jobs('worker', 1)
+        jobs.cancel_job(running)
+        jobs.execute_job(running.id)
+        running.refresh_from_db()
+        self.assertEqual(running.status, constants.JobStatusChoices.CANCELLED)
+        self.assertIsNone(running.result)
+
+    def test_cancelled_job_saves_nothing(self):
+        payload = dict(wb_payload(), persist=True, scenarios=[{'name': 'wet', 'p_value': wb_payload()['p_value']}])
+        job = EstimationJob.objects.create(user=self.user, kind=constants.JobKindChoices.WB_SCENARIOS,
+                                           payload=payload)
+        jobs.claim_jobs('worker', 1)
+        jobs.cancel_job(job)
+        jobs.execute_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, constants.JobStatusChoices.CANCELLED)
+        self.assertFalse(WBScenarioRun.objects.exists())
+        self.assertFalse(WBMethodData.objects.exists())
+
+    def test_stale_jobs_are_requeued_and_finished_jobs_evicted(self):
+        long_ago = timezone.now() - timedelta(seconds=settings.ESTIMATION_JOB_STALE_AFTER + 1)
+        stale = EstimationJob.objects.create(user=self.user, kind=constants.JobKindChoices.ETO_BATCH, payload={})
+        EstimationJob.objects.filter(id=stale.id).update(status=constants.JobStatusChoices.RUNNING,
+                                                         updated_at=long_ago)
+        expired = EstimationJob.objects.create(user=self.user, kind=constants.JobKindChoices.ETO_BATCH, payload={},
+                                               status=constants.JobStatusChoices.SUCCEEDED, expires_at=long_ago)
+        self.assertEqual(jobs.requeue_stale_jobs(), 1)
+        self.assertEqual(jobs.evict_expired_jobs(), 1)
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, constants.JobStatusChoices.PENDING)
+        self.assertFalse(EstimationJob.objects.filter(id=expired.id).exists())
+
+
+class TransactionScopeTest(SimpleTestCase):
+    def test_estimation_views_opt_out_of_atomic_requests(self):
+        for url in ('wtf/', 'wtf-batch/', 'wb/', 'eto-batch/', 'eto-compare/', 'wb-scenarios/', 'wb-sensitivity/',
+                    'wb-multi-year/'):
+            with self.subTest(url=url):
+                view = resolve(f'/api/v1/estimation/user/{url}').func
+                self.assertIn(DEFAULT_DB_ALIAS, getattr(view, '_non_atomic_requests', set()))
+
+    def test_calculate_eto_method_does_not_touch_the_database(self):
+        # SimpleTestCase fails any database query.
+        for name in ('FAO_Combined_PM_Method_Full_DATA.json', 'pm_sh_data.json'):
+            data = load_fixture(name)
+            with self.subTest(name=name):
+                yeto, eto_list = wb_method_utils.calculate_eto_method(
+                    data['eto_method'], data.get('latitude'), data.get('elevation'), data.get('eto_rs_data'),
+                    data.get('eto_sh_data'), data.get('c_value', []), data.get('p_value'),
+                    data.get('solar_radiation'), data.get('rh_value'), data.get('temperature'))
+                self.assertEqual(len(eto_list), len(data['temperature']))
+
+
+class EtoComparisonTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(create_user())
+
+    def test_all_feasible_methods_match_single_method_results(self):
+        climate = climate_data()
+        response = self.client.post('/api/v1/estimation/user/eto-compare/', climate, format='json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        methods = [row['eto_method'] for row in data['eto_methods']]
+        infeasible = {row['eto_method']: row['reason'] for row in data['infeasible']}
+        self.assertEqual(sorted(methods + list(infeasible)), list(constants.ETO_METHOD_CHOICES.values))
+        # Blaney-Criddle, Jensen-Haise, Abtew and De Bruin need the empirical coefficient.
+        self.assertIn('c_value', infeasible[constants.ETO_METHOD_CHOICES.ABTEW_METHOD])
+        self.assertEqual(len(data['eto_matrix']), len(methods))
+        for row, eto_row in zip(data['eto_methods'], data['eto_matrix']):
+            yeto, eto_list = eto_vectorized.calculate_eto(row['eto_method'], climate)
+            self.assertEqual(row['yeto'], round(yeto, 2))
+            self.assertEqual(eto_row, [round(eto, 2) for eto in eto_list])
+
+    def test_requested_methods_only(self):
+        climate = climate_data(c_value=[0.5] * 36, eto_methods=[
+            constants.ETO_METHOD_CHOICES.ABTEW_METHOD, constants.ETO_METHOD_CHOICES.HARGREAVES_METHOD])
+        data = self.client.post('/api/v1/estimation/user/eto-compare/', climate, format='json').json()['data']
+        self.assertEqual([row['eto_method'] for row in data['eto_methods']],
+                         [constants.ETO_METHOD_CHOICES.ABTEW_METHOD, constants.ETO_METHOD_CHOICES.HARGREAVES_METHOD])
+        self.assertEqual(data['infeasible'], [])
+
+    def test_daily_series(self):
+        climate = daily_series(climate_data())
+        data = self.client.post('/api/v1/estimation/user/eto-compare/', climate, format='json').json()['data']
+        self.assertEqual(data['resolution'], resolution.DAILY)
+        self.assertEqual(len(data['eto_matrix'][0]), 36)
+        self.assertEqual(len(data['eto_series'][0]), 365)
+        response = self.client.post('/api/v1/estimation/user/eto-compare/',
+                                    dict(climate, rh_value=climate['rh_value'][:36]), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('rh_value', response.json()['errors'])
+
+    def test_no_feasible_method(self):
+        response = self.client.post('/api/v1/estimation/user/eto-compare/',
+                                    {'solar_radiation': [15] * 36}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class WBMultiYearTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(create_user())
+
+    def payload(self):
+        payload = wb_payload()
+        temperature = payload.pop('temperature')
+        p_value = payload.pop('p_value')
+        years = []
+        for index, (p_factor, shift) in enumerate(((1, 0), (1.2, 0.5), (0.8, 1), (1.1, 1.5))):
+            years.append({
+                'year': 2001 + index, 'p_value': [value * p_factor for value in p_value],
+                'temperature': [{'t_max': row['t_max'] + shift, 't_min': row['t_min'] + shift} for row in temperature],
+            })
+        # A daily record is aggregated to dekads like a single-year submission.
+        years[3]['temperature'] = daily_series({'temperature': years[3]['temperature']}, 366)['temperature']
+        return dict(payload, years=years[::-1])
+
+    def test_years_match_single_year_calculations(self):
+        payload = self.payload()
+        response = self.client.post('/api/v1/estimation/user/wb-multi-year/', payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual(data['years'], [2001, 2002, 2003, 2004])
+        for index, year in enumerate(sorted(payload['years'], key=lambda year: year['year'])):
+            year_data = dict(payload, **year)
+            yeto, eto_list = eto_vectorized.calculate_eto(payload['eto_method'], year_data)
+            expected = wb_vectorized.calculate_wb(
+                payload['catchment_area'], copy.deepcopy(payload['land_use_area']), payload['kc_value'],
+                payload['cn_value'], year['p_value'], year['temperature'], eto_list, payload['re_water_body'],
+                payload['recharge_rate'], payload['outflow'], payload['rf'], payload['rf_option'])
+            self.assertEqual(data['yeto'][index], round(yeto, 2))
+            for key, label in wb_vectorized.WB_RESULT_KEYS.items():
+                self.assertAlmostEqual(data['results'][key][index], expected[label], places=6)
+        recharge = np.asarray(data['results']['yearly_recharge'])
+        self.assertAlmostEqual(data['summary']['yearly_recharge']['mean'], recharge.mean(), places=2)
+        self.assertAlmostEqual(data['summary']['yearly_recharge']['trend'],
+                               np.polyfit(data['years'], recharge, 1)[0], places=2)
+
+        run = WBMultiYearRun.objects.get(pk=data['id'])
+        self.assertEqual((run.years, run.results, run.summary), (data['years'], data['results'], data['summary']))
+        stored = self.client.get(f'/api/v1/estimation/user/wb-multi-year-runs/{run.id}/').json()['data']
+        self.assertEqual(stored['yeto'], data['yeto'])
+
+    def test_invalid_years(self):
+        payload = self.payload()
+        payload['years'][1]['p_value'] = payload['years'][1]['p_value'][:12]
+        response = self.client.post('/api/v1/estimation/user/wb-multi-year/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('1', response.json()['errors']['years'])
+
+        payload = self.payload()
+        payload['years'][1]['year'] = payload['years'][0]['year']
+        response = self.client.post('/api/v1/estimation/user/wb-multi-year/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class BenchmarkTest(SimpleTestCase):
+    def test_fixtures_are_replayed_at_every_batch_size(self):
+        run = benchmark.run_benchmarks(batch_sizes=(1, 3), repeat=2, selected=['hargreaves_data', 'wtf/'])
+        rows = {(row['case'], row['batch_size']): row for row in run['results']}
+        for case in ('eto/hargreaves_method/hargreaves_data', 'wb/hargreaves_data', 'wtf/wtf_method_data'):
+            for batch_size in (1, 3):
+                row = rows[case, batch_size]
+                self.assertLessEqual(row['min_ms'], row['median_ms'])
+                self.assertGreater(row['throughput'], 0)
+                self.assertGreater(row['peak_kib'], 0)
+        # Hargreaves only needs the latitude and temperatures, so the fixtures of other methods drive it as well.
+        self.assertIn('eto/hargreaves_method/de_bruin_data', benchmark.benchmark_cases(benchmark.load_fixtures()))
+        self.assertEqual(run['meta']['batch_sizes'], [1, 3])
+
+    def test_compare_reports_slowdowns_over_the_threshold(self):
+        baseline = {'results': [{'case': 'eto/a', 'batch_size': 1, 'median_ms': 1.0},
+                                {'case': 'eto/b', 'batch_size': 1, 'median_ms': 1.0}]}
+        current = {'results': [{'case': 'eto/a', 'batch_size': 1, 'median_ms': 1.2},
+                               {'case': 'eto/b', 'batch_size': 1, 'median_ms': 2.0},
+                               {'case': 'eto/c', 'batch_size': 1, 'median_ms': 9.0}]}
+        regressions = benchmark.compare(current, baseline, threshold=1.25)
+        self.assertEqual([(row['case'], row['ratio']) for row in regressions], [('eto/b', 2.0)])
+
+    def test_command_saves_and_compares_baselines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / 'baseline.json'
+            call_command('benchmark_estimation', '--case', 'wtf/', '--batch-sizes', '1', '2', '--repeat', '2',
+                         '--output', str(output), stdout=io.StringIO())
+            saved = json.loads(output.read_text())
+            self.assertEqual(len(saved['results']), 2)
+            stdout = io.StringIO()
+            call_command('benchmark_estimation', '--case', 'wtf/', '--repeat', '2', '--baseline', str(output),
+                         '--threshold', '1000', '--fail-on-regression', stdout=stdout)
+            self.assertIn('No regressions', stdout.getvalue())
+
+
+
+class LoadTestTest(TestCase):
+    def test_every_endpoint_is_replayed_in_process(self):
+        report = load_test.run_load_test(load_test.load_test_token(), requests=2, concurrency=1)
+        rows = {row['endpoint']: row for row in report['endpoints']}
+        self.assertEqual(set(rows), set(load_test.ENDPOINTS))
+        self.assertEqual(report['requests'], 2 * len(load_test.ENDPOINTS))
+        for row in rows.values():
+            self.assertEqual(row['requests'], 2)
+            self.assertEqual(row['error_rate'], 0, row['statuses'])
+            self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+            self.assertGreater(row['queries_mean'], 0)
+        self.assertEqual(WBMethodData.objects.count(), 2)
+        self.assertEqual(WTFMethod.objects.count(), 2)
+
+    def test_command_reuses_the_load_test_token(self):
+        token = load_test.load_test_token()
+        stdout = io.StringIO()
+        call_command('load_test_estimation', '--endpoint', 'wtf-data', '--requests', '3', '--concurrency', '1',
+                     stdout=stdout)
+        self.assertEqual(load_test.load_test_token(), token)
+        self.assertIn('3 requests in', stdout.getvalue())
+
+
+class ServerTimingTest(TestCase):
+    def setUp(self):
+        caches[settings.ESTIMATION_RESULT_CACHE].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(create_user())
+
+    @override_settings(SERVER_TIMING=True)
+    def test_wb_stages_are_reported(self):
+        with self.assertLogs('Config.middleware', 'INFO') as logs:
+            response = self.client.post('/api/v1/estimation/user/wb/', wb_payload(), format='json')
+        self.assertEqual(response.status_code, 200)
+        metrics = dict(metric.split(';dur=') for metric in response['Server-Timing'].split(', '))
+        self.assertEqual(list(metrics), ['validate', 'eto', 'wb', 'db', 'render', 'total'])
+        self.assertLessEqual(float(metrics['eto']), float(metrics['total']))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertTrue(record['view'].endswith('WBMethodAPIView'))
+        self.assertEqual(set(record['stages']), {'validate', 'eto', 'wb', 'db', 'render'})
+
+    def test_disabled_by_default(self):
+        response = self.client.get('/api/v1/estimation/user/wb-data/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+
+
+@override_settings(QUERY_PROFILING=True, QUERY_PROFILING_BUFFER_SIZE=3, QUERY_PROFILING_SLOWEST=2)
+class QueryProfilingTest(TestCase):
+    def setUp(self):
+        query_profile.reset()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def stats(self):
+        admin = APIClient()
+        admin.force_authenticate(User.objects.get_or_create(
+            email='admin@example.com', defaults={'mobile': '01800000000', 'dob': '2000-01-01', 'is_staff': True})[0])
+        with override_settings(QUERY_PROFILING=False):
+            response = admin.get('/api/v1/estimation/admin/query-stats/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_queries_are_aggregated_per_endpoint(self):
+        self.client.post('/api/v1/estimation/user/wb/', wb_payload(), format='json')
+        self.client.get('/api/v1/estimation/user/wb-data/')
+        self.client.get('/api/v1/estimation/user/wb-data/')
+        stats = self.stats()
+        self.assertEqual(stats['requests'], 3)
+        rows = {row['endpoint']: row for row in stats['endpoints']}
+        wb = rows['POST api/v1/estimation/user/wb/']
+        self.assertEqual(wb['requests'], 1)
+        self.assertGreater(wb['queries_mean'], 0)
+        self.assertEqual(len(wb['slowest']), 2)
+        self.assertGreaterEqual(wb['slowest'][0]['duration_ms'], wb['slowest'][1]['duration_ms'])
+        self.assertTrue(all(statement['sql'] for statement in wb['slowest']))
+        self.assertEqual(sum(row['requests'] for row in stats['endpoints'] if 'wb-data' in row['endpoint']), 2)
+
+    def test_buffer_keeps_the_latest_requests(self):
+        for _ in range(5):
+            self.client.get('/api/v1/estimation/user/wtf-data/')
+        self.assertEqual(self.stats()['requests'], 3)
+        query_profile.reset()
+        self.assertEqual(self.stats()['requests'], 0)
+
+    def test_stats_are_admin_only(self):
+        self.assertEqual(self.client.get('/api/v1/estimation/admin/query-stats/').status_code, 403)
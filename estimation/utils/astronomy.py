@@ -0,0 +1,106 @@
+"""
+Per-latitude astronomical tables (J, solar declination, dr, sunset hour angle ws, Ra and daylength N).
+
+These values depend only on latitude and the resolution of the series (see resolution.day_of_year), so they
+are computed once per quantized latitude and number of periods and shared by every ETo method through a
+bounded LRU cache. The ETo methods derive them with slightly different conventions,
+which are kept as separate profiles so cached values stay identical to what each method computed before.
+"""
+import math
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+
+from estimation.utils import resolution
+
+PERIODS = resolution.DEKADS
+
+STANDARD = 'standard'
+FAO_COMBINED = 'fao_combined'
+MIDPOINT = 'midpoint'
+HARGREAVES = 'hargreaves'
+BLANEY_CRIDDLE = 'blaney_criddle'
+
+AstronomyTable = namedtuple('AstronomyTable', ['j', 'declination', 'dr', 'ws', 'ra', 'daylength'])
+
+
+def _radians(latitude):
+    return latitude * math.pi / 180
+
+
+def _rounded_radians(latitude):
+    return round(latitude * math.pi / 180, 2)
+
+
+def _approximate_radians(latitude):
+    return latitude * 22 / (180 * 7)
+
+
+def _fao_combined_ra_phi(latitude):
+    return math.radians(latitude * 22 / (180 * 7))
+
+
+# profile -> (latitude in radians used for ws, latitude in radians used for Ra, J offset, ws rounding decimals)
+PROFILES = {
+    STANDARD: (_radians, _radians, 0.0, None),
+    FAO_COMBINED: (_rounded_radians, _fao_combined_ra_phi, 0.0, None),
+    MIDPOINT: (_radians, _radians, 0.5, None),
+    HARGREAVES: (_radians, _radians, 0.0, 2),
+    BLANEY_CRIDDLE: (_approximate_radians, _approximate_radians, 0.0, None),
+}
+
+
+def _build_table(latitude, profile, periods):
+    ws_phi, ra_phi, j_offset, ws_decimals = PROFILES[profile]
+    lrad = ws_phi(latitude)
+    phi = ra_phi(latitude)
+    j = resolution.day_of_year(periods) + j_offset
+    declination = 0.409 * np.sin(0.0172 * j - 1.39)
+    dr = 1 + 0.033 * np.cos(0.0172 * j)
+    ws = np.arccos(-math.tan(lrad) * np.tan(declination))
+    if ws_decimals is not None:
+        ws = np.round(ws, ws_decimals)
+    ra = 37.6 * dr * ((ws * math.sin(phi) * np.sin(declination)) + (
+            math.cos(phi) * np.cos(declination) * np.sin(ws)))
+    daylength = 24 * ws / math.pi
+    table = AstronomyTable(j, declination, dr, ws, ra, daylength)
+    for values in table:
+        values.setflags(write=False)
+    return table
+
+
+_cached_table = lru_cache(maxsize=settings.ETO_ASTRONOMY_CACHE_SIZE)(_build_table)
+
+
+def quantize_latitude(latitude):
+    return round(float(latitude), settings.ETO_LATITUDE_PRECISION)
+
+
+def astronomy_table(latitude, profile=STANDARD, periods=PERIODS):
+    """
+    Cached astronomical table for one latitude (degrees), quantized to ETO_LATITUDE_PRECISION decimals, for a
+    series of `periods` values (36 dekads by default). The returned arrays are read-only and shared between
+    callers.
+    """
+    return _cached_table(quantize_latitude(latitude), profile, periods)
+
+
+def astronomy_arrays(latitude, profile=STANDARD, periods=PERIODS):
+    """
+    Same as astronomy_table, but also accepts a vector of per-station latitudes, in which case every field
+    is stacked into a (N stations, periods) array.
+    """
+    if np.ndim(latitude) == 0:
+        return astronomy_table(latitude, profile, periods)
+    tables = [astronomy_table(value, profile, periods) for value in np.ravel(latitude)]
+    return AstronomyTable(*(np.stack(values) for values in zip(*tables)))
+
+
+def cache_info():
+    return _cached_table.cache_info()
+
+
+def cache_clear():
+    _cached_table.cache_clear()
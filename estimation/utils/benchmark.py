@@ -0,0 +1,221 @@
+"""
+Benchmark harness for the ETo methods and the WB and WTF calculators, driven by the payloads in data/*.json.
+
+Every climate fixture is replayed through each ETo method it has the inputs for, the WB calculation and, for
+the WTF fixtures, the yearly recharge calculation, at several batch sizes. A batch of one goes through the
+single-request entry point (calculate_eto, calculate_wb, calculate_yearly_recharge); larger batches go
+through the batch paths (stations, stacked years, wells). Each case reports per-call latency, throughput and
+peak traced allocations, and the whole run is saved as JSON so two runs can be compared with compare().
+"""
+import copy
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from estimation import constants
+from estimation.utils import eto_vectorized, wb_vectorized, wtf_vectorized
+from estimation.utils.calculate_yearly_recharge import calculate_yearly_recharge
+
+DEFAULT_BATCH_SIZES = (1, 10, 100)
+DEFAULT_REPEAT = 20
+DEFAULT_THRESHOLD = 1.25
+# WB fields some climate fixtures leave out, filled in so every fixture also drives the water balance.
+WB_DEFAULTS = {
+    'catchment_area': 10,
+    'rf': 0.9,
+    'rf_option': True,
+    're_water_body': [0] * eto_vectorized.PERIODS,
+    'outflow': [{'out_dr': 0, 'out_other': 0}] * eto_vectorized.PERIODS,
+}
+
+
+def fixture_dir():
+    return settings.BASE_DIR / 'data'
+
+
+def load_fixtures(directory=None):
+    """
+    {name: payload} of every JSON fixture, name being the file name without its extension.
+    """
+    fixtures = {}
+    for path in sorted((directory or fixture_dir()).glob('*.json')):
+        with open(path) as fixture:
+            fixtures[path.stem] = json.load(fixture)
+    return fixtures
+
+
+def _percentile(values, percentile):
+    return float(np.percentile(values, percentile))
+
+
+def measure(call, repeat, setup=None):
+    """
+    Time `repeat` calls of `call` after one warm-up call and trace the allocations of one more.
+
+    `setup`, when given, returns the arguments of each call and runs outside the timed section, for calls
+    that consume or modify their input. Returns the latency statistics in milliseconds and the peak traced
+    memory in KiB.
+    """
+    def arguments():
+        return setup() if setup is not None else ()
+
+    call(*arguments())
+    timings = []
+    for _ in range(repeat):
+        args = arguments()
+        start = time.perf_counter()
+        call(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    args = arguments()
+    tracemalloc.start()
+    try:
+        call(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'min_ms': min(timings),
+        'median_ms': statistics.median(timings),
+        'mean_ms': statistics.fmean(timings),
+        'p95_ms': _percentile(timings, 95),
+        'peak_kib': peak / 1024,
+    }
+
+
+def _eto_case(eto_method, data):
+    def run(batch_size):
+        if batch_size == 1:
+            return lambda: eto_vectorized.calculate_eto(eto_method, data), None
+        stations = [data] * batch_size
+        return lambda: eto_vectorized.calculate_eto_batch(eto_method, stations), None
+    return run
+
+
+def _wb_case(data):
+    data = dict(WB_DEFAULTS, **data)
+    eto_list = eto_vectorized.calculate_eto(data['eto_method'], data)[1]
+
+    def fresh_land_use():
+        # The land-use check adjusts the rows in place, so every call gets a fresh copy.
+        return (copy.deepcopy(data['land_use_area']),)
+
+    def run(batch_size):
+        if batch_size == 1:
+            def calculate(land_use_area):
+                wb_vectorized.calculate_wb(data['catchment_area'], land_use_area, data['kc_value'],
+                                           data['cn_value'], data['p_value'], data['temperature'], eto_list,
+                                           data['re_water_body'], data['recharge_rate'], data['outflow'],
+                                           data['rf'], data['rf_option'])
+            return calculate, fresh_land_use
+        # Batches stack the rainfall and ETo of `batch_size` years, as a multi-year simulation does, and time the
+        # same conversion, land-use check and kernel as calculate_wb.
+        p_values, eto_lists = [data['p_value']] * batch_size, [eto_list] * batch_size
+
+        def calculate_batch(land_use_area):
+            inputs = wb_vectorized.wb_kernel_inputs(data['catchment_area'], land_use_area, data['kc_value'],
+                                                    data['cn_value'], p_values, eto_lists, data['re_water_body'],
+                                                    data['recharge_rate'], data['outflow'])
+            if wb_vectorized.adjust_land_use(land_use_area, inputs['land_use']) is None:
+                wb_vectorized.water_balance_kernel(**inputs)
+        return calculate_batch, fresh_land_use
+    return run
+
+
+def _wtf_case(data):
+    def calculate():
+        calculate_yearly_recharge(data['catchment_area'], data['wt_max'], data['wt_min'], data['num_layers'],
+                                  data['sp_yield_data'], data['precipitation'], data['q_out'], data.get('q_in') or [])
+
+    def run(batch_size):
+        if batch_size == 1:
+            return calculate, None
+        wells = [data] * batch_size
+        return lambda: wtf_vectorized.batch_yearly_recharge(wells), None
+    return run
+
+
+def benchmark_cases(fixtures):
+    """
+    {case name: factory} for every fixture; a factory takes the batch size and returns (call, setup).
+    """
+    cases = {}
+    for name, data in fixtures.items():
+        if 'wt_max' in data:
+            cases[f'wtf/{name}'] = _wtf_case(data)
+            continue
+        eto_methods, _ = eto_vectorized.eto_method_feasibility(data)
+        for eto_method in eto_methods:
+            cases[f'eto/{constants.ETO_METHOD_CHOICES(eto_method).name.lower()}/{name}'] = _eto_case(eto_method, data)
+        if data.get('eto_method') in eto_methods and all(data.get(field) is not None for field in (
+                'land_use_area', 'kc_value', 'cn_value', 'p_value', 'recharge_rate')):
+            cases[f'wb/{name}'] = _wb_case(data)
+    return cases
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True,
+                              check=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmarks(batch_sizes=DEFAULT_BATCH_SIZES, repeat=DEFAULT_REPEAT, selected=None, fixtures=None,
+                   report=None):
+    """
+    Run every case whose name contains one of `selected` (all cases by default) at each batch size.
+
+    `report`, when given, is called with each result row as it is produced. Returns the JSON-serializable run:
+    metadata (revision, versions, time, settings) and one result row per case and batch size.
+    """
+    cases = benchmark_cases(load_fixtures() if fixtures is None else fixtures)
+    results = []
+    for case, factory in cases.items():
+        if selected and not any(pattern in case for pattern in selected):
+            continue
+        for batch_size in batch_sizes:
+            call, setup = factory(batch_size)
+            row = dict({'case': case, 'batch_size': batch_size}, **measure(call, repeat, setup))
+            row['throughput'] = batch_size / (row['median_ms'] / 1000) if row['median_ms'] else None
+            results.append(row)
+            if report is not None:
+                report(row)
+    return {
+        'meta': {
+            'revision': _git_revision(),
+            'created_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'batch_sizes': list(batch_sizes),
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Rows of `current` whose median latency is more than `threshold` times that of the same case and batch size
+    in `baseline`, each with both medians and their ratio. Cases missing from the baseline are skipped.
+    """
+    baseline_rows = {(row['case'], row['batch_size']): row for row in baseline['results']}
+    regressions = []
+    for row in current['results']:
+        previous = baseline_rows.get((row['case'], row['batch_size']))
+        if previous is None or not previous['median_ms']:
+            continue
+        ratio = row['median_ms'] / previous['median_ms']
+        if ratio > threshold:
+            regressions.append({'case': row['case'], 'batch_size': row['batch_size'],
+                                'baseline_ms': previous['median_ms'], 'current_ms': row['median_ms'],
+                                'ratio': ratio})
+    return regressions
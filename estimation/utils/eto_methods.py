@@ -1,6 +1,42 @@
 import math
 from rest_framework import serializers
-import pandas as pd
+
+from estimation.utils import astronomy
+
+ETO_REQUIRED_FIELDS = {
+    1: ['latitude', 'elevation', 'eto_rs_data', 'temperature', 're_water_body', 'outflow', 'recharge_rate'],
+    2: ['latitude', 'elevation', 'eto_sh_data', 'temperature'],
+    3: ['latitude', 'elevation', 'eto_sh_data', 'temperature'],
+    4: ['latitude', 'c_value', 'temperature'],
+    5: ['latitude', 'elevation', 'solar_radiation', 'temperature'],
+    6: ["latitude", "temperature", 're_water_body', 'outflow', 'recharge_rate'],
+    7: ['latitude', 'elevation', 'solar_radiation', 'temperature', 're_water_body', 'outflow', 'recharge_rate'],
+    8: ["solar_radiation", "rh_value", "temperature"],
+    9: ['latitude', 'elevation', 'solar_radiation', 'temperature'],
+    10: ["c_value", "solar_radiation", "temperature"],
+    11: ["c_value", 'solar_radiation', 'temperature', 're_water_body', 'outflow', 'recharge_rate'],
+    12: ["latitude", "solar_radiation", 'temperature', 'elevation', 're_water_body', 'outflow', 'recharge_rate']
+    #     TODO: Need to add required field.
+}
+# Request fields that feed the ETo calculation itself, as opposed to the water balance.
+ETO_INPUT_FIELDS = ('latitude', 'elevation', 'eto_rs_data', 'eto_sh_data', 'temperature', 'c_value',
+                    'solar_radiation', 'rh_value')
+
+
+def eto_missing_fields(eto_method, data, fields=None):
+    required_fields = ETO_REQUIRED_FIELDS.get(eto_method, [])
+    if fields is not None:
+        required_fields = [field for field in required_fields if field in fields]
+    return [field for field in required_fields if data.get(field) is None]
+
+
+def diagnostic_table(data, columns=None):
+    """
+    Build the per-period diagnostic table of an ETo method. pandas is only imported when a table is requested,
+    so regular requests never load it.
+    """
+    import pandas as pd
+    return pd.DataFrame(data, columns=columns)
 
 
 def eto_method_validation(data):
@@ -14,24 +50,7 @@ def eto_method_validation(data):
         raise ValueError("Length of kc_value is not equal to 36.")
     elif cn_value is not None and len(cn_value) != 36:
         raise serializers.ValidationError({"error": "The length of cn_value must be 36"})
-    required_fields_map = {
-        1: ['latitude', 'elevation', 'eto_rs_data', 'temperature', 're_water_body', 'outflow', 'recharge_rate'],
-        2: ['latitude', 'elevation', 'eto_sh_data', 'temperature'],
-        3: ['latitude', 'elevation', 'eto_sh_data', 'temperature'],
-        4: ['latitude', 'c_value', 'temperature'],
-        5: ['latitude', 'elevation', 'solar_radiation', 'temperature'],
-        6: ["latitude", "temperature", 're_water_body', 'outflow', 'recharge_rate'],
-        7: ['latitude', 'elevation', 'solar_radiation', 'temperature', 're_water_body', 'outflow', 'recharge_rate'],
-        8: ["solar_radiation", "rh_value", "temperature"],
-        9: ['latitude', 'elevation', 'solar_radiation', 'temperature'],
-        10: ["c_value", "solar_radiation", "temperature"],
-        11: ["c_value", 'solar_radiation', 'temperature', 're_water_body', 'outflow', 'recharge_rate'],
-        12: ["latitude", "solar_radiation", 'temperature', 'elevation', 're_water_body', 'outflow', 'recharge_rate']
-        #     TODO: Need to add required field.
-    }
-
-    required_fields = required_fields_map.get(eto_method, [])
-    missing_fields = [field for field in required_fields if data.get(field) is None]
+    missing_fields = eto_missing_fields(eto_method, data)
 
     if missing_fields:
         missing_fields_str = ', '.join(missing_fields)
@@ -60,7 +79,7 @@ def fao_combined_pm_method(latitude, elevation, eto_rs_data, temperature):
     z = elevation
     # Initialize variables
     SumET0 = 0
-    Lrad = round(latitude * math.pi / 180, 2)
+    astro = astronomy.astronomy_table(latitude, astronomy.FAO_COMBINED)
 
     daily_eto = []
     for r in range(36):
@@ -74,13 +93,8 @@ def fao_combined_pm_method(latitude, elevation, eto_rs_data, temperature):
         Tmean_t = (Tmax_t + Tmin_t) / 2
         p = 101.3 * ((293 - 0.0065 * z) / 293) ** 5.253
         gamma = 0.00163 * p / Lambda
-        # Calculation of Ra (Extraterrestrial Radiation)
-        J_t = (10 * (r + 1)) - 5  # r starts from 0, hence +1
-        del_t = 0.409 * math.sin((0.0172 * J_t - 1.39))
-        dr_t = 1 + 0.033 * math.cos((0.0172 * J_t))
-        ws_t = math.acos(-math.tan(Lrad) * math.tan(del_t))
-        Ra_t = 37.6 * dr_t * ((ws_t * math.sin(math.radians(latitude * 22 / (180 * 7))) * math.sin(del_t)) + (
-                math.cos(math.radians(latitude * 22 / (180 * 7))) * math.cos(del_t) * math.sin(ws_t)))
+        # Extraterrestrial Radiation from the cached per-latitude table
+        Ra_t = astro.ra[r]
 
         # Calculation of es, ea, delta
         es_Tmax_t = 0.6108 * math.exp((17.27 * Tmax_t) / (Tmax_t + 237.3))
@@ -147,7 +161,7 @@ def pm_method_sh(latitude, elevation, eto_sh_data, temperature):
     Lambda = 2.4536
     SumET0 = 0
     z = elevation
-    Lrad = latitude * math.pi / 180
+    astro = astronomy.astronomy_table(latitude)
     # data = []
     eto_list = []
 
@@ -160,13 +174,12 @@ def pm_method_sh(latitude, elevation, eto_sh_data, temperature):
         Tmean_t = (Tmax_t + Tmin_t) / 2
         P = 101.3 * ((293 - 0.0065 * z) / 293) ** 5.253
         gamma = round(0.00163 * P / Lambda, 2)
-        # Calculation of Ra
-        J_t = 10 * (r + 1) - 5
-        del_t = 0.409 * math.sin(0.0172 * J_t - 1.39)
-        dr_t = 1 + 0.033 * math.cos(0.0172 * J_t)
-        ws_t = math.acos(-math.tan(Lrad) * math.tan(del_t))
-        Ra_t = 37.6 * dr_t * ((ws_t * math.sin(Lrad) * math.sin(del_t)) + (
-                math.cos(Lrad) * math.cos(del_t) * math.sin(ws_t)))
+        # Ra from the cached per-latitude table
+        J_t = astro.j[r]
+        del_t = astro.declination[r]
+        dr_t = astro.dr[r]
+        ws_t = astro.ws[r]
+        Ra_t = astro.ra[r]
         N_t = (24 * ws_t) / 3.1416
         Rs_t = (0.25 + 0.50 * SH_t / N_t) * Ra_t
         # Calculation of es, ea, delta
@@ -264,11 +277,11 @@ def pm_method_sh(latitude, elevation, eto_sh_data, temperature):
     return YET0, eto_list
 
 
-def pm_method_no_rs_sh(latitude, elevation, eto_sh_data, temperature):
+def pm_method_no_rs_sh(latitude, elevation, eto_sh_data, temperature, diagnostics=False):
     eto_list = []
     Lambda = 2.4536
     SumET0 = 0
-    Lrad = latitude * math.pi / 180
+    astro = astronomy.astronomy_table(latitude, astronomy.MIDPOINT)
     Z = elevation
     P = 101.3 * ((293 - 0.0065 * Z) / 293) ** 5.26
     gamma = round(0.00163 * P / Lambda, 2)
@@ -279,12 +292,11 @@ def pm_method_no_rs_sh(latitude, elevation, eto_sh_data, temperature):
         Tmax_t = temperature[t]['t_max']
         Tmin_t = temperature[t]['t_min']
         Tmean_t = (Tmax_t + Tmin_t) / 2
-        J_t = (10 * (t + 1) - 5) + 0.5
-        del_t = 0.409 * math.sin(0.0172 * J_t - 1.39)
-        dr_t = 1 + 0.033 * math.cos(0.0172 * J_t)
-        ws_t = math.acos(-math.tan(Lrad) * math.tan(del_t))
-        Ra_t = 37.6 * dr_t * (
-                (ws_t * math.sin(Lrad) * math.sin(del_t)) + (math.cos(Lrad) * math.cos(del_t) * math.sin(ws_t)))
+        J_t = astro.j[t]
+        del_t = astro.declination[t]
+        dr_t = astro.dr[t]
+        ws_t = astro.ws[t]
+        Ra_t = astro.ra[t]
         N_t = 7.64 * ws_t
 
         Rs_t = 0.16 * (math.sqrt(Tmax_t - Tmin_t)) * Ra_t
@@ -320,43 +332,45 @@ def pm_method_no_rs_sh(latitude, elevation, eto_sh_data, temperature):
 
         # Accumulate ET0 for SumET0
         SumET0 += ET0_t  # Considering 10-day periods
-        data.append({
-            'Tmax': round(Tmax_t, 2),
-            'Tmin': round(Tmin_t, 2),
-            'RHmean': round(RH_t, 2),
-            'Wind(m/s)': round(WS_t, 2),
-            'ET0_P-M': round(ET0_t, 2),
-            'J-t': round(J_t, 2),
-            'del': round(del_t, 1),
-            'dr': round(dr_t, 2),
-            'ws': round(ws_t, 2),
-            'Ra': round(Ra_t, 2),
-            'N': round(N_t, 2),
-            'Rs': round(Rs_t, 2),
-            'Tmean': round(Tmean_t, 2),
-            'es(Tmax)': round(es_Tmax_t, 2),
-            'es(Tmin)': round(es_Tmin_t, 2),
-            'es': round(es_t, 2),
-            'ea': round(ea_t, 2),
-            'es - ea': round(es_t - ea_t, 2),
-            '∆': round(Delta_t, 2),
-            'Rns': round(Rns_t, 2),
-            'Rnl': round(Rnl_t, 2),
-            'Rn': round(Rn_t, 2),
-            'Rad.term': round(R_t, 2),
-            'P-atm.': round(P, 2),
-            'lambda': round(Lambda, 4),
-            'gamma': round(gamma, 4),
-            'Aeroterm': round(A_t, 2),
-            'D (mm/d)': round(D_t, 2),
-            'Eto': round(ET0_t, 2)
-        })
+        if diagnostics:
+            data.append({
+                'Tmax': round(Tmax_t, 2),
+                'Tmin': round(Tmin_t, 2),
+                'RHmean': round(RH_t, 2),
+                'Wind(m/s)': round(WS_t, 2),
+                'ET0_P-M': round(ET0_t, 2),
+                'J-t': round(J_t, 2),
+                'del': round(del_t, 1),
+                'dr': round(dr_t, 2),
+                'ws': round(ws_t, 2),
+                'Ra': round(Ra_t, 2),
+                'N': round(N_t, 2),
+                'Rs': round(Rs_t, 2),
+                'Tmean': round(Tmean_t, 2),
+                'es(Tmax)': round(es_Tmax_t, 2),
+                'es(Tmin)': round(es_Tmin_t, 2),
+                'es': round(es_t, 2),
+                'ea': round(ea_t, 2),
+                'es - ea': round(es_t - ea_t, 2),
+                '∆': round(Delta_t, 2),
+                'Rns': round(Rns_t, 2),
+                'Rnl': round(Rnl_t, 2),
+                'Rn': round(Rn_t, 2),
+                'Rad.term': round(R_t, 2),
+                'P-atm.': round(P, 2),
+                'lambda': round(Lambda, 4),
+                'gamma': round(gamma, 4),
+                'Aeroterm': round(A_t, 2),
+                'D (mm/d)': round(D_t, 2),
+                'Eto': round(ET0_t, 2)
+            })
         eto_list.append(ET0_t)
 
     # Calculation of Yearly ET0
     YET0 = SumET0  # Multiply by 5 as there are 36 periods
-    df = pd.DataFrame(data)
-    # df.to_excel('pm_method_no_rs_sh_output.xlsx', index=False)
+    # diagnostic_table(data).to_excel('pm_method_no_rs_sh_output.xlsx', index=False)
+    if diagnostics:
+        return YET0, eto_list, diagnostic_table(data)
     return YET0, eto_list
 
 
@@ -374,8 +388,8 @@ def fao_blaney_criddle_method(latitude, c_values, temperature, p_value):
         float: Yearly reference evapotranspiration (ET0) in millimeters.
     """
 
-    # Calculate Lrad (daylength factor)
-    lrad = latitude * 22 / (180 * 7)
+    # Sunset hour angles for the 36 periods, from the cached per-latitude table
+    astro = astronomy.astronomy_table(latitude, astronomy.BLANEY_CRIDDLE)
 
     # Assume table_2 (C values) is provided as a separate function or variable
     # Replace this with your logic to access C values based on month
@@ -383,12 +397,8 @@ def fao_blaney_criddle_method(latitude, c_values, temperature, p_value):
     # Calculate N (daylength hours) for each month
     sum_n = 0
     n_values = []
-    for t in range(1, 37):
-        j_t = 10 * t - 5
-        delta_t = 0.409 * math.sin(0.0172 * j_t - 1.39)
-        dr_t = 1 + 0.033 * math.cos(0.0172 * j_t)
-        ws_t = math.acos(-math.tan(lrad) * math.tan(delta_t))
-        n_t = 7.64 * ws_t
+    for t in range(36):
+        n_t = 7.64 * astro.ws[t]
         sum_n += n_t
         n_values.append(n_t)
 
@@ -414,7 +424,7 @@ def fao_blaney_criddle_method(latitude, c_values, temperature, p_value):
     return YETO, eto_list
 
 
-def makkink_method(latitude, elevation, solar_radiation, temperature):
+def makkink_method(latitude, elevation, solar_radiation, temperature, diagnostics=False):
     data = []
     eto_list = []
     # Constants
@@ -439,15 +449,17 @@ def makkink_method(latitude, elevation, solar_radiation, temperature):
         # Calculate ET0 for the current time step
         ET0 = ((0.61 * Rs * delta) / ((delta + gamma) * Lambda)) - 0.12
         sum_eto += ET0
-        data.append([
-            round(Tmean, 2), round(P, 2), round(gamma, 2), round(ea, 2), round(delta, 2), round(ET0, 2)
-        ])
+        if diagnostics:
+            data.append([
+                round(Tmean, 2), round(P, 2), round(gamma, 2), round(ea, 2), round(delta, 2), round(ET0, 2)
+            ])
         eto_list.append(ET0)
     columns = ["Tmean", "P", "Gamma", "ea", "delta", "eto"]
 
-    df = pd.DataFrame(data, columns=columns)
-    # df.to_excel("makkink_method_output.xlsx", index=False)
+    # diagnostic_table(data, columns).to_excel("makkink_method_output.xlsx", index=False)
     YET0 = sum_eto
+    if diagnostics:
+        return YET0, eto_list, diagnostic_table(data, columns)
     return YET0, eto_list
 
 
@@ -468,8 +480,7 @@ def hargreaves_method(latitude, temperature):
     if len(temperature) != 36:
         raise ValueError("Temperature data should be provided for 36 days.")
 
-    # Convert latitude to radians
-    Lrad = latitude * math.pi / 180
+    astro = astronomy.astronomy_table(latitude, astronomy.HARGREAVES)
     sum_et0 = 0
     lambda_value = 2.4536
     eto_list = []
@@ -480,15 +491,8 @@ def hargreaves_method(latitude, temperature):
         tmin = temperature[t]['t_min']
         tmean = (tmax + tmin) / 2
 
-        # Calculate J, del, dr, ws
-        j = (10 * (t + 1)) - 5
-        delta = 0.409 * math.sin(0.0172 * j - 1.39)
-        dr = 1 + 0.033 * math.cos(0.0172 * j)
-        ws = round(math.acos(-math.tan(Lrad) * math.tan(delta)), 2)
-
-        # Calculate Ra
-        ra = 37.6 * dr * (
-                (ws * math.sin(Lrad) * math.sin(delta)) + (math.cos(Lrad) * math.cos(delta) * math.sin(ws)))
+        # Ra from the cached per-latitude table (ws rounded to 2 decimals)
+        ra = astro.ra[t]
         # Calculate ET0
         et0 = (0.0023 * ra / lambda_value) * (tmean + 17.8) * math.sqrt((tmax - tmin))
         sum_et0 += et0
@@ -499,7 +503,7 @@ def hargreaves_method(latitude, temperature):
     return YET0, eto_list
 
 
-def hansen_method(latitude, elevation, solar_radiation, temperature):
+def hansen_method(latitude, elevation, solar_radiation, temperature, diagnostics=False):
     # TODO: Check list pass.
     """
     Calculate ET0 using Hansen (1984) method.
@@ -550,19 +554,21 @@ def hansen_method(latitude, elevation, solar_radiation, temperature):
 
         # Add ET0 to sumET0
         sum_et0 += et0
-        data.append([
-            round(t_mean, 2), round(P, 2), round(gamma, 2), round(ea, 2), round(delta, 2), round(et0, 2)
-        ])
+        if diagnostics:
+            data.append([
+                round(t_mean, 2), round(P, 2), round(gamma, 2), round(ea, 2), round(delta, 2), round(et0, 2)
+            ])
         eto_list.append(et0)
     columns = ["Tmean", "P", "Gamma", "ea", "delta", "eto"]
 
-    df = pd.DataFrame(data, columns=columns)
-    # df.to_excel("hansen_method_output.xlsx", index=False)
+    # diagnostic_table(data, columns).to_excel("hansen_method_output.xlsx", index=False)
     YET0 = sum_et0
+    if diagnostics:
+        return YET0, eto_list, diagnostic_table(data, columns)
     return YET0, eto_list
 
 
-def turc_method(solar_radiation, rh_value, temperature):
+def turc_method(solar_radiation, rh_value, temperature, diagnostics=False):
     # TODO: Check list pass.
     """
     Calculate ET0 using Turc method.
@@ -595,18 +601,20 @@ def turc_method(solar_radiation, rh_value, temperature):
             aT = 1
         et0 = (aT * 0.013 * (tmean / (tmean + 15))) * (23.8856 * rs + 50)
         sum_et0 += et0
-        data.append([
-            round(Tmax, 1), round(Tmin, 1), round(tmean, 1), round(rs, 1), round(aT, 1), round(et0, 1)
-        ])
+        if diagnostics:
+            data.append([
+                round(Tmax, 1), round(Tmin, 1), round(tmean, 1), round(rs, 1), round(aT, 1), round(et0, 1)
+            ])
         eto_list.append(et0)
     YET0 = sum_et0
     columns = ["Tmax", "Tmin", "tmean", "Rs", "aT", "ETO"]
-    df = pd.DataFrame(data, columns=columns)
-    # df.to_excel("turc_method_output.xlsx", index=False)
+    # diagnostic_table(data, columns).to_excel("turc_method_output.xlsx", index=False)
+    if diagnostics:
+        return YET0, eto_list, diagnostic_table(data, columns)
     return YET0, eto_list
 
 
-def priestley_taylor_method(latitude, elevation, solar_radiation, temperature):
+def priestley_taylor_method(latitude, elevation, solar_radiation, temperature, diagnostics=False):
     # TODO: Check list pass.
     """
     Calculate ET0 using the Priestley-Taylor method.
@@ -622,6 +630,7 @@ def priestley_taylor_method(latitude, elevation, solar_radiation, temperature):
     """
     # Convert latitude to radians
     Lrad = latitude * math.pi / 180
+    astro = astronomy.astronomy_table(latitude)
     print(f'LRAD: {Lrad}')
     eto_list = []
     # Constants
@@ -643,14 +652,12 @@ def priestley_taylor_method(latitude, elevation, solar_radiation, temperature):
         ea = 0.6108 * math.exp((17.27 * tmean) / (tmean + 237.2))
         delta = (4098 * ea) / ((tmean + 237.3) ** 2)
 
-        # Calculate Ra
-        j = (10 * (i + 1)) - 5
-        delta_rad = 0.409 * math.sin(0.0172 * j - 1.39)
-        dr = 1 + 0.033 * math.cos(0.0172 * j)
-        ws = math.acos(-math.tan(Lrad) * math.tan(delta_rad))
-        ra = 37.6 * dr * (
-                (ws * math.sin(Lrad) * math.sin(delta_rad)) + (math.cos(Lrad) * math.cos(delta_rad) * math.sin(ws))
-        )
+        # Ra from the cached per-latitude table
+        j = astro.j[i]
+        delta_rad = astro.declination[i]
+        dr = astro.dr[i]
+        ws = astro.ws[i]
+        ra = astro.ra[i]
 
         # Calculate Rn
         rs = solar_radiation[i]
@@ -665,13 +672,14 @@ def priestley_taylor_method(latitude, elevation, solar_radiation, temperature):
         # Add ET0 to sumET0
         sum_et0 += et0
         eto_list.append(et0)
-        data.append([
-            round(tmax, 2), round(tmin, 2), round(rs, 2), round(tmean, 2),
-            round(p, 1), round(gama, 2), round(ea, 2), round(delta, 2),
-            round(j, 2), round(Lrad, 2), round(delta_rad, 2), round(dr, 2),
-            round(ws, 2), round(ra, 1), round(rns, 2), round(rnl, 2),
-            round(rn, 2), round(et0, 2)
-        ])
+        if diagnostics:
+            data.append([
+                round(tmax, 2), round(tmin, 2), round(rs, 2), round(tmean, 2),
+                round(p, 1), round(gama, 2), round(ea, 2), round(delta, 2),
+                round(j, 2), round(Lrad, 2), round(delta_rad, 2), round(dr, 2),
+                round(ws, 2), round(ra, 1), round(rns, 2), round(rnl, 2),
+                round(rn, 2), round(et0, 2)
+            ])
 
     YET0 = sum_et0
     columns = [
@@ -679,12 +687,13 @@ def priestley_taylor_method(latitude, elevation, solar_radiation, temperature):
         "J", "Lrad", "Delta_rad", "Dr", "Ws", "Ra",
         "Rns", "Rnl", "Rn", "ET0"
     ]
-    df = pd.DataFrame(data, columns=columns)
-    # df.to_excel('priestley_taylor_method_output.xlsx', index=False)
+    # diagnostic_table(data, columns).to_excel('priestley_taylor_method_output.xlsx', index=False)
+    if diagnostics:
+        return YET0, eto_list, diagnostic_table(data, columns)
     return YET0, eto_list
 
 
-def jensen_haise_method(c_value, solar_radiation, temperature):
+def jensen_haise_method(c_value, solar_radiation, temperature, diagnostics=False):
     # TODO: Check list pass.
     """
     Calculate ET0 using Jensen-Haise method.
@@ -715,22 +724,24 @@ def jensen_haise_method(c_value, solar_radiation, temperature):
         print(f'ET0__{i}: {et0:.2f} m')
         # Add ET0 to sumET0
         sum_et0 += et0
-        data.append([round(solar_radiation[i], 2), round(c_value[i], 2), round(et0, 2)])
+        if diagnostics:
+            data.append([round(solar_radiation[i], 2), round(c_value[i], 2), round(et0, 2)])
         print(f'solar_radiation: {solar_radiation[i]}, c_value: {c_value[i]}, et0: {round(et0, 2)}')
         eto_list.append(et0)
     columns = [
         'Rs(MJ/m^2/d)', 'C', 'ETO (mm/d)'
     ]
-    df = pd.DataFrame(data=data, columns=columns)
-    # df.to_excel('jensen_haise_method_output.xlsx', index=False)
+    # diagnostic_table(data, columns).to_excel('jensen_haise_method_output.xlsx', index=False)
     # Calculate Yearly ET0
     YET0 = sum_et0
+    if diagnostics:
+        return YET0, eto_list, diagnostic_table(data, columns)
     return YET0, eto_list
 
     # Calculate Yearly ET0
 
 
-def abtew_method(c_value, solar_radiation):
+def abtew_method(c_value, solar_radiation, diagnostics=False):
     # TODO: Check list pass.
     """
     Calculate potential evapotranspiration (PET) using Abtew method.
@@ -754,21 +765,23 @@ def abtew_method(c_value, solar_radiation):
         c = c_value[j]
         et0 = c * ki * rs_value / lambda_value
         sum_et0 += et0
-        data.append([round(solar_radiation[j], 2), round(c_value[j], 2), round(et0, 2)])
+        if diagnostics:
+            data.append([round(solar_radiation[j], 2), round(c_value[j], 2), round(et0, 2)])
         eto_list.append(et0)
 
     columns = [
         'Rs(MJ/m^2/d)', 'C', 'ETO (mm/d)'
     ]
-    df = pd.DataFrame(data=data, columns=columns)
-    # df.to_excel('abtew_method_11_output.xlsx', index=False)
+    # diagnostic_table(data, columns).to_excel('abtew_method_11_output.xlsx', index=False)
     # Calculate Yearly ET0
     YET0 = sum_et0
 
+    if diagnostics:
+        return YET0, eto_list, diagnostic_table(data, columns)
     return YET0, eto_list
 
 
-def de_bruin_method(solar_radiation, temperature, latitude, elevation, c_value):
+def de_bruin_method(solar_radiation, temperature, latitude, elevation, c_value, diagnostics=False):
     # Constants
     Lambda = 2.4536  # Latent heat of vaporization (MJ/kg)
     # Given constant
@@ -797,11 +810,11 @@ def de_bruin_method(solar_radiation, temperature, latitude, elevation, c_value):
         # ET0sum += ET0 * 10
         YETO += ET0
         eto_list.append(ET0)
-        data.append([round(P, 2), round(Gama, 2), round(ea, 2), round(Delta, 2), round(ET0, 2)])
+        if diagnostics:
+            data.append([round(P, 2), round(Gama, 2), round(ea, 2), round(Delta, 2), round(ET0, 2)])
 
     columns = ['P', 'Gama', 'ETA', 'Delta', 'Eto']
-    df = pd.DataFrame(data, columns=columns)
-    # df.to_excel('de_bruin_output.xlsx', index=False)
+    # diagnostic_table(data, columns).to_excel('de_bruin_output.xlsx', index=False)
     # if len(solar_radiation) > 0 and len(temperature) > 0:
     #     Tmax_last = temperature[35]['t_max']
     #     Tmin_last = temperature[35]['t_min']
@@ -812,4 +825,32 @@ def de_bruin_method(solar_radiation, temperature, latitude, elevation, c_value):
     #     ET0_last = (C * Rs_val_last / Lambda) * (Delta_last / (Delta_last + Gama))
     #     ET0sum += ET0_last * 5
 
+    if diagnostics:
+        return YETO, eto_list, diagnostic_table(data, columns)
     return YETO, eto_list
+
+
+# Methods that can emit a per-period diagnostic table, keyed by eto_method.
+DIAGNOSTIC_ETO_METHODS = {
+    3: lambda d: pm_method_no_rs_sh(d['latitude'], d['elevation'], d['eto_sh_data'], d['temperature'],
+                                    diagnostics=True),
+    5: lambda d: makkink_method(d['latitude'], d['elevation'], d['solar_radiation'], d['temperature'],
+                                diagnostics=True),
+    7: lambda d: hansen_method(d['latitude'], d['elevation'], d['solar_radiation'], d['temperature'],
+                               diagnostics=True),
+    8: lambda d: turc_method(d['solar_radiation'], d['rh_value'], d['temperature'], diagnostics=True),
+    9: lambda d: priestley_taylor_method(d['latitude'], d['elevation'], d['solar_radiation'], d['temperature'],
+                                         diagnostics=True),
+    10: lambda d: jensen_haise_method(d['c_value'], d['solar_radiation'], d['temperature'], diagnostics=True),
+    11: lambda d: abtew_method(d['c_value'], d['solar_radiation'], diagnostics=True),
+    12: lambda d: de_bruin_method(d['solar_radiation'], d['temperature'], d['latitude'], d['elevation'],
+                                  d['c_value'], diagnostics=True),
+}
+
+
+def eto_diagnostic_table(eto_method, data):
+    """
+    Run the scalar implementation of `eto_method` in diagnostic mode and return its per-period table.
+    """
+    yeto, eto_list, table = DIAGNOSTIC_ETO_METHODS[eto_method](data)
+    return table
@@ -0,0 +1,487 @@
+import inspect
+
+import numpy as np
+
+from estimation import constants
+from estimation.utils import astronomy, resolution
+from estimation.utils.eto_methods import eto_missing_fields, ETO_INPUT_FIELDS
+
+LAMBDA = 2.4536
+PERIODS = astronomy.PERIODS
+
+
+def _column(value):
+    """
+    Turn a scalar or a per-station vector into something that broadcasts against (..., periods) arrays.
+    """
+    return np.asarray(value, dtype=float)[..., np.newaxis]
+
+
+def _atmospheric_pressure(elevation, exponent):
+    return 101.3 * ((293 - 0.0065 * _column(elevation)) / 293) ** exponent
+
+
+def _saturation_vapour_pressure(t, c=237.3):
+    return 0.6108 * np.exp((17.27 * t) / (t + c))
+
+
+def series_to_array(series, key=None):
+    """
+    Convert a request series (list of floats, or list of dicts when `key` is given) to a float array.
+    """
+    if key is not None:
+        series = [row[key] for row in series]
+    return np.asarray(series, dtype=float)
+
+
+class ClimateContext:
+    """
+    Intermediates of one climate dataset shared by the ETo kernels, each computed on first use and memoized.
+
+    A context is built from request data (from_data), in which case the input series are converted lazily as
+    well, or from site values and temperature arrays. The methods were calibrated with slightly different
+    constants (e.g. 237.2 vs 237.3 in Delta, 5.253 vs 5.26 in the pressure exponent), so every variant is
+    memoized under its own parameters: methods using the same definition get the same array, and no method's
+    result changes.
+    """
+
+    def __init__(self, latitude=None, elevation=None, t_max=None, t_min=None, data=None):
+        self.latitude = latitude
+        self.elevation = elevation
+        self.data = data if data is not None else {}
+        self._memo = {}
+        if t_max is not None:
+            self._memo['series', 'temperature', 't_max'] = t_max
+        if t_min is not None:
+            self._memo['series', 'temperature', 't_min'] = t_min
+
+    @classmethod
+    def from_data(cls, data):
+        return cls(latitude=data.get('latitude'), elevation=data.get('elevation'), data=data)
+
+    def _memoized(self, key, compute):
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    def series(self, field, key=None):
+        return self._memoized(('series', field, key), lambda: series_to_array(self.data.get(field), key))
+
+    @property
+    def t_max(self):
+        return self.series('temperature', 't_max')
+
+    @property
+    def t_min(self):
+        return self.series('temperature', 't_min')
+
+    @property
+    def t_mean(self):
+        return self._memoized('t_mean', lambda: (self.t_max + self.t_min) / 2)
+
+    @property
+    def es(self):
+        """
+        Mean saturation vapour pressure of Tmax and Tmin.
+        """
+        return self._memoized('es', lambda: (
+                _saturation_vapour_pressure(self.t_max) + _saturation_vapour_pressure(self.t_min)) / 2)
+
+    def es_at_mean(self, c):
+        """
+        Saturation vapour pressure at Tmean.
+        """
+        return self._memoized(('es_at_mean', c), lambda: _saturation_vapour_pressure(self.t_mean, c))
+
+    def delta(self, c, offset):
+        """
+        Slope of the saturation vapour pressure curve, 4098 * es(Tmean) / (Tmean + offset) ** 2.
+        """
+        return self._memoized(('delta', c, offset),
+                              lambda: 4098 * self.es_at_mean(c) / (self.t_mean + offset) ** 2)
+
+    def gamma(self, exponent):
+        """
+        Psychrometric constant from the elevation-based atmospheric pressure.
+        """
+        return self._memoized(('gamma', exponent),
+                              lambda: 0.00163 * _atmospheric_pressure(self.elevation, exponent) / LAMBDA)
+
+    @property
+    def kelvin_fourth_power(self):
+        """
+        (Tmax + 273.16) ** 4 + (Tmin + 273.16) ** 4, the temperature term of the net longwave radiation.
+        """
+        return self._memoized('kelvin_fourth_power',
+                              lambda: (self.t_max + 273.16) ** 4 + (self.t_min + 273.16) ** 4)
+
+    @property
+    def periods(self):
+        return self.t_max.shape[-1]
+
+    def astronomy(self, profile=astronomy.STANDARD):
+        return self._memoized(('astronomy', profile),
+                              lambda: astronomy.astronomy_arrays(self.latitude, profile, self.periods))
+
+
+def _climate(climate, latitude=None, elevation=None, t_max=None, t_min=None):
+    if climate is not None:
+        return climate
+    return ClimateContext(latitude=latitude, elevation=elevation, t_max=t_max, t_min=t_min)
+
+
+def _net_longwave(climate, ea, rs, ra, ea_coefficient):
+    return (4.903 * 10 ** -9) * (
+            (climate.kelvin_fourth_power / 2) *
+            (0.34 - ea_coefficient * np.sqrt(ea)) *
+            ((1.350 * rs / (0.75 * ra)) + (-0.35))
+    )
+
+
+def fao_combined_pm_kernel(latitude, elevation, t_max, t_min, rh, wind, radiation, climate=None):
+    """
+    FAO Combined P-M method with Rs option 1.1 (see eto_methods.fao_combined_pm_method).
+    """
+    climate = _climate(climate, latitude, elevation, t_max, t_min)
+    gamma = climate.gamma(5.253)
+    ra = climate.astronomy(astronomy.FAO_COMBINED).ra
+
+    t_mean = climate.t_mean
+    es = climate.es
+    ea = (rh / 100) * es
+    delta = 4098 * np.round(es, 2) / (t_mean + 273.3) ** 2
+
+    rns = np.round(0.77 * radiation, 1)
+    rnl = (4.903 * 10 ** -9) * 0.5 * (
+            climate.kelvin_fourth_power * (0.34 - 0.139 * np.sqrt(ea)) * (
+            1.136 * radiation / (0.75 * ra)) - 0.07)
+    r = 0.408 * delta * (rns - rnl)
+    a = gamma * 900 * wind * (es - ea) / (t_mean + 273)
+    d = delta + gamma * (1 + 0.34 * wind)
+    eto = (r + a) / d
+    return eto.sum(axis=-1), eto
+
+
+def pm_sh_kernel(latitude, elevation, t_max, t_min, rh, wind, sunshine, climate=None):
+    """
+    P-M method with sunshine hours (see eto_methods.pm_method_sh).
+    """
+    climate = _climate(climate, latitude, elevation, t_max, t_min)
+    gamma = np.round(climate.gamma(5.253), 2)
+    astro = climate.astronomy()
+    ra = astro.ra
+    n = (24 * astro.ws) / 3.1416
+    rs = (0.25 + 0.50 * sunshine / n) * ra
+
+    t_mean = climate.t_mean
+    es = climate.es
+    ea = (rh / 100) * es
+    delta = 4098 * ea / ((t_mean + 273.3) ** 2)
+
+    rns = 0.77 * rs
+    rnl = _net_longwave(climate, ea, rs, ra, 0.14)
+    r = 0.408 * delta * (rns - rnl)
+    a = gamma * 900 * wind * (es - ea) / (t_mean + 273)
+    d = delta + gamma * (1 + 0.34 * wind)
+    eto = (np.round(r, 2) + np.round(a, 2)) / np.round(d, 2)
+    return eto.sum(axis=-1), eto
+
+
+def pm_no_rs_sh_kernel(latitude, elevation, t_max, t_min, rh, wind, climate=None):
+    """
+    P-M method without radiation or sunshine data (see eto_methods.pm_method_no_rs_sh).
+    """
+    climate = _climate(climate, latitude, elevation, t_max, t_min)
+    gamma = np.round(climate.gamma(5.26), 2)
+    ra = climate.astronomy(astronomy.MIDPOINT).ra
+    rs = 0.16 * (np.sqrt(climate.t_max - climate.t_min)) * ra
+
+    t_mean = climate.t_mean
+    es = climate.es
+    ea = (rh / 100) * es
+    delta = 4098 * ea / (t_mean + 237.3) ** 2
+
+    rns = (1 - 0.23) * rs
+    rnl = _net_longwave(climate, ea, rs, ra, 0.14)
+    r = 0.408 * delta * (rns - rnl)
+    a = gamma * 900 * wind * (es - ea) / (t_mean + 273)
+    d = delta + gamma * (1 + 0.34 * wind)
+    eto = (r + a) / d
+    return eto.sum(axis=-1), eto
+
+
+def fao_blaney_criddle_kernel(latitude, t_max, t_min, c, climate=None):
+    """
+    FAO Blaney-Criddle method (see eto_methods.fao_blaney_criddle_method).
+    """
+    climate = _climate(climate, latitude, t_max=t_max, t_min=t_min)
+    n = 7.64 * climate.astronomy(astronomy.BLANEY_CRIDDLE).ws
+    days = resolution.period_days(climate.periods)
+    yn = (n * days).sum(axis=-1, keepdims=True)
+    p = n / yn * 100
+
+    eto = c * p * (0.46 * climate.t_mean + 8)
+    return (eto * days).sum(axis=-1), eto
+
+
+def makkink_kernel(elevation, t_max, t_min, radiation, climate=None):
+    """
+    Makkink method (see eto_methods.makkink_method).
+    """
+    climate = _climate(climate, elevation=elevation, t_max=t_max, t_min=t_min)
+    gamma = climate.gamma(5.26)
+    delta = climate.delta(237.2, 237.3)
+    eto = ((0.61 * radiation * delta) / ((delta + gamma) * LAMBDA)) - 0.12
+    return eto.sum(axis=-1), eto
+
+
+def hargreaves_kernel(latitude, t_max, t_min, climate=None):
+    """
+    Hargreaves method (see eto_methods.hargreaves_method).
+    """
+    climate = _climate(climate, latitude, t_max=t_max, t_min=t_min)
+    ra = climate.astronomy(astronomy.HARGREAVES).ra
+    eto = (0.0023 * ra / LAMBDA) * (climate.t_mean + 17.8) * np.sqrt((climate.t_max - climate.t_min))
+    return eto.sum(axis=-1), eto
+
+
+def hansen_kernel(elevation, t_max, t_min, radiation, climate=None):
+    """
+    Hansen (1984) method (see eto_methods.hansen_method).
+    """
+    climate = _climate(climate, elevation=elevation, t_max=t_max, t_min=t_min)
+    gamma = climate.gamma(5.26)
+    delta = climate.delta(237.2, 237.3)
+    eto = (0.7 * radiation * delta) / ((delta + gamma) * LAMBDA)
+    return eto.sum(axis=-1), eto
+
+
+def turc_kernel(t_max, t_min, radiation, rh, climate=None):
+    """
+    Turc method (see eto_methods.turc_method).
+    """
+    climate = _climate(climate, t_max=t_max, t_min=t_min)
+    t_mean = climate.t_mean
+    a_t = np.where(rh < 50, 1 + (50 - rh) / 70, 1)
+    eto = (a_t * 0.013 * (t_mean / (t_mean + 15))) * (23.8856 * radiation + 50)
+    return eto.sum(axis=-1), eto
+
+
+def priestley_taylor_kernel(latitude, elevation, t_max, t_min, radiation, climate=None):
+    """
+    Priestley-Taylor method (see eto_methods.priestley_taylor_method).
+    """
+    climate = _climate(climate, latitude, elevation, t_max, t_min)
+    gamma = climate.gamma(5.26)
+    ea = climate.es_at_mean(237.2)
+    delta = climate.delta(237.2, 237.3)
+    ra = climate.astronomy().ra
+
+    rns = 0.77 * radiation
+    rnl = (4.903 * (10 ** -9)) * 0.5 * (
+            climate.kelvin_fourth_power * (0.34 - 0.139 * np.sqrt(ea)) * (1.35 * radiation) / (0.75 * ra - 0.35))
+    rn = rns - rnl
+    eto = 1.26 * (delta / (delta + gamma)) * ((rn - 0) / LAMBDA)
+    return eto.sum(axis=-1), eto
+
+
+def jensen_haise_kernel(t_max, t_min, radiation, c, climate=None):
+    """
+    Jensen-Haise method (see eto_methods.jensen_haise_method).
+    """
+    climate = _climate(climate, t_max=t_max, t_min=t_min)
+    eto = c * (radiation * (0.025 * climate.t_mean + 0.08) / LAMBDA)
+    return eto.sum(axis=-1), eto
+
+
+def abtew_kernel(radiation, c, climate=None):
+    """
+    Abtew method (see eto_methods.abtew_method).
+    """
+    eto = c * 0.53 * radiation / LAMBDA
+    return eto.sum(axis=-1), eto
+
+
+def de_bruin_kernel(elevation, t_max, t_min, radiation, c, climate=None):
+    """
+    De Bruin method (see eto_methods.de_bruin_method).
+    """
+    climate = _climate(climate, elevation=elevation, t_max=t_max, t_min=t_min)
+    gamma = climate.gamma(5.26)
+    delta = climate.delta(237.2, 237.2)
+    eto = (c * radiation / LAMBDA) * (delta / (delta + gamma))
+    return eto.sum(axis=-1), eto
+
+
+ETO_KERNELS = {
+    constants.ETO_METHOD_CHOICES.FAO_COMBINED_PM_METHOD: fao_combined_pm_kernel,
+    constants.ETO_METHOD_CHOICES.PM_SH: pm_sh_kernel,
+    constants.ETO_METHOD_CHOICES.PM_NO_SH_RS: pm_no_rs_sh_kernel,
+    constants.ETO_METHOD_CHOICES.FAO_BLANEY_CRIDDLE_METHOD: fao_blaney_criddle_kernel,
+    constants.ETO_METHOD_CHOICES.MAKKINK_METHOD: makkink_kernel,
+    constants.ETO_METHOD_CHOICES.HARGREAVES_METHOD: hargreaves_kernel,
+    constants.ETO_METHOD_CHOICES.HANSEN_METHOD: hansen_kernel,
+    constants.ETO_METHOD_CHOICES.TURC_METHOD: turc_kernel,
+    constants.ETO_METHOD_CHOICES.PRIESTLEY_TAYLOR_METHOD: priestley_taylor_kernel,
+    constants.ETO_METHOD_CHOICES.JENSEN_HAISE_METHOD: jensen_haise_kernel,
+    constants.ETO_METHOD_CHOICES.ABTEW_METHOD: abtew_kernel,
+    constants.ETO_METHOD_CHOICES.DE_BRUIN_METHOD: de_bruin_kernel,
+}
+# Methods whose yearly ETo weights every period by its length in days instead of summing the periods.
+DAY_WEIGHTED_METHODS = (constants.ETO_METHOD_CHOICES.FAO_BLANEY_CRIDDLE_METHOD,)
+
+# Kernel argument -> (request field, key inside each period record or None for plain float series).
+KERNEL_INPUT_SOURCES = {
+    constants.ETO_METHOD_CHOICES.FAO_COMBINED_PM_METHOD: {
+        'rh': ('eto_rs_data', 'RH_t'), 'wind': ('eto_rs_data', 'WS_t'), 'radiation': ('eto_rs_data', 'SR_t'),
+    },
+    constants.ETO_METHOD_CHOICES.PM_SH: {
+        'rh': ('eto_sh_data', 'RH_t'), 'wind': ('eto_sh_data', 'WS_t'), 'sunshine': ('eto_sh_data', 'SH_t'),
+    },
+    constants.ETO_METHOD_CHOICES.PM_NO_SH_RS: {
+        'rh': ('eto_sh_data', 'RH_t'), 'wind': ('eto_sh_data', 'WS_t'),
+    },
+    constants.ETO_METHOD_CHOICES.TURC_METHOD: {
+        'rh': ('rh_value', None),
+    },
+}
+COMMON_INPUT_SOURCES = {
+    't_max': ('temperature', 't_max'),
+    't_min': ('temperature', 't_min'),
+    'radiation': ('solar_radiation', None),
+    'c': ('c_value', None),
+}
+# Per-site scalars; every other kernel argument is a per-period series, except the optional shared context.
+SITE_ARGUMENTS = ('latitude', 'elevation')
+CLIMATE_ARGUMENT = 'climate'
+KERNEL_ARGUMENTS = {
+    method: tuple(argument for argument in inspect.signature(kernel).parameters if argument != CLIMATE_ARGUMENT)
+    for method, kernel in ETO_KERNELS.items()
+}
+
+
+def _input_sources(eto_method):
+    sources = {**COMMON_INPUT_SOURCES, **KERNEL_INPUT_SOURCES.get(eto_method, {})}
+    for argument in KERNEL_ARGUMENTS[eto_method]:
+        if argument in SITE_ARGUMENTS:
+            yield argument, argument, None
+        else:
+            yield (argument,) + sources[argument]
+
+
+def kernel_input_fields(eto_method):
+    """
+    Request fields the kernel of `eto_method` reads.
+    """
+    return sorted({field for argument, field, key in _input_sources(eto_method)})
+
+
+def kernel_inputs(eto_method, data, climate=None):
+    """
+    Pick the arrays needed by the kernel of `eto_method` out of validated request data.
+
+    With the ClimateContext of the same data, the series are taken from (and memoized in) the context.
+    """
+    inputs = {}
+    for argument, field, key in _input_sources(eto_method):
+        if argument in SITE_ARGUMENTS:
+            inputs[argument] = data.get(argument)
+        elif climate is not None:
+            inputs[argument] = climate.series(field, key)
+        else:
+            inputs[argument] = series_to_array(data.get(field), key)
+    return inputs
+
+
+def batch_kernel_inputs(eto_method, stations):
+    """
+    Stack the inputs of many stations into (N,) site vectors and (N stations, periods) arrays.
+    """
+    inputs = {}
+    for argument, field, key in _input_sources(eto_method):
+        if argument in SITE_ARGUMENTS:
+            inputs[argument] = np.asarray([station.get(argument) for station in stations], dtype=float)
+        else:
+            inputs[argument] = np.stack([series_to_array(station.get(field), key) for station in stations])
+    return inputs
+
+
+def yearly_eto(eto_method, eto):
+    """
+    Yearly ETo of per-period ETo (..., periods) following the convention of `eto_method`.
+    """
+    if eto_method in DAY_WEIGHTED_METHODS:
+        return (eto * resolution.period_days(eto.shape[-1])).sum(axis=-1)
+    return eto.sum(axis=-1)
+
+
+def dekadal_eto(eto_method, eto):
+    """
+    Aggregation stage: per-period ETo (..., periods) of any resolution as the yearly ETo and the 36-dekad
+    series the dekadal engine reports. Dekadal ETo is passed through unchanged.
+    """
+    eto = resolution.to_dekads(eto)
+    return yearly_eto(eto_method, eto), eto
+
+
+def calculate_eto(eto_method, data, climate=None):
+    """
+    Vectorized counterpart of the per-method functions in eto_methods.
+
+    `data` holds the same request fields (latitude, elevation, eto_rs_data, eto_sh_data, c_value,
+    solar_radiation, rh_value, temperature) as daily, dekadal or monthly series; returns the same (YETO,
+    eto_list) pair, with ETo aggregated to the 36 dekads. Pass the data's ClimateContext when several methods
+    are evaluated on it so they share its intermediates.
+    """
+    inputs = kernel_inputs(eto_method, data, climate)
+    lengths = {value.shape[-1] for value in inputs.values() if isinstance(value, np.ndarray)}
+    if len(lengths) > 1:
+        raise ValueError(f"Input series for eto_method {eto_method} must have the same length.")
+    yeto, eto = dekadal_eto(eto_method, ETO_KERNELS[eto_method](**inputs, climate=climate)[1])
+    return float(yeto), eto.tolist()
+
+
+def calculate_eto_batch(eto_method, stations):
+    """
+    Evaluate one ETo method for many stations in a single 2-D array pass.
+
+    Each item of `stations` holds the same fields as a single-station request, all at one resolution. Returns
+    a (N,) array of yearly ETo and a (N stations, periods) array of per-period ETo at that resolution.
+    """
+    return ETO_KERNELS[eto_method](**batch_kernel_inputs(eto_method, stations))
+
+
+def eto_method_feasibility(data, eto_methods=None):
+    """
+    Split `eto_methods` (every ETO_METHOD_CHOICES value by default) into the methods that can be computed from
+    the climate fields present in `data` and a {method: reason} dict of those that cannot.
+    """
+    feasible = []
+    infeasible = {}
+    for eto_method in eto_methods or constants.ETO_METHOD_CHOICES.values:
+        if eto_method not in ETO_KERNELS:
+            infeasible[eto_method] = f'Method {eto_method} is not implemented yet'
+            continue
+        missing_fields = set(eto_missing_fields(eto_method, data, ETO_INPUT_FIELDS))
+        missing_fields.update(field for field in kernel_input_fields(eto_method) if data.get(field) is None)
+        if missing_fields:
+            infeasible[eto_method] = f"{', '.join(sorted(missing_fields))} required"
+        else:
+            feasible.append(eto_method)
+    return feasible, infeasible
+
+
+def compare_eto_methods(eto_methods, data):
+    """
+    Evaluate several ETo methods on one climate dataset.
+
+    Every kernel draws its input series and intermediates (Tmean, es, Delta, gamma, Ra, ...) from one
+    ClimateContext, so each is derived once. Returns a (methods,) array of yearly ETo and a (methods, periods)
+    array of per-period ETo at the resolution of the data.
+    """
+    climate = ClimateContext.from_data(data)
+    results = [
+        ETO_KERNELS[eto_method](**kernel_inputs(eto_method, data, climate), climate=climate)
+        for eto_method in eto_methods
+    ]
+    return np.asarray([float(yeto) for yeto, eto in results]), np.stack([eto for yeto, eto in results])
@@ -0,0 +1,167 @@
+"""
+Golden outputs of the ETo methods: the reference workbooks in data/*.xlsx converted to JSON fixtures.
+
+Each case pairs a workbook with the request data it was produced from, which is a climate fixture in data/ with
+the inputs the fixture lacks taken from the workbook's own input columns or from the case definition. The
+workbooks are read once by build_golden_fixtures (the build_golden_fixtures command) into data/golden/, so the
+regression tests only read JSON. The per-period tolerance is half a unit of the workbooks' two-decimal rounding,
+except for the methods whose workbooks already differed from the engines by more when the suite was added.
+"""
+import json
+from functools import lru_cache
+
+from django.conf import settings
+
+from estimation import constants
+from estimation.utils.eto_methods import ETO_INPUT_FIELDS
+
+ROUNDING_TOLERANCE = 0.0051
+
+GOLDEN_CASES = {
+    'fao_combined_pm': {
+        'eto_method': constants.ETO_METHOD_CHOICES.FAO_COMBINED_PM_METHOD,
+        'fixture': 'FAO_Combined_PM_Method_Full_DATA.json',
+        'workbook': 'FAO_Combined_PM_Method_Full_OUTPUT.xlsx',
+        'eto_column': 'ET0_t',
+        'tolerance': 0.07,
+    },
+    'pm_sh': {
+        'eto_method': constants.ETO_METHOD_CHOICES.PM_SH,
+        'fixture': 'pm_sh_data.json',
+        'workbook': 'pm_method_sh_output.xlsx',
+        'eto_column': 'Eto',
+        'tolerance': 0.102,
+    },
+    'pm_no_sh_rs': {
+        'eto_method': constants.ETO_METHOD_CHOICES.PM_NO_SH_RS,
+        'fixture': 'pm_no_rs_no_sh.json',
+        'workbook': 'pm_no_rs_no_sh_output.xlsx',
+        'eto_column': 'Eto',
+        # The fixture has no eto_sh_data; the workbook lists the humidity and wind it used.
+        'workbook_inputs': {'eto_sh_data': {'RH_t': 'RHmean', 'WS_t': 'Wind(m/s)'}},
+    },
+    'makkink': {
+        'eto_method': constants.ETO_METHOD_CHOICES.MAKKINK_METHOD,
+        'fixture': 'makkink_method_output.json',
+        'workbook': 'makkink_method_output.xlsx',
+        'eto_column': 'eto',
+    },
+    'hargreaves': {
+        'eto_method': constants.ETO_METHOD_CHOICES.HARGREAVES_METHOD,
+        'fixture': 'hargreaves_data.json',
+        'workbook': 'hargreaves_output.xlsx',
+        'eto_column': 'ETO',
+        'tolerance': 0.019,
+    },
+    'hansen': {
+        'eto_method': constants.ETO_METHOD_CHOICES.HANSEN_METHOD,
+        'fixture': 'hansen_method_data.json',
+        'workbook': 'hansen_method_output.xlsx',
+        'eto_column': 'eto',
+    },
+    'turc': {
+        'eto_method': constants.ETO_METHOD_CHOICES.TURC_METHOD,
+        'fixture': 'turc_method_data.json',
+        'workbook': 'turc_method_output.xlsx',
+        'eto_column': 'ETO',
+        'tolerance': 0.048,
+    },
+    'priestley_taylor': {
+        'eto_method': constants.ETO_METHOD_CHOICES.PRIESTLEY_TAYLOR_METHOD,
+        'fixture': 'priestly_taylor_data.json',
+        'workbook': 'priestley_taylor_method_output.xlsx',
+        'eto_column': 'ET0',
+    },
+    'jensen_haise': {
+        'eto_method': constants.ETO_METHOD_CHOICES.JENSEN_HAISE_METHOD,
+        'fixture': 'jensen_haise_method_data.json',
+        'workbook': 'jensen_haise_method_output.xlsx',
+        'eto_column': 'ETO (mm/d)',
+    },
+    'abtew': {
+        'eto_method': constants.ETO_METHOD_CHOICES.ABTEW_METHOD,
+        'fixture': 'abtew_method_11_data.json',
+        'workbook': 'abtew_method_11_output.xlsx',
+        'eto_column': 'ETO (mm/d)',
+    },
+    'de_bruin': {
+        'eto_method': constants.ETO_METHOD_CHOICES.DE_BRUIN_METHOD,
+        'fixture': 'de_bruin_data.json',
+        'workbook': 'de_bruin_output.xlsx',
+        'eto_column': 'Eto',
+        # The fixture has no c_value; the workbook was computed with the method's usual C = 0.65.
+        'inputs': {'c_value': [0.65] * 36},
+    },
+}
+
+
+def data_dir():
+    return settings.BASE_DIR / 'data'
+
+
+def golden_dir():
+    return data_dir() / 'golden'
+
+
+def _rounded(value):
+    return round(float(value), 10)
+
+
+def build_golden_case(name):
+    """
+    Read the workbook of case `name` and return its fixture: the method, its ETo inputs and every column.
+    """
+    import pandas as pd
+
+    case = GOLDEN_CASES[name]
+    with open(data_dir() / case['fixture']) as fixture:
+        data = {field: value for field, value in json.load(fixture).items() if field in ETO_INPUT_FIELDS}
+    table = pd.read_excel(data_dir() / case['workbook'])
+    data.update(case.get('inputs', {}))
+    for field, keys in case.get('workbook_inputs', {}).items():
+        data[field] = [
+            {key: _rounded(row[column]) for key, column in keys.items()}
+            for _, row in table.iterrows()
+        ]
+    data['eto_method'] = int(case['eto_method'])
+    return {
+        'eto_method': int(case['eto_method']),
+        'workbook': case['workbook'],
+        'eto_column': case['eto_column'],
+        'tolerance': case.get('tolerance', ROUNDING_TOLERANCE),
+        'data': data,
+        'expected': {str(column): [_rounded(value) for value in table[column]] for column in table.columns},
+    }
+
+
+def build_golden_fixtures(directory=None):
+    """
+    Convert every workbook to data/golden/<case>.json (or `directory`) and return the written paths.
+    """
+    directory = directory or golden_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name in GOLDEN_CASES:
+        path = directory / f'{name}.json'
+        with open(path, 'w') as output:
+            json.dump(build_golden_case(name), output, indent=2, ensure_ascii=False)
+            output.write('\n')
+        paths.append(path)
+    load_golden_fixtures.cache_clear()
+    return paths
+
+
+@lru_cache(maxsize=None)
+def load_golden_fixtures():
+    """
+    {case name: fixture} of the converted workbooks, read once per process.
+    """
+    fixtures = {}
+    for name in GOLDEN_CASES:
+        with open(golden_dir() / f'{name}.json') as fixture:
+            fixtures[name] = json.load(fixture)
+    return fixtures
+
+
+def expected_eto(fixture):
+    return fixture['expected'][fixture['eto_column']]
@@ -0,0 +1,119 @@
+"""
+Database-backed queue for long-running estimation batches.
+
+Jobs are EstimationJob rows. Workers (the run_estimation_jobs command) claim pending rows with a conditional
+UPDATE, so any number of workers can share the existing database without a broker. A running job writes its
+progress between chunks, which doubles as a heartbeat, and stops at the next chunk once cancellation has been
+requested. Finished jobs keep their result for ESTIMATION_JOB_RETENTION seconds and are then evicted.
+"""
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from estimation.api.user.serializers import JOB_SERIALIZERS
+from estimation.constants import JobStatusChoices
+from estimation.models import EstimationJob
+from estimation.utils.tasks import TASKS, TaskError
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = (JobStatusChoices.SUCCEEDED, JobStatusChoices.FAILED, JobStatusChoices.CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def claim_jobs(worker, limit):
+    """
+    Move up to `limit` of the oldest pending jobs to running for `worker` and return their ids.
+
+    The UPDATE only succeeds while the row is still pending, so a job claimed concurrently by another worker
+    is skipped rather than run twice.
+    """
+    claimed = []
+    candidates = EstimationJob.objects.filter(status=JobStatusChoices.PENDING).order_by('created_at')
+    for job_id in candidates.values_list('id', flat=True)[:limit]:
+        now = timezone.now()
+        if EstimationJob.objects.filter(id=job_id, status=JobStatusChoices.PENDING).update(
+                status=JobStatusChoices.RUNNING, worker=worker, started_at=now, updated_at=now):
+            claimed.append(job_id)
+    return claimed
+
+
+def progress_reporter(job_id):
+    def progress(fraction):
+        if not EstimationJob.objects.filter(id=job_id, cancel_requested=False).update(
+                progress=round(fraction, 4), updated_at=timezone.now()):
+            raise JobCancelled
+    return progress
+
+
+def finish_job(job_id, status, **fields):
+    now = timezone.now()
+    return EstimationJob.objects.filter(id=job_id, status=JobStatusChoices.RUNNING).update(
+        status=status, finished_at=now, updated_at=now,
+        expires_at=now + timedelta(seconds=settings.ESTIMATION_JOB_RETENTION), **fields)
+
+
+def execute_job(job_id):
+    """
+    Run a claimed job to completion and record its result, error or cancellation. Returns the job id.
+    """
+    job = EstimationJob.objects.select_related('user').get(id=job_id)
+    serializer = JOB_SERIALIZERS[job.kind](data=job.payload)
+    try:
+        if not serializer.is_valid():
+            raise TaskError(json.dumps(serializer.errors))
+        result = TASKS[job.kind](job.user, serializer.validated_data, progress_reporter(job_id))
+    except JobCancelled:
+        finish_job(job_id, JobStatusChoices.CANCELLED)
+    except TaskError as e:
+        finish_job(job_id, JobStatusChoices.FAILED, error=str(e))
+    except Exception as e:
+        logger.exception('Estimation job %s failed', job_id)
+        finish_job(job_id, JobStatusChoices.FAILED, error=f'{type(e).__name__}: {e}')
+    else:
+        finish_job(job_id, JobStatusChoices.SUCCEEDED, result=result, progress=1)
+    return job_id
+
+
+def cancel_job(job):
+    """
+    Cancel a pending job right away, or ask a running one to stop at its next progress update. Returns False
+    when the job has already finished.
+    """
+    now = timezone.now()
+    if EstimationJob.objects.filter(id=job.id, status=JobStatusChoices.PENDING).update(
+            status=JobStatusChoices.CANCELLED, cancel_requested=True, finished_at=now, updated_at=now,
+            expires_at=now + timedelta(seconds=settings.ESTIMATION_JOB_RETENTION)):
+        return True
+    return bool(EstimationJob.objects.filter(id=job.id, status=JobStatusChoices.RUNNING).update(
+        cancel_requested=True, updated_at=now))
+
+
+def requeue_stale_jobs():
+    """
+    Return running jobs whose worker has not reported progress for ESTIMATION_JOB_STALE_AFTER seconds to the
+    queue, or cancel them when cancellation was requested. Returns the number of jobs touched.
+    """
+    now = timezone.now()
+    stale = EstimationJob.objects.filter(
+        status=JobStatusChoices.RUNNING, updated_at__lt=now - timedelta(seconds=settings.ESTIMATION_JOB_STALE_AFTER))
+    cancelled = stale.filter(cancel_requested=True).update(
+        status=JobStatusChoices.CANCELLED, finished_at=now, updated_at=now,
+        expires_at=now + timedelta(seconds=settings.ESTIMATION_JOB_RETENTION))
+    requeued = stale.filter(cancel_requested=False).update(
+        status=JobStatusChoices.PENDING, worker='', started_at=None, progress=0, updated_at=now)
+    return cancelled + requeued
+
+
+def evict_expired_jobs():
+    """
+    Delete finished jobs past their retention period. Returns the number of jobs deleted.
+    """
+    deleted, _ = EstimationJob.objects.filter(status__in=FINISHED_STATUSES, expires_at__lt=timezone.now()).delete()
+    return deleted
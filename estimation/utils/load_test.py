@@ -0,0 +1,194 @@
+"""
+Load generator for the estimation API.
+
+Requests replay the data/*.json payloads (WB POSTs from the climate fixtures, WTF POSTs from the WTF fixtures)
+and list the stored records, authenticated with a DRF token. By default they go through Django's test client
+in this process, against the configured database, so every request runs the full middleware, view and
+database stack and its queries can be counted; with a base URL they are sent over HTTP to a running server
+(e.g. gunicorn on the same database) instead. The report gives the latency percentiles, throughput, query
+counts and error rate per endpoint.
+"""
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from coreapp.models import User
+from estimation.utils import benchmark, eto_vectorized
+
+API_PREFIX = '/api/v1/estimation/user/'
+# endpoint -> (method, path below API_PREFIX)
+ENDPOINTS = {
+    'wb': ('post', 'wb/'),
+    'wtf': ('post', 'wtf/'),
+    'wb-data': ('get', 'wb-data/'),
+    'wtf-data': ('get', 'wtf-data/'),
+}
+DEFAULT_REQUESTS = 100
+DEFAULT_CONCURRENCY = 2
+LOAD_TEST_EMAIL = 'loadtest@example.com'
+
+
+def load_test_token(email=LOAD_TEST_EMAIL):
+    """
+    Token key of the load-test user, creating the user and its token when needed.
+    """
+    user = User.objects.filter(email=email).first()
+    if user is None:
+        user = User.objects.create(email=email, mobile=email[:20], dob='2000-01-01')
+    return Token.objects.get_or_create(user=user)[0].key
+
+
+def endpoint_payloads(fixtures=None):
+    """
+    {endpoint: [payload, ...]} replayed in turn; GET endpoints take no payload.
+
+    WB payloads are the climate fixtures that carry the inputs of their own ETo method and of the water balance.
+    """
+    fixtures = benchmark.load_fixtures() if fixtures is None else fixtures
+    wb = [dict(benchmark.WB_DEFAULTS, **data) for data in fixtures.values()
+          if 'wt_max' not in data and 'land_use_area' in data
+          and eto_vectorized.eto_method_feasibility(data, [data.get('eto_method')])[0]]
+    wtf = [data for data in fixtures.values() if 'wt_max' in data]
+    return {'wb': wb, 'wtf': wtf, 'wb-data': [None], 'wtf-data': [None]}
+
+
+def _unique(endpoint, payload, index):
+    # Shift the catchment area by a negligible amount so repeated WB and WTF payloads miss the result cache.
+    if payload is None:
+        return payload
+    return dict(payload, catchment_area=payload['catchment_area'] * (1 + index * 1e-9))
+
+
+class InProcessClient:
+    def __init__(self, token):
+        self.client = Client(HTTP_AUTHORIZATION=f'Token {token}')
+
+    def request(self, method, path, payload):
+        with CaptureQueriesContext(connection) as queries:
+            if method == 'get':
+                response = self.client.get(API_PREFIX + path)
+            else:
+                response = self.client.post(API_PREFIX + path, payload, content_type='application/json')
+        return response.status_code, len(queries)
+
+    def close(self):
+        close_old_connections()
+
+
+class HTTPClient:
+    def __init__(self, token, base_url, timeout=60):
+        import requests
+
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['Authorization'] = f'Token {token}'
+
+    def request(self, method, path, payload):
+        response = self.session.request(method, self.base_url + API_PREFIX + path, json=payload,
+                                        timeout=self.timeout)
+        return response.status_code, None
+
+    def close(self):
+        self.session.close()
+
+
+def _summary(endpoint, samples, elapsed):
+    latencies = np.asarray([sample['latency_ms'] for sample in samples])
+    errors = sum(1 for sample in samples if sample['error'])
+    queries = [sample['queries'] for sample in samples if sample['queries'] is not None]
+    statuses = {}
+    for sample in samples:
+        status = str(sample['status'] or 'exception')
+        statuses[status] = statuses.get(status, 0) + 1
+    return {
+        'endpoint': endpoint,
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': errors / len(samples),
+        'statuses': statuses,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'mean_ms': float(latencies.mean()),
+        'throughput': len(samples) / elapsed if elapsed else None,
+        'queries_mean': float(np.mean(queries)) if queries else None,
+        'queries_max': max(queries) if queries else None,
+    }
+
+
+def run_load_test(token, endpoints=tuple(ENDPOINTS), requests=DEFAULT_REQUESTS, concurrency=DEFAULT_CONCURRENCY,
+                  base_url=None, cache_hits=False, fixtures=None):
+    """
+    Send `requests` requests to each of `endpoints`, interleaved, from `concurrency` threads (inline when 1).
+
+    Without `base_url` the requests run in this process; with it they are sent over HTTP. Unless `cache_hits`
+    is set, WB and WTF payloads are made unique so the server computes every request. Returns the per-endpoint
+    summaries and the overall wall time and throughput.
+    """
+    payloads = endpoint_payloads(fixtures)
+    schedule = []
+    for index in range(requests):
+        for endpoint in endpoints:
+            endpoint_payloads_ = payloads[endpoint]
+            payload = endpoint_payloads_[index % len(endpoint_payloads_)]
+            schedule.append((endpoint, payload if cache_hits else _unique(endpoint, payload, index)))
+
+    local = threading.local()
+    clients = []
+    clients_lock = threading.Lock()
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = HTTPClient(token, base_url) if base_url else InProcessClient(token)
+            with clients_lock:
+                clients.append(local.client)
+        return local.client
+
+    def send(item):
+        endpoint, payload = item
+        method, path = ENDPOINTS[endpoint]
+        start = time.perf_counter()
+        try:
+            status_code, queries = client().request(method, path, payload)
+            error = status_code >= 400
+        except Exception:
+            status_code, queries, error = None, None, True
+        return {'endpoint': endpoint, 'status': status_code, 'error': error, 'queries': queries,
+                'latency_ms': (time.perf_counter() - start) * 1000}
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        samples = [send(item) for item in schedule]
+        for item_client in clients:
+            item_client.close()
+    else:
+        def close_client():
+            if hasattr(local, 'client'):
+                local.client.close()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(send, schedule))
+            list(pool.map(lambda _: close_client(), range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    by_endpoint = {
+        endpoint: list(group)
+        for endpoint, group in itertools.groupby(sorted(samples, key=lambda sample: sample['endpoint']),
+                                                 key=lambda sample: sample['endpoint'])
+    }
+    return {
+        'concurrency': concurrency,
+        'base_url': base_url,
+        'elapsed_s': elapsed,
+        'requests': len(samples),
+        'throughput': len(samples) / elapsed if elapsed else None,
+        'endpoints': [_summary(endpoint, by_endpoint[endpoint], elapsed) for endpoint in endpoints],
+    }
@@ -0,0 +1,81 @@
+"""
+Multi-year WB simulation: an N-year stack of climate and rainfall series evaluated as one array computation,
+with per-year results and summary statistics (mean, spread, range and linear trend).
+
+The water balance carries no state from one dekad to the next, so the years are independent and are stacked
+along a leading axis of wb_vectorized.water_balance_kernel. ETo is computed in one eto_vectorized batch per
+series length, so a daily record only splits into leap and common years.
+"""
+import numpy as np
+
+from estimation.utils import eto_vectorized, wb_vectorized
+
+
+def _periods(year, fields):
+    return next(len(year[field]) for field in fields if isinstance(year.get(field), list))
+
+
+def years_eto(eto_method, years):
+    """
+    (years,) yearly ETo and (years, 36) dekadal ETo of the validated climate data of every year.
+    """
+    fields = eto_vectorized.kernel_input_fields(eto_method)
+    groups = {}
+    for index, year in enumerate(years):
+        groups.setdefault(_periods(year, fields), []).append(index)
+    yeto = np.empty(len(years))
+    eto = np.empty((len(years), eto_vectorized.PERIODS))
+    for indices in groups.values():
+        series = eto_vectorized.calculate_eto_batch(eto_method, [years[index] for index in indices])[1]
+        yeto[indices], eto[indices] = eto_vectorized.dekadal_eto(eto_method, series)
+    return yeto, eto
+
+
+def _rounded(values):
+    return [round(float(value), 2) if np.isfinite(value) else None for value in values]
+
+
+def trend(years, values):
+    """
+    Least-squares slope of `values` per year over the finite values, None when there are fewer than two.
+    """
+    finite = np.isfinite(values)
+    if finite.sum() < 2:
+        return None
+    return round(float(np.polyfit(years[finite], values[finite], 1)[0]), 4)
+
+
+def summary(years, values):
+    finite = values[np.isfinite(values)]
+    if not len(finite):
+        return dict.fromkeys(('mean', 'std', 'min', 'max', 'trend'))
+    return {
+        'mean': round(float(finite.mean()), 2),
+        'std': round(float(finite.std()), 2),
+        'min': round(float(finite.min()), 2),
+        'max': round(float(finite.max()), 2),
+        'trend': trend(years, values),
+    }
+
+
+def evaluate_years(years, yeto, inputs):
+    """
+    Per-year and summary results of a multi-year WB.
+
+    `inputs` are water_balance_kernel arguments whose p and eto are (years, periods) stacks; the other inputs
+    are shared by every year. Results are columnar, one value per year keyed like the scenario results, with
+    None where a year's result is undefined (e.g. a zero runoff denominator).
+    """
+    values = {
+        key: np.broadcast_to(value, len(years))
+        for key, value in wb_vectorized.water_balance_kernel(**inputs).items()
+    }
+    year_values = np.asarray(years, dtype=float)
+    return {
+        'years': list(years),
+        'yeto': _rounded(yeto),
+        'results': {key: _rounded(values[key]) for key in wb_vectorized.WB_RESULT_KEYS},
+        'summary': dict(
+            {key: summary(year_values, values[key]) for key in wb_vectorized.WB_RESULT_KEYS},
+            yeto=summary(year_values, yeto)),
+    }
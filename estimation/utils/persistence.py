@@ -0,0 +1,130 @@
+from django.db import transaction
+
+from estimation.models import WBMethodData, Temperature, CurveNumber, CropCoefficient, EtoRsData, EtoShData, \
+    RechargeRate, LandUseArea, OutFlow, WTFMethod, QOutData, SPYieldData, QinData, WBMultiYearRun
+
+LAND_USE_FIELDS = ('a1', 'a2', 'a3', 'a4', 'a5', 'a6', 'a7')
+OUTFLOW_FIELDS = ('out_dr', 'out_other')
+# per-period scalar series stored as JSON arrays on the WBMethodData row itself
+SERIES_FIELDS = ('c_value', 'p_value', 'rh_value', 'solar_radiation', 't_mean_value', 're_water_body')
+
+
+def series_array(values):
+    return [float(value) for value in values]
+
+
+def bulk_link(model, relation, pairs):
+    """
+    Insert the through-table rows of the many-to-many `relation` of `model` for every (instance, related object)
+    pair with one bulk INSERT.
+    """
+    field = model._meta.get_field(relation)
+    through = field.remote_field.through
+    source, target = f'{field.m2m_field_name()}_id', f'{field.m2m_reverse_field_name()}_id'
+    through.objects.bulk_create([through(**{source: instance.pk, target: obj.pk}) for instance, obj in pairs])
+
+
+def bulk_add(instance, relation, objects):
+    """
+    Insert `objects` with one bulk INSERT and link them to `instance` through the many-to-many `relation` with
+    a second one, instead of a create() and add() per row.
+    """
+    if not objects:
+        return []
+    created = instance._meta.get_field(relation).related_model.objects.bulk_create(objects)
+    bulk_link(type(instance), relation, [(instance, obj) for obj in created])
+    return created
+
+
+def wb_child_objects(data):
+    """
+    Unsaved child rows of a WB record, keyed by the WBMethodData many-to-many field they belong to. The scalar
+    series are not child rows, see SERIES_FIELDS.
+    """
+    def rows(field):
+        return data.get(field) or []
+
+    return {
+        'temperature': [Temperature(t_mean=(temp['t_max'] + temp['t_min']) / 2, **temp)
+                        for temp in rows('temperature')],
+        'cn_value': [CurveNumber(**value) for value in rows('cn_value')],
+        'kc_value': [CropCoefficient(**value) for value in rows('kc_value')],
+        'eto_rs_data': [EtoRsData(**value) for value in rows('eto_rs_data')],
+        'eto_sh_data': [EtoShData(**value) for value in rows('eto_sh_data')],
+        'recharge_rate': [RechargeRate(**value) for value in rows('recharge_rate')],
+        'land_use_area': [LandUseArea(**{key: value[key] for key in LAND_USE_FIELDS if key in value})
+                          for value in rows('land_use_area')],
+        'outflow': [OutFlow(**{key: value[key] for key in OUTFLOW_FIELDS if key in value})
+                    for value in rows('outflow')],
+    }
+
+
+@transaction.atomic
+def save_wb_method_data(user, data, recharge_data, eto_list):
+    """
+    Persist one WB calculation: the WBMethodData row with its yearly results and scalar series, then every
+    multi-column child series with a bulk insert per model and per through table.
+    """
+    wb_method_data = WBMethodData.objects.create(
+        user=user, catchment_area=data.get('catchment_area'), latitude=data.get('latitude'),
+        elevation=data.get('elevation'), rlc=data.get('rlc'), rp=data.get('rp'),
+        classification=data.get('classification'), eto_method=data.get('eto_method'), rf=data.get('rf'),
+        rf_option=bool(data.get('rf_option')),
+        yearly_rainfall=round(recharge_data.get('Yearly Rainfall (mm)', 0), 1),
+        yearly_recharge=round(recharge_data.get('Yearly Recharge (mm)', 0), 1),
+        yearly_runoff=round(recharge_data.get('Yearly Runoff (mm)', 0), 1),
+        yearly_recharge_percentage_precipitation=round(
+            recharge_data.get('Yearly Recharge as a percentage of Precipitation', 0), 1),
+        yearly_runoff_percentage_rainfall=round(recharge_data.get('Yearly Runoff as percentage of Rainfall', 0), 1),
+        aridity_index=round(recharge_data.get('Aridity Index (AI)', 0), 1),
+        eto_list=series_array(round(eto, 2) for eto in eto_list or []),
+        **{field: series_array(data.get(field) or []) for field in SERIES_FIELDS},
+    )
+    for relation, objects in wb_child_objects(data).items():
+        bulk_add(wb_method_data, relation, objects)
+    return wb_method_data
+
+
+def save_wb_multi_year_run(user, data, results):
+    """
+    Persist a multi-year WB simulation as a single row holding its columnar per-year results and summary,
+    instead of a WBMethodData record with its child rows per year.
+    """
+    return WBMultiYearRun.objects.create(
+        user=user, eto_method=data['eto_method'], catchment_area=data.get('catchment_area'),
+        latitude=data.get('latitude'), elevation=data.get('elevation'), years=results['years'],
+        yeto=results['yeto'], results=results['results'], summary=results['summary'])
+
+
+@transaction.atomic
+def save_wtf_methods(user, wells, results):
+    """
+    Persist many WTF calculations, each well's data paired with its result: the WTFMethod rows, their q_out and
+    specific-yield rows and their q_in links take one bulk insert each regardless of the number of wells.
+    """
+    wtf_methods = WTFMethod.objects.bulk_create([
+        WTFMethod(user=user, catchment_area=data['catchment_area'], wt_max=data['wt_max'], wt_min=data['wt_min'],
+                  num_layers=data['num_layers'], is_precipitation_given=True, precipitation=data.get('precipitation'),
+                  yearly_recharge=result['Recharge depth (mm)'],
+                  ratio=result['Yearly Recharge as a percentage of Precipitation'])
+        for data, result in zip(wells, results)
+    ])
+    QOutData.objects.bulk_create([
+        QOutData(wtf=wtf_method, **entry) for wtf_method, data in zip(wtf_methods, wells) for entry in data['q_out']
+    ])
+    SPYieldData.objects.bulk_create([
+        SPYieldData(wtf=wtf_method, **entry)
+        for wtf_method, data in zip(wtf_methods, wells) for entry in data['sp_yield_data']
+    ])
+    owners = [wtf_method for wtf_method, data in zip(wtf_methods, wells) for _ in data.get('q_in') or []]
+    q_in = QinData.objects.bulk_create([QinData(value=value) for data in wells for value in data.get('q_in') or []])
+    if q_in:
+        bulk_link(WTFMethod, 'q_in', zip(owners, q_in))
+    return wtf_methods
+
+
+def save_wtf_method(user, data, result):
+    """
+    Persist one WTF calculation with its q_out and specific-yield rows and its q_in links, one bulk insert each.
+    """
+    return save_wtf_methods(user, [data], [result])[0]
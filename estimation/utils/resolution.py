@@ -0,0 +1,92 @@
+"""
+Temporal resolution of the climate series: daily (365 or 366 days), dekadal (36 ten-day periods) or monthly.
+
+The resolution is implied by the length of a series. ETo is computed at the resolution of its inputs, with
+day-of-year dependent terms evaluated per period, and then aggregated to the 36 dekads the water balance and
+the existing outputs use. Dekads follow the calendar: days 1-10, 11-20 and 21 to the end of every month.
+"""
+import numpy as np
+
+DAILY = 'daily'
+DEKADAL = 'dekadal'
+MONTHLY = 'monthly'
+
+DEKADS = 36
+RESOLUTIONS = {12: MONTHLY, DEKADS: DEKADAL, 365: DAILY, 366: DAILY}
+
+MONTH_DAYS = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def resolution_of(periods):
+    """
+    Name of the resolution of a series of `periods` values; raises ValueError for unsupported lengths.
+    """
+    if periods not in RESOLUTIONS:
+        raise ValueError(f"Unsupported number of periods {periods}; expected one of "
+                         f"{', '.join(str(length) for length in RESOLUTIONS)}")
+    return RESOLUTIONS[periods]
+
+
+def _month_days(periods):
+    month_days = MONTH_DAYS.copy()
+    if periods == 366:
+        month_days[1] = 29
+    return month_days
+
+
+def dekad_lengths(periods):
+    """
+    Number of days of each calendar dekad of a daily series.
+    """
+    month_days = _month_days(periods)
+    return np.stack([np.full(12, 10), np.full(12, 10), month_days - 20], axis=-1).ravel()
+
+
+def day_of_year(periods):
+    """
+    Representative day of the year J of every period.
+
+    Dekadal series keep the engine's historical J = 10 * (r + 1) - 5, monthly ones use the mid-month day
+    J = int(30.4 * M - 15) and daily ones the day itself.
+    """
+    resolution = resolution_of(periods)
+    if resolution == DEKADAL:
+        return 10 * (np.arange(periods) + 1) - 5
+    if resolution == MONTHLY:
+        return (30.4 * np.arange(1, 13) - 15).astype(int)
+    return np.arange(1, periods + 1)
+
+
+def period_days(periods):
+    """
+    Length in days of every period, used where a method weights the periods by their duration.
+
+    Dekadal series keep the historical weights: 10 days per dekad and 15 for the last one.
+    """
+    resolution = resolution_of(periods)
+    if resolution == DEKADAL:
+        days = np.full(periods, 10)
+        days[-1] = 15
+        return days
+    if resolution == MONTHLY:
+        return _month_days(periods)
+    return np.ones(periods, dtype=int)
+
+
+def to_dekads(values):
+    """
+    Aggregate per-period rates (..., periods) to the 36 calendar dekads.
+
+    Daily values are averaged over the days of each dekad and monthly values apply to all three dekads of
+    their month, so a mean daily rate stays a mean daily rate. Dekadal series are returned unchanged.
+    """
+    values = np.asarray(values, dtype=float)
+    periods = values.shape[-1]
+    resolution = resolution_of(periods)
+    if resolution == DEKADAL:
+        return values
+    if resolution == MONTHLY:
+        return np.repeat(values, 3, axis=-1)
+    lengths = dekad_lengths(periods)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return np.add.reduceat(values, starts, axis=-1) / lengths
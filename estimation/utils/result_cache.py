@@ -0,0 +1,63 @@
+"""
+Content-addressed cache of WB and WTF results.
+
+The validated input of a calculation is serialized canonically and hashed, so identical submissions map to
+the same key regardless of key order or int/float spelling. The computed result is cached once per input,
+and the id of the record persisted for it is cached per user so repeated submissions can link to it.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+
+HIT = 'hit'
+MISS = 'miss'
+
+
+def _canonical(value):
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    return str(value)
+
+
+def input_hash(kind, data):
+    """
+    sha256 of the canonical JSON form of `data`, namespaced by the calculation `kind` ('wb' or 'wtf').
+    """
+    payload = json.dumps([kind, _canonical(data)], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _cache():
+    return caches[settings.ESTIMATION_RESULT_CACHE]
+
+
+def _result_key(kind, digest):
+    return f'estimation:{kind}:result:{digest}'
+
+
+def _record_key(kind, digest, user_id):
+    return f'estimation:{kind}:record:{digest}:{user_id}'
+
+
+def get_result(kind, digest):
+    return _cache().get(_result_key(kind, digest))
+
+
+def set_result(kind, digest, result):
+    _cache().set(_result_key(kind, digest), result)
+
+
+def get_record_id(kind, digest, user_id):
+    return _cache().get(_record_key(kind, digest, user_id))
+
+
+def set_record_id(kind, digest, user_id, record_id):
+    _cache().set(_record_key(kind, digest, user_id), record_id)
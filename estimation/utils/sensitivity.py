@@ -0,0 +1,91 @@
+"""
+Local sensitivity of the WB yearly results to its input groups.
+
+Every requested group is scaled by 1 - delta and 1 + delta and the yearly recharge and runoff are compared by
+central differences. The perturbed cases and the base are stacked along a leading axis and evaluated in a single
+wb_vectorized.water_balance_kernel call.
+
+ETo is not offered as a group, nor are alternative ETo methods compared: the kernel, like the scalar
+calculate_wb, takes the crop ET of every period from the first period's ETo, so such results would only reflect
+dekad 1. They can be added once the water balance uses per-period ETo.
+"""
+import numpy as np
+
+from estimation.utils import wb_vectorized
+
+# request-facing group -> water_balance_kernel argument
+SENSITIVITY_GROUPS = {
+    'p_value': 'p',
+    'cn_value': 'cn',
+    'kc_value': 'kc',
+}
+# Perturbed values are clipped to the physical range of their argument.
+ARGUMENT_LIMITS = {
+    'p': (0, None),
+    'kc': (0, None),
+    'cn': (None, 100),
+}
+SENSITIVITY_RESULTS = ('yearly_recharge', 'yearly_runoff')
+
+
+def _scaled(base_inputs, argument, factor):
+    low, high = ARGUMENT_LIMITS.get(argument, (None, None))
+    value = base_inputs[argument] * factor
+    if low is not None or high is not None:
+        value = np.clip(value, low, high)
+    return value
+
+
+def _rounded(values, index):
+    return {
+        wb_vectorized.WB_RESULT_KEYS[key]: round(float(values[key][index]), 2)
+        if np.isfinite(values[key][index]) else None
+        for key in SENSITIVITY_RESULTS
+    }
+
+
+def elasticity(low, high, base, delta):
+    """
+    Central-difference elasticity: % change of the result per % change of the input, None when undefined.
+    """
+    value = (high - low) / (2 * delta * base) if base else np.nan
+    return round(float(value), 4) if np.isfinite(value) else None
+
+
+def evaluate_sensitivity(base_inputs, groups, delta):
+    """
+    Elasticities of the yearly recharge and runoff to each of `groups` (keys of SENSITIVITY_GROUPS).
+
+    `base_inputs` come from wb_vectorized.wb_kernel_inputs. Groups are ranked by the magnitude of their recharge
+    elasticity.
+    """
+    cases = [{}]
+    for group in groups:
+        argument = SENSITIVITY_GROUPS[group]
+        cases += [{argument: _scaled(base_inputs, argument, 1 - delta)},
+                  {argument: _scaled(base_inputs, argument, 1 + delta)}]
+
+    batch = dict(base_inputs)
+    for argument in SENSITIVITY_GROUPS.values():
+        batch[argument] = np.stack([case.get(argument, base_inputs[argument]) for case in cases])
+    values = {
+        key: np.broadcast_to(value, len(cases))
+        for key, value in wb_vectorized.water_balance_kernel(**batch).items()
+    }
+
+    response_data = {'delta': delta, 'base': _rounded(values, 0), 'groups': {}}
+    for index, group in enumerate(groups):
+        low, high = 1 + 2 * index, 2 + 2 * index
+        response_data['groups'][group] = {
+            'low': _rounded(values, low),
+            'high': _rounded(values, high),
+            'elasticity': {
+                wb_vectorized.WB_RESULT_KEYS[key]: elasticity(values[key][low], values[key][high], values[key][0],
+                                                              delta)
+                for key in SENSITIVITY_RESULTS
+            },
+        }
+    recharge_label = wb_vectorized.WB_RESULT_KEYS['yearly_recharge']
+    response_data['ranking'] = sorted(
+        groups, key=lambda group: -abs(response_data['groups'][group]['elasticity'][recharge_label] or 0))
+    return response_data
@@ -0,0 +1,224 @@
+"""
+Batch computations shared by the synchronous endpoints and the estimation job worker.
+
+Every task takes the requesting user, the validated data of its serializer and an optional progress callback
+(called with the completed fraction) and returns the response data. Problems with the input that only show
+up during the calculation raise TaskError.
+"""
+import copy
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from rest_framework.response import Response
+
+from estimation import constants
+from estimation.models import WBScenarioRun
+from estimation.utils import eto_vectorized, multi_year, resolution, scenarios, sensitivity, uncertainty, \
+    wtf_vectorized
+from estimation.utils.calculate_yearly_recharge import calculate_yearly_recharge
+from estimation.utils.persistence import save_wb_method_data, save_wb_multi_year_run, save_wtf_methods
+from estimation.utils.wb_method_utils import calculate_eto_method
+from estimation.utils.wb_vectorized import calculate_wb, land_use_error_message, wb_kernel_inputs, WB_RESULT_KEYS
+
+
+class TaskError(Exception):
+    pass
+
+
+def report(progress, fraction):
+    if progress is not None:
+        progress(fraction)
+
+
+def chunks(items, chunk_size=None):
+    chunk_size = chunk_size or settings.ESTIMATION_JOB_CHUNK_SIZE
+    for start in range(0, len(items), chunk_size):
+        yield start, items[start:start + chunk_size]
+
+
+def wb_eto(data):
+    """
+    (YETO, eto_list) of a validated WB input, raising TaskError where calculate_eto_method returns an error.
+    """
+    eto_result = calculate_eto_method(data['eto_method'], data.get('latitude'), data.get('elevation'),
+                                      data.get('eto_rs_data'), data.get('eto_sh_data'), data.get('c_value', []),
+                                      data['p_value'], data.get('solar_radiation'), data.get('rh_value'),
+                                      data.get('temperature'))
+    if isinstance(eto_result, Response):
+        raise TaskError(eto_result.data['error'])
+    return eto_result
+
+
+def wb_inputs(data, eto_list):
+    return wb_kernel_inputs(data['catchment_area'], data['land_use_area'], data['kc_value'], data['cn_value'],
+                            data['p_value'], eto_list, data['re_water_body'], data['recharge_rate'], data['outflow'])
+
+
+def native_series(eto):
+    """
+    Rounded per-period ETo at the resolution of the inputs, only reported when that is not dekadal.
+    """
+    if eto.shape[-1] == eto_vectorized.PERIODS:
+        return {}
+    return {'eto_series': eto.round(2).tolist()}
+
+
+def eto_batch(user, data, progress=None):
+    eto_method = data['eto_method']
+    stations = data['stations']
+    results = []
+    for start, chunk in chunks(stations):
+        series = eto_vectorized.calculate_eto_batch(eto_method, chunk)[1]
+        yeto, eto = eto_vectorized.dekadal_eto(eto_method, series)
+        results += [
+            dict({'name': station.get('name'), 'yeto': round(station_yeto, 2), 'eto_list': station_eto},
+                 **native_series(station_series))
+            for station, station_yeto, station_eto, station_series in zip(chunk, yeto.tolist(),
+                                                                          eto.round(2).tolist(), series)
+        ]
+        report(progress, (start + len(chunk)) / len(stations))
+    return {'eto_method': eto_method, 'resolution': resolution.resolution_of(series.shape[-1]), 'results': results}
+
+
+def eto_comparison(user, data, progress=None):
+    eto_methods, infeasible = eto_vectorized.eto_method_feasibility(data, data.get('eto_methods'))
+    if not eto_methods:
+        raise TaskError('None of the requested ETo methods can be computed from the given fields')
+    series = eto_vectorized.compare_eto_methods(eto_methods, data)[1]
+    report(progress, 0.5)
+    yeto, eto = zip(*(eto_vectorized.dekadal_eto(eto_method, method_series)
+                      for eto_method, method_series in zip(eto_methods, series)))
+    report(progress, 1)
+    return {
+        'resolution': resolution.resolution_of(series.shape[-1]),
+        'eto_methods': [
+            {'eto_method': eto_method, 'name': constants.ETO_METHOD_CHOICES(eto_method).label,
+             'yeto': round(float(method_yeto), 2)}
+            for eto_method, method_yeto in zip(eto_methods, yeto)
+        ],
+        'eto_matrix': np.stack(eto).round(2).tolist(),
+        **native_series(series),
+        'infeasible': [
+            {'eto_method': eto_method, 'name': constants.ETO_METHOD_CHOICES(eto_method).label, 'reason': reason}
+            for eto_method, reason in infeasible.items()
+        ],
+    }
+
+
+def wtf_batch(user, data, progress=None):
+    results = []
+    valid_wells = []
+    for index, (well, (well_data, errors)) in enumerate(zip(data['wells'], data['validated_wells'])):
+        well_result = {'index': index, 'name': well.get('name')}
+        if errors is None:
+            valid_wells.append((well_result, well_data))
+        else:
+            well_result['errors'] = errors
+        results.append(well_result)
+
+    succeeded = []
+    for start, chunk in chunks(valid_wells):
+        calculated = wtf_vectorized.batch_yearly_recharge([well_data for _, well_data in chunk])
+        for (well_result, well_data), result in zip(chunk, calculated):
+            if 'error' in result:
+                well_result['errors'] = {'non_field_errors': [result['error']]}
+            else:
+                well_result['result'] = result
+                succeeded.append((well_result, well_data))
+        report(progress, (start + len(chunk)) / len(valid_wells))
+    wtf_methods = save_wtf_methods(user, [well_data for _, well_data in succeeded],
+                                   [well_result['result'] for well_result, _ in succeeded])
+    for (well_result, _), wtf_method in zip(succeeded, wtf_methods):
+        well_result['id'] = wtf_method.id
+    return {'results': results, 'succeeded': len(succeeded), 'failed': len(results) - len(succeeded)}
+
+
+def wb_scenarios(user, data, progress=None):
+    yeto, eto_list = wb_eto(data)
+    report(progress, 0.5)
+    results = scenarios.evaluate_scenarios(wb_inputs(data, eto_list), data['scenarios'])
+    response_data = {'eto_method': data['eto_method'], 'yeto': round(yeto, 2), 'scenarios': results}
+    base = results[0]
+    # The last chance to cancel: nothing is saved once it has passed.
+    report(progress, 1)
+    if data.get('persist') and 'error' not in base:
+        with transaction.atomic():
+            wb_method_data = save_wb_method_data(
+                user, data, {label: base[key] for key, label in WB_RESULT_KEYS.items()}, eto_list)
+            scenario_run = WBScenarioRun.objects.create(user=user, wb_method_data=wb_method_data,
+                                                        scenarios=data['scenarios'], results=results)
+        response_data['id'] = scenario_run.id
+        response_data['wb_method_data'] = wb_method_data.id
+    return response_data
+
+
+def wb_sensitivity(user, data, progress=None):
+    yeto, eto_list = wb_eto(data)
+    base_inputs = wb_inputs(data, eto_list)
+    error = land_use_error_message(base_inputs['land_use'])
+    if error:
+        raise TaskError(error)
+    report(progress, 0.5)
+    response_data = sensitivity.evaluate_sensitivity(base_inputs, data['groups'], data['delta'])
+    response_data.update(eto_method=data['eto_method'], yeto=round(yeto, 2))
+    report(progress, 1)
+    return response_data
+
+
+def wb_multi_year(user, data, progress=None):
+    years = data['validated_years']
+    yeto, eto = multi_year.years_eto(data['eto_method'], years)
+    inputs = wb_kernel_inputs(data['catchment_area'], data['land_use_area'], data['kc_value'], data['cn_value'],
+                              [year['p_value'] for year in years], eto, data['re_water_body'], data['recharge_rate'],
+                              data['outflow'])
+    error = land_use_error_message(inputs['land_use'])
+    if error:
+        raise TaskError(error)
+    report(progress, 0.5)
+    response_data = multi_year.evaluate_years([year['year'] for year in years], yeto, inputs)
+    # The last chance to cancel: nothing is saved once it has passed.
+    report(progress, 1)
+    response_data['id'] = save_wb_multi_year_run(user, data, response_data).id
+    response_data['eto_method'] = data['eto_method']
+    return response_data
+
+
+def wb_uncertainty(user, data, progress=None):
+    yeto, eto_list = wb_eto(data)
+    try:
+        result = calculate_wb(data['catchment_area'], copy.deepcopy(data['land_use_area']), data['kc_value'],
+                              data['cn_value'], data['p_value'], data.get('temperature'), eto_list,
+                              data['re_water_body'], data['recharge_rate'], data['outflow'], data.get('rf'),
+                              data.get('rf_option'))
+    except ZeroDivisionError as e:
+        raise TaskError(str(e))
+    if 'error' in result:
+        raise TaskError(result['error'])
+    result.update(eto_method=data['eto_method'], yeto=round(yeto, 2), eto_list=[round(eto, 2) for eto in eto_list])
+    result['uncertainty'] = uncertainty.wb_uncertainty(data, eto_list, data['uncertainty'], progress=progress)
+    return result
+
+
+def wtf_uncertainty(user, data, progress=None):
+    try:
+        result = calculate_yearly_recharge(data['catchment_area'], data['wt_max'], data['wt_min'], data['num_layers'],
+                                           data['sp_yield_data'], data['precipitation'], data['q_out'],
+                                           data.get('q_in') or [])
+    except ZeroDivisionError as e:
+        raise TaskError(str(e))
+    if 'error' in result:
+        raise TaskError(result['error'])
+    result['uncertainty'] = uncertainty.wtf_uncertainty(data, data['uncertainty'], progress=progress)
+    return result
+
+
+TASKS = {
+    constants.JobKindChoices.ETO_BATCH: eto_batch,
+    constants.JobKindChoices.WTF_BATCH: wtf_batch,
+    constants.JobKindChoices.WB_SCENARIOS: wb_scenarios,
+    constants.JobKindChoices.WB_SENSITIVITY: wb_sensitivity,
+    constants.JobKindChoices.WB_UNCERTAINTY: wb_uncertainty,
+    constants.JobKindChoices.WTF_UNCERTAINTY: wtf_uncertainty,
+    constants.JobKindChoices.WB_MULTI_YEAR: wb_multi_year,
+}
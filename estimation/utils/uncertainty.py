@@ -0,0 +1,194 @@
+"""
+Monte Carlo uncertainty for the WB and WTF methods.
+
+Inputs are perturbed uniformly within the requested error bounds or ranges, independently per sample and
+period, and the samples are evaluated in chunks through the vectorized kernels so memory stays bounded by the
+chunk size rather than the sample count. Only percentile summaries are returned.
+
+The water balance only uses the ETo of the first dekad (water_balance_kernel reads eto[..., :1]), so the climate
+and temperature bounds of a WB estimate only act through that dekad: they are not an uncertainty of the yearly
+ETo, and the response says so.
+"""
+import numpy as np
+from django.conf import settings
+
+from estimation.utils import eto_vectorized, resolution, wb_vectorized, wtf_vectorized
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+# ETo kernel arguments perturbed by the absolute temperature bound; every other per-period climate series except
+# the empirical C coefficient gets the relative climate bound.
+TEMPERATURE_ARGUMENTS = ('t_max', 't_min')
+UNPERTURBED_ETO_ARGUMENTS = ('c',)
+WB_UNCERTAINTY_RESULTS = ('yearly_recharge', 'yearly_runoff')
+FIRST_DEKAD_ETO_NOTE = ('The climate and temperature bounds only act through the ETo of the first dekad, the only '
+                        'ETo the water balance uses.')
+
+
+def new_seed():
+    return int(np.random.SeedSequence().entropy % 2 ** 32)
+
+
+def chunk_sizes(samples, chunk_size=None):
+    chunk_size = chunk_size or settings.ESTIMATION_UNCERTAINTY_CHUNK_SIZE
+    for start in range(0, samples, chunk_size):
+        yield min(chunk_size, samples - start)
+
+
+def _relative(rng, values, bound, size):
+    if not bound:
+        return values
+    return values * rng.uniform(1 - bound, 1 + bound, size=(size,) + np.shape(values))
+
+
+def _uniform(rng, value_range, point, size):
+    if value_range is None:
+        return np.full(size, point, dtype=float)
+    return rng.uniform(value_range['min'], value_range['max'], size=size)
+
+
+def percentile_summary(values, percentiles):
+    """
+    {'p5': ..., 'p50': ..., 'mean': ...} over the finite values, None everywhere when there are none.
+    """
+    values = values[np.isfinite(values)]
+    summary = {f'p{percentile:g}': None for percentile in percentiles}
+    summary['mean'] = None
+    if len(values):
+        for percentile, value in zip(percentiles, np.percentile(values, percentiles)):
+            summary[f'p{percentile:g}'] = round(float(value), 2)
+        summary['mean'] = round(float(values.mean()), 2)
+    return summary
+
+
+def _perturbed_eto(rng, eto_method, eto_inputs, options, size):
+    """
+    (size, 1) ETo of the first dekad, the only one water_balance_kernel reads, under the climate and temperature
+    bounds. The kernel still runs over the whole series: its day-of-year terms and, for daily series, the dekad
+    averaging need every period up to the first dekad's, and the kernels are cheap next to the water balance.
+    """
+    inputs = dict(eto_inputs)
+    temperature_bound = options.get('temperature', 0)
+    if temperature_bound:
+        shift = rng.uniform(-temperature_bound, temperature_bound, size=(size,) + eto_inputs['t_max'].shape)
+        for argument in TEMPERATURE_ARGUMENTS:
+            inputs[argument] = eto_inputs[argument] + shift
+    for argument, value in eto_inputs.items():
+        if argument in eto_vectorized.SITE_ARGUMENTS + TEMPERATURE_ARGUMENTS + UNPERTURBED_ETO_ARGUMENTS:
+            continue
+        inputs[argument] = _relative(rng, value, options.get('climate', 0), size)
+    return resolution.to_dekads(eto_vectorized.ETO_KERNELS[eto_method](**inputs)[1])[..., :1]
+
+
+def wb_uncertainty(data, eto_list, options, chunk_size=None, progress=None):
+    """
+    Percentiles of the yearly recharge and runoff of a WB input under uniform input errors.
+
+    `data` is the validated WB input and `eto_list` its deterministic ETo. `options` holds the sample count,
+    an optional seed, the percentiles and the bounds: relative for p_value, cn_value, kc_value and the climate
+    series ETo is computed from, absolute (degC) for temperature. ETo is only re-evaluated when one of the
+    climate or temperature bounds is set, and then only its first dekad is used, like the water balance does;
+    the result carries an 'eto_note' saying so.
+    `progress`, when given, is called with the completed fraction after every chunk.
+    """
+    samples = options['samples']
+    seed = options.get('seed')
+    if seed is None:
+        seed = new_seed()
+    percentiles = options.get('percentiles') or DEFAULT_PERCENTILES
+    rng = np.random.default_rng(seed)
+
+    eto_method = data['eto_method']
+    base_inputs = wb_vectorized.wb_kernel_inputs(
+        data['catchment_area'], data['land_use_area'], data['kc_value'], data['cn_value'], data['p_value'], eto_list,
+        data['re_water_body'], data['recharge_rate'], data['outflow'])
+    perturb_eto = bool(options.get('temperature') or options.get('climate'))
+    eto_inputs = eto_vectorized.kernel_inputs(eto_method, data) if perturb_eto else None
+
+    results = {key: np.empty(samples) for key in WB_UNCERTAINTY_RESULTS}
+    start = 0
+    for size in chunk_sizes(samples, chunk_size):
+        inputs = dict(base_inputs)
+        inputs['p'] = np.clip(_relative(rng, base_inputs['p'], options.get('p_value', 0), size), 0, None)
+        inputs['kc'] = np.clip(_relative(rng, base_inputs['kc'], options.get('kc_value', 0), size), 0, None)
+        inputs['cn'] = np.clip(_relative(rng, base_inputs['cn'], options.get('cn_value', 0), size), None, 100)
+        if perturb_eto:
+            inputs['eto'] = _perturbed_eto(rng, eto_method, eto_inputs, options, size)
+        chunk = wb_vectorized.water_balance_kernel(**inputs)
+        for key in WB_UNCERTAINTY_RESULTS:
+            results[key][start:start + size] = np.broadcast_to(chunk[key], size)
+        start += size
+        if progress is not None:
+            progress(start / samples)
+
+    summary = {
+        'samples': samples,
+        'seed': seed,
+        'valid_samples': int(np.isfinite(results['yearly_recharge']).sum()),
+        'percentiles': {
+            wb_vectorized.WB_RESULT_KEYS[key]: percentile_summary(values, percentiles)
+            for key, values in results.items()
+        },
+    }
+    if perturb_eto:
+        summary['eto_note'] = FIRST_DEKAD_ETO_NOTE
+    return summary
+
+
+def wtf_uncertainty(data, options, chunk_size=None, progress=None):
+    """
+    Percentiles of the WTF recharge depth and ratio when layer specific yields, water-table levels and pumping
+    are drawn from the requested ranges.
+
+    `options` holds the sample count, an optional seed and percentiles, optional {'min', 'max'} ranges for
+    wt_max, wt_min and each layer's sp_yield_percentage, and a relative bound for the pump column of q_out.
+    Also reports the fraction of samples that would fail calculate_yearly_recharge's sanity checks. `progress`
+    is called like in wb_uncertainty.
+    """
+    samples = options['samples']
+    seed = options.get('seed')
+    if seed is None:
+        seed = new_seed()
+    percentiles = options.get('percentiles') or DEFAULT_PERCENTILES
+    rng = np.random.default_rng(seed)
+
+    layer_height = np.asarray([layer['layer_height'] for layer in data['sp_yield_data']], dtype=float)
+    sp_yield = np.asarray([layer['sp_yield_percentage'] for layer in data['sp_yield_data']], dtype=float)
+    sp_yield_ranges = options.get('sp_yield_percentage')
+    pump, base, gw_out = wtf_vectorized.q_out_totals(data['q_out'])
+    q_in = sum(data.get('q_in') or [])
+
+    recharge, ratio = np.empty(samples), np.empty(samples)
+    start = 0
+    for size in chunk_sizes(samples, chunk_size):
+        if sp_yield_ranges:
+            chunk_sp_yield = np.stack([
+                _uniform(rng, value_range, point, size) for value_range, point in zip(sp_yield_ranges, sp_yield)
+            ], axis=-1)
+        else:
+            chunk_sp_yield = sp_yield
+        chunk_pump = _relative(rng, pump, options.get('pump', 0), size)
+        chunk_recharge, chunk_ratio = wtf_vectorized.yearly_recharge_kernel(
+            data['catchment_area'], _uniform(rng, options.get('wt_max'), data['wt_max'], size),
+            _uniform(rng, options.get('wt_min'), data['wt_min'], size), layer_height, chunk_sp_yield,
+            data['precipitation'], chunk_pump + base + gw_out, q_in)
+        recharge[start:start + size] = chunk_recharge
+        ratio[start:start + size] = chunk_ratio
+        start += size
+        if progress is not None:
+            progress(start / samples)
+
+    recharge_rejected = recharge > wtf_vectorized.MAX_RECHARGE
+    ratio_rejected = ~recharge_rejected & (ratio > wtf_vectorized.MAX_RECHARGE_RATIO)
+    return {
+        'samples': samples,
+        'seed': seed,
+        'percentiles': {
+            'Recharge depth (mm)': percentile_summary(recharge, percentiles),
+            'Yearly Recharge as a percentage of Precipitation': percentile_summary(ratio, percentiles),
+        },
+        'rejected_fraction': {
+            'recharge': round(float(recharge_rejected.mean()), 4),
+            'ratio': round(float(ratio_rejected.mean()), 4),
+            'total': round(float((recharge_rejected | ratio_rejected).mean()), 4),
+        },
+    }
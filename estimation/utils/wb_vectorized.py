@@ -0,0 +1,145 @@
+import numpy as np
+
+from estimation.utils.eto_vectorized import series_to_array
+
+LAND_USE_KEYS = ('a1', 'a2', 'a3', 'a4', 'a5', 'a6', 'a7')
+KC_KEYS = ('kc_a1', 'kc_a2', 'kc_a3', 'kc_a4')
+CN_KEYS = ('cn1', 'cn2', 'cn3', 'cn4')
+# Cropped land-use classes (a1..a4) that get an ETa / runoff / recharge balance; a5 and a6 only add direct
+# recharge and a7 only closes the land-use sum to 100.
+BALANCE_CLASSES = len(KC_KEYS)
+LAND_USE_TOLERANCE = 5
+
+WB_RESULT_KEYS = {
+    'yearly_rainfall': "Yearly Rainfall (mm)",
+    'yearly_recharge': "Yearly Recharge (mm)",
+    'yearly_runoff': "Yearly Runoff (mm)",
+    'rainfall_percentage': "rainfall_percentage (%)",
+}
+
+
+def rows_to_array(rows, keys):
+    """
+    Convert a list of per-period dicts to a (periods, len(keys)) float array.
+    """
+    return np.asarray([[row[key] for key in keys] for row in rows], dtype=float)
+
+
+def row_totals(rows):
+    """
+    Per-period sum of every value of a list of dicts (recharge_rate, outflow).
+    """
+    return np.asarray([sum(row.values()) for row in rows], dtype=float)
+
+
+def land_use_error(land_use):
+    """
+    Difference between 100 and the land-use sum of every period, shape (..., periods).
+    """
+    return 100 - land_use.sum(axis=-1)
+
+
+def land_use_error_message(land_use):
+    """
+    calculate_wb's error for the first period of a (periods, 7) land-use array whose sum is off by more than
+    LAND_USE_TOLERANCE, or None.
+    """
+    invalid = np.flatnonzero(np.abs(land_use_error(land_use)) > LAND_USE_TOLERANCE)
+    if len(invalid):
+        return f'Sum of land-use components must be equal to 100, Line number {invalid[0] + 1}'
+    return None
+
+
+def water_balance_kernel(catchment_area, land_use, kc, cn, p, eto, re_water_body, recharge, outflow):
+    """
+    Array form of wb_method_utils.calculate_wb.
+
+    land_use is (..., periods, 7), kc and cn are (..., periods, 4), the rest are (..., periods); the leading
+    dimensions (scenarios, samples) broadcast. Like the scalar version, the crop ET of every period uses the
+    first period's ETo. Returns the unrounded yearly results keyed like WB_RESULT_KEYS; a division by zero
+    (cn == 0, or a zero runoff denominator) shows up as a non-finite value.
+    """
+    catchment_area = np.asarray(catchment_area, dtype=float)
+    area = catchment_area[..., np.newaxis, np.newaxis]
+    p = p[..., np.newaxis]
+    fractions = land_use[..., :BALANCE_CLASSES] / 100 * area
+
+    v_sum_re_wb = (land_use[..., 5] / 100 * area[..., 0] * re_water_body * 1000).sum(axis=-1)
+    v_sum_rq = recharge.sum(axis=-1)
+    v_re_out = outflow.sum(axis=-1)
+
+    et = eto[..., :1, np.newaxis] * kc * 10
+    eta = np.minimum(p, et)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = ((1000 / cn) - 10) * 10
+        q = (p - eta - 0.2 * s) ** 2 / (p - eta + 0.8 * s)
+    v_sum_runoff = np.round(q * fractions * 1000).sum(axis=(-2, -1))
+    q_out = eta + q
+    v_sum_re = np.where(q_out < p, (p - q_out) * fractions * 1000, 0).sum(axis=(-2, -1))
+
+    yearly_rainfall = p[..., 0].sum(axis=-1)
+    net_recharge_depth = ((v_sum_re + v_sum_re_wb + v_sum_rq - v_re_out) / catchment_area) * 0.001
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rainfall_percentage = 100 * (net_recharge_depth / yearly_rainfall)
+    total_runoff = v_sum_runoff / (catchment_area * 1000)
+    return {
+        'yearly_rainfall': yearly_rainfall,
+        'yearly_recharge': net_recharge_depth,
+        'yearly_runoff': total_runoff,
+        'rainfall_percentage': rainfall_percentage,
+    }
+
+
+def wb_kernel_inputs(catchment_area, land_use_area, kc_value, cn_value, p_value, eto_list, re_water_body,
+                     recharge_rate, outflow):
+    """
+    Arrays for water_balance_kernel out of validated WB request data.
+    """
+    return {
+        'catchment_area': catchment_area,
+        'land_use': rows_to_array(land_use_area, LAND_USE_KEYS),
+        'kc': rows_to_array(kc_value, KC_KEYS),
+        'cn': rows_to_array(cn_value, CN_KEYS),
+        'p': series_to_array(p_value),
+        'eto': series_to_array(eto_list),
+        're_water_body': series_to_array(re_water_body),
+        'recharge': row_totals(recharge_rate),
+        'outflow': row_totals(outflow),
+    }
+
+
+def adjust_land_use(land_use_area, land_use=None):
+    """
+    calculate_wb's land-use check: add every period's difference from 100 to a7 in place, up to the first period
+    off by more than LAND_USE_TOLERANCE, and return that period's error message, or None.
+
+    `land_use` is the rows as an array when the caller already has it.
+    """
+    land_use = rows_to_array(land_use_area, LAND_USE_KEYS) if land_use is None else land_use
+    error = land_use_error(land_use)
+    invalid = np.flatnonzero(np.abs(error) > LAND_USE_TOLERANCE)
+    adjusted = invalid[0] if len(invalid) else len(error)
+    for row, row_error in zip(land_use_area[:adjusted], error[:adjusted].tolist()):
+        row['a7'] += abs(row_error)
+    return land_use_error_message(land_use) if len(invalid) else None
+
+
+def calculate_wb(catchment_area, land_use_area, kc_value, cn_value, p_value, temperature, eto_list1,
+                 re_water_body, recharge_rate, outflow, rf, rf_option):
+    """
+    Vectorized counterpart of wb_method_utils.calculate_wb with the same arguments and response_data.
+
+    The land-use check and its a7 adjustment are applied to `land_use_area` in place exactly as the scalar
+    version does, since the adjusted rows are what gets persisted. rf/rf_option only feed ratios the scalar
+    version computes but does not return, so they do not enter the kernel.
+    """
+    inputs = wb_kernel_inputs(catchment_area, land_use_area, kc_value, cn_value, p_value, eto_list1,
+                              re_water_body, recharge_rate, outflow)
+    error = adjust_land_use(land_use_area, inputs['land_use'])
+    if error:
+        return {'error': error}
+
+    results = water_balance_kernel(**inputs)
+    if not all(np.isfinite(value) for value in results.values()):
+        raise ZeroDivisionError('float division by zero')
+    return {label: round(float(results[key]), 2) for key, label in WB_RESULT_KEYS.items()}
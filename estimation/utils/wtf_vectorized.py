@@ -0,0 +1,73 @@
+import numpy as np
+
+# Sanity limits of calculate_yearly_recharge: recharge depth (mm) and recharge as a percentage of precipitation.
+MAX_RECHARGE = 1000
+MAX_RECHARGE_RATIO = 40
+
+
+def q_out_totals(q_out_data):
+    """
+    Yearly pump, base and gw_out totals of the 12 q_out rows, as a (3,) array.
+    """
+    return np.asarray([[row['pump'], row['base'], row['gw_out']] for row in q_out_data], dtype=float).sum(axis=0)
+
+
+def yearly_recharge_kernel(catchment_area, wt_max, wt_min, layer_height, sp_yield, precipitation, q_out, q_in):
+    """
+    Array form of calculate_yearly_recharge.calculate_yearly_recharge.
+
+    layer_height and sp_yield are (..., layers); q_out and q_in are the yearly outflow and inflow totals and
+    every other argument is a scalar or broadcasts over the leading (sample) dimensions. Returns the unrounded
+    recharge depth Re (mm) and Ratio (% of precipitation) without applying the sanity limits.
+    """
+    d = ((q_out - q_in) / catchment_area) * 0.001
+    yc = (layer_height * sp_yield).sum(axis=-1) / layer_height.sum(axis=-1)
+    wtf = (wt_max - wt_min) * 1000
+    re = (wtf + (100 / yc) * d) * (yc / 100)
+    ratio = 100 * re / precipitation
+    return re, ratio
+
+
+def batch_yearly_recharge(wells):
+    """
+    Vectorized calculate_yearly_recharge over many wells in one pass.
+
+    Each item of `wells` holds the validated fields of a single WTF request. Layer counts may differ between
+    wells; missing layers are padded with zero height, which drops them from the composite specific yield.
+    Returns one item per well: the same result dict as the scalar version, or its 'error' dict.
+    """
+    layers = max(len(well['sp_yield_data']) for well in wells)
+    layer_height = np.zeros((len(wells), layers))
+    sp_yield = np.zeros((len(wells), layers))
+    for index, well in enumerate(wells):
+        for layer, entry in enumerate(well['sp_yield_data']):
+            layer_height[index, layer] = entry['layer_height']
+            sp_yield[index, layer] = entry['sp_yield_percentage']
+
+    def column(field):
+        return np.asarray([well[field] for well in wells], dtype=float)
+
+    q_out = np.asarray([sum(row['pump'] + row['base'] + row['gw_out'] for row in well['q_out']) for well in wells])
+    q_in = np.asarray([sum(well.get('q_in') or []) for well in wells], dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        recharge, ratio = yearly_recharge_kernel(column('catchment_area'), column('wt_max'), column('wt_min'),
+                                                 layer_height, sp_yield, column('precipitation'), q_out, q_in)
+
+    results = []
+    for well_recharge, well_ratio in zip(recharge.tolist(), ratio.tolist()):
+        if not np.isfinite(well_recharge):
+            results.append({'error': 'float division by zero'})
+        elif well_recharge > MAX_RECHARGE:
+            results.append({'error': f'The Calculated Recharge (mm) is: {well_recharge}. Seems high!! '
+                                     f'Please check the input Data'})
+        elif not np.isfinite(well_ratio):
+            results.append({'error': 'float division by zero'})
+        elif well_ratio > MAX_RECHARGE_RATIO:
+            results.append({'error': f'The Calculated Recharge as a percentage of precipitation is: {well_ratio}. '
+                                     f'Seems high!! Please check the input Data'})
+        else:
+            results.append({
+                'Recharge depth (mm)': round(well_recharge, 1),
+                'Yearly Recharge as a percentage of Precipitation': round(well_ratio, 1),
+            })
+    return results